@@ -0,0 +1,200 @@
+"""
+Admission Control - Concurrency Limit, Fair Queueing and Load Shedding
+Caps how many chat requests run the pipeline at once. Requests beyond the cap
+wait in a bounded queue that is served round-robin across users (keyed on the
+frontend's anonymous user id), and are rejected immediately with a Retry-After
+hint when the queue is full, so admitted requests keep a bounded latency.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from config import env_float, env_int
+from metrics import ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to an HTTP error response."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionSlot:
+    """A held execution slot; release() is idempotent. A slot without a controller (admission disabled) releases nothing."""
+
+    def __init__(self, controller: Optional["AdmissionController"]):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            if self._controller is not None:
+                self._controller._release(time.monotonic() - self._started)
+
+    async def __aenter__(self) -> "AdmissionSlot":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    Global concurrency limit with a bounded, per-user fair wait queue.
+
+    Each user has a FIFO of waiters; when a slot frees up, users with waiters
+    are served round-robin, so one client flooding the endpoint cannot starve
+    the others. Rejections:
+        - 429 when a user already has max_queue_per_user requests waiting
+        - 503 when the global queue is full or a waiter times out
+    max_concurrent <= 0 disables admission control.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_queue_per_user: int,
+        queue_timeout: float
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        # Smoothed pipeline time per request, for Retry-After estimates
+        self._service_seconds = 5.0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"user_queue_full": 0, "queue_full": 0, "timeout": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free, from queue depth and service time."""
+        waves = (self._queued + 1) / max(self.max_concurrent, 1)
+        return max(1, min(60, math.ceil(waves * self._service_seconds)))
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED_TOTAL.inc(reason=reason)
+        return AdmissionRejected(status_code, reason, self.retry_after(), detail)
+
+    async def acquire(self, user_key: str) -> AdmissionSlot:
+        """
+        Wait for an execution slot for user_key.
+        Raises AdmissionRejected instead of waiting when the queue is full.
+        """
+        if not self.enabled:
+            return AdmissionSlot(None)
+
+        if self.in_flight < self.max_concurrent and not self._queued:
+            self.in_flight += 1
+            self.admitted += 1
+            ADMISSION_QUEUE_SECONDS.observe(0.0)
+            return AdmissionSlot(self)
+
+        user_queue = self._queues.get(user_key)
+        if user_queue is not None and len(user_queue) >= self.max_queue_per_user:
+            raise self._reject(429, "user_queue_full", "Too many pending requests from this user")
+        if self._queued >= self.max_queue:
+            raise self._reject(503, "queue_full", "Server is busy, please retry shortly")
+
+        waiter = asyncio.get_running_loop().create_future()
+        if user_queue is None:
+            user_queue = self._queues[user_key] = deque()
+        user_queue.append(waiter)
+        self._queued += 1
+        start = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we gave up: hand the slot back
+                self._release(None)
+            else:
+                waiter.cancel()
+                self._remove_waiter(user_key, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "timeout", "Server is busy, please retry shortly") from None
+            raise
+
+        self.admitted += 1
+        ADMISSION_QUEUE_SECONDS.observe(time.monotonic() - start)
+        return AdmissionSlot(self)
+
+    def _remove_waiter(self, user_key: str, waiter: asyncio.Future) -> None:
+        user_queue = self._queues.get(user_key)
+        if user_queue is None or waiter not in user_queue:
+            return
+        user_queue.remove(waiter)
+        self._queued -= 1
+        if not user_queue:
+            del self._queues[user_key]
+
+    def _release(self, service_seconds: Optional[float]) -> None:
+        if service_seconds is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+        self.in_flight -= 1
+        self._admit_next()
+
+    def _admit_next(self) -> None:
+        """Hand free slots to waiting users, round-robin."""
+        while self.in_flight < self.max_concurrent and self._queues:
+            user_key, user_queue = next(iter(self._queues.items()))
+            waiter = user_queue.popleft()
+            self._queued -= 1
+            if user_queue:
+                # This user goes to the back of the rotation
+                self._queues.move_to_end(user_key)
+            else:
+                del self._queues[user_key]
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected)
+        }
+
+
+def build_admission_controller() -> AdmissionController:
+    """
+    Build the chat admission controller from the environment.
+
+    Environment variables:
+        ADMISSION_MAX_CONCURRENT: Requests running the pipeline at once (0 disables)
+        ADMISSION_MAX_QUEUE: Requests allowed to wait for a slot
+        ADMISSION_MAX_QUEUE_PER_USER: Waiting requests allowed per user
+        ADMISSION_QUEUE_TIMEOUT: Seconds a request may wait before a 503
+    """
+    return AdmissionController(
+        max_concurrent=env_int("ADMISSION_MAX_CONCURRENT", 16),
+        max_queue=env_int("ADMISSION_MAX_QUEUE", 64),
+        max_queue_per_user=env_int("ADMISSION_MAX_QUEUE_PER_USER", 4),
+        queue_timeout=env_float("ADMISSION_QUEUE_TIMEOUT", 10.0)
+    )
@@ -0,0 +1,175 @@
+"""
+Cold Start Benchmark
+Measures what a scale-to-zero instance pays before serving users:
+    - import time of main and search_agent (fresh interpreter each run)
+    - process spawn -> first 200 from /health (server accepting requests)
+    - process spawn -> first 200 from /ready (pipeline warm)
+    - latency of the first /chat (sent right after /health, racing warm-up)
+      and of a second /chat once warm
+
+The server runs in a child process against the fake E-utilities server and the
+stub chat model (no network), with near-zero upstream latency so the numbers
+reflect startup overhead. Pass --max-* thresholds to fail on regressions.
+
+Usage (from the backend directory):
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 5 --max-import-ms 800 --max-health-ms 1500
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx  # noqa: E402
+
+from fake_eutils import EUTILS_PATH, FakeEutilsConfig, create_app, free_port, serve_in_background  # noqa: E402
+
+
+def child_env(**extra: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "CACHE_DB_PATH": "",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+        "QUERY_CACHE_MAX_ENTRIES": "0",
+        "ARTICLE_CACHE_MAX_ENTRIES": "0",
+        "NCBI_RATE_LIMIT": "1000000",
+        "LOG_LEVEL": "WARNING",
+    })
+    env.update(extra)
+    return env
+
+
+# =============================================================================
+# MEASUREMENTS
+# =============================================================================
+
+def measure_import(module: str) -> float:
+    """Seconds to import `module` in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> None:
+    """Poll path until it returns 200."""
+    while time.monotonic() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{path} did not become ready")
+
+
+def measure_startup(eutils_url: str, timeout: float) -> dict:
+    """Spawn the server and time health, first request, readiness and a warm request."""
+    port = free_port()
+    env = child_env(EUTILS_BASE_URL=eutils_url)
+    spawned = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-child", str(port)],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = spawned + timeout
+    result = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            wait_for(client, "/health", deadline)
+            result["health"] = time.monotonic() - spawned
+
+            start = time.monotonic()
+            client.post("/chat", json={"message": "What helps with sleep?"}).raise_for_status()
+            result["first_chat"] = time.monotonic() - start
+
+            wait_for(client, "/ready", deadline)
+            result["ready"] = time.monotonic() - spawned
+
+            start = time.monotonic()
+            client.post("/chat", json={"message": "Does exercise help anxiety?"}).raise_for_status()
+            result["warm_chat"] = time.monotonic() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return result
+
+
+def serve_child(port: int) -> None:
+    """Child process entry point: run the app with the stub LLM installed."""
+    import uvicorn
+
+    import llm_clients
+
+    def stub_factory(model_name, temperature, max_output_tokens):
+        # Imported here, not at startup, so langchain_core stays off the measured path
+        from stub_llm import StubChatModel
+
+        return StubChatModel(
+            tokens_per_second=5000, first_token_ms=5, answer_tokens=50,
+            max_output_tokens=max_output_tokens, model=model_name
+        )
+
+    llm_clients.set_llm_factory(stub_factory)
+    uvicorn.run("main:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the server")
+    parser.add_argument("--max-import-ms", type=float, default=0.0, help="fail if `import main` is slower")
+    parser.add_argument("--max-health-ms", type=float, default=0.0, help="fail if /health takes longer to answer")
+    parser.add_argument("--max-first-chat-ms", type=float, default=0.0, help="fail if the first /chat is slower")
+    parser.add_argument("--serve-child", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_child:
+        serve_child(args.serve_child)
+        return
+
+    imports = {module: [measure_import(module) for _ in range(args.runs)] for module in ("search_agent", "main")}
+    print(f"{'import':<24}{'median ms':>10}{'min ms':>10}")
+    for module, samples in imports.items():
+        print(f"{module:<24}{statistics.median(samples) * 1000:>10.0f}{min(samples) * 1000:>10.0f}")
+
+    fake_server, fake_url = serve_in_background(create_app(FakeEutilsConfig(latency_ms=0, jitter_ms=0)))
+    try:
+        runs = [measure_startup(fake_url + EUTILS_PATH, args.timeout) for _ in range(args.runs)]
+    finally:
+        fake_server.should_exit = True
+
+    labels = {
+        "health": "spawn -> /health",
+        "ready": "spawn -> /ready",
+        "first_chat": "first /chat",
+        "warm_chat": "warm /chat",
+    }
+    print(f"\n{'startup':<24}{'median ms':>10}{'max ms':>10}")
+    for key, label in labels.items():
+        samples = [run[key] for run in runs]
+        print(f"{label:<24}{statistics.median(samples) * 1000:>10.0f}{max(samples) * 1000:>10.0f}")
+
+    checks = [
+        ("import main", statistics.median(imports["main"]), args.max_import_ms),
+        ("/health", statistics.median(run["health"] for run in runs), args.max_health_ms),
+        ("first /chat", statistics.median(run["first_chat"] for run in runs), args.max_first_chat_ms),
+    ]
+    failures = [
+        f"{name}: {value * 1000:.0f} ms > {limit:.0f} ms"
+        for name, value, limit in checks if limit and value * 1000 > limit
+    ]
+    if failures:
+        raise SystemExit("Cold start regression: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
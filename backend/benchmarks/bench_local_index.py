@@ -0,0 +1,102 @@
+"""
+Local Index Benchmark - Ingest Throughput, Index Size and Query Latency
+Builds a local PubMed index in a temporary directory from a synthesized
+efetch payload (the recorded fixture articles renumbered, so the vocabulary
+is small and posting lists are long: a pessimistic case for query time) and
+reports:
+    - ingest articles/sec (XML parsing + indexing + segment merge)
+    - on-disk bytes per article
+    - time to open the index
+    - p50/p99 latency of Boolean searches shaped like enhance_query_node output
+    - p50/p99 latency of fetching 5 articles from the memory-mapped store
+
+Usage (from the backend directory):
+    python benchmarks/bench_local_index.py
+    python benchmarks/bench_local_index.py --articles 500000 --segment-docs 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ingest_pubmed import ingest  # noqa: E402
+from load_test import percentile  # noqa: E402
+from local_index import LocalPubMedIndex  # noqa: E402
+from payloads import synthesize_payload  # noqa: E402
+
+FIRST_PMID = 40000000
+
+QUERIES = [
+    "vitamin D AND sleep",
+    "(vitamin D OR cholecalciferol) AND (sleep quality OR insomnia)",
+    "curcumin OR turmeric AND inflammation",
+    "curcumin AND (C-reactive protein OR interleukin-6) AND randomized",
+    "\"vitamin D\"[tiab] AND supplementation[tiab] NOT deficiency",
+    "magnesium AND anxiety",
+    "inflammation",
+]
+
+
+def timed(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--segment-docs", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=200, help="repetitions per query")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pubmed_index_")
+    try:
+        source = os.path.join(workdir, "pubmed_sample.xml")
+        with open(source, "wb") as f:
+            f.write(synthesize_payload(args.articles, first_pmid=FIRST_PMID))
+        output = os.path.join(workdir, "index")
+
+        start = time.perf_counter()
+        meta = ingest([source], output, args.segment_docs)
+        ingest_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = LocalPubMedIndex(output)
+        open_seconds = time.perf_counter() - start
+        size = index.stats()["bytes"]
+
+        print(f"{meta['articles']} articles, {meta['terms']} terms, {meta['postings']} postings")
+        print(f"ingest      {meta['articles'] / ingest_seconds:>10.0f} articles/s  ({ingest_seconds:.1f}s)")
+        print(f"index size  {size / meta['articles']:>10.0f} bytes/article  ({size / 1e6:.1f} MB)")
+        print(f"open        {open_seconds * 1000:>10.1f} ms")
+
+        print(f"\n{'query':<72}{'hits':>6}{'p50 ms':>9}{'p99 ms':>9}")
+        for query in QUERIES:
+            hits = len(index.search(query, 5))
+            samples = timed(lambda: index.search(query, 5), args.runs)
+            print(f"{query:<72}{hits:>6}{percentile(samples, 0.50) * 1000:>9.2f}{percentile(samples, 0.99) * 1000:>9.2f}")
+
+        rng = random.Random(1)
+        batches = [[str(FIRST_PMID + rng.randrange(args.articles)) for _ in range(5)] for _ in range(args.runs)]
+        batch = iter(batches * 2)
+        samples = timed(lambda: index.get_articles(next(batch)), args.runs)
+        print(f"{'fetch 5 articles':<72}{'':>6}{percentile(samples, 0.50) * 1000:>9.2f}{percentile(samples, 0.99) * 1000:>9.2f}")
+        index.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Narration Benchmark - Time to First Audio, Cache Reuse and Edit Cost
+Narrates the articles in add-test-articles.sql with the stub TTS engine
+(silent MP3, configurable synthesis latency; no network or API keys) and
+reports, per article and in total:
+    - time to the first audio chunk and to the whole stream, cold cache
+    - the same with a warm cache (every segment read from disk)
+    - engine calls after editing one paragraph of each article
+
+Usage (from the backend directory):
+    python benchmarks/bench_narration.py
+    python benchmarks/bench_narration.py --tts-latency-ms 1500 --prefetch 3
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from narration import NarrationCache, NarrationPipeline, StubTTSEngine  # noqa: E402
+from site_articles import parse_sql_dump  # noqa: E402
+
+SAMPLE_DUMP = os.path.join(os.path.dirname(BACKEND_DIR), "add-test-articles.sql")
+
+
+async def narrate(pipeline: NarrationPipeline, article: dict) -> tuple:
+    """(seconds to first chunk, seconds to last chunk, bytes) for one article."""
+    start = time.perf_counter()
+    first, size = None, 0
+    async for chunk in pipeline.stream(pipeline.plan(article), pipeline.voice):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+def edit_one_paragraph(article: dict) -> dict:
+    paragraphs = article["content"].split("\n\n")
+    middle = len(paragraphs) // 2
+    paragraphs[middle] = paragraphs[middle] + " (Updated.)"
+    return {**article, "content": "\n\n".join(paragraphs)}
+
+
+async def run(args) -> None:
+    with open(SAMPLE_DUMP, encoding="utf-8") as f:
+        articles = [row for row in parse_sql_dump(f.read()) if row.get("content")]
+    workdir = tempfile.mkdtemp(prefix="narration_")
+    try:
+        engine = StubTTSEngine(latency_ms=args.tts_latency_ms)
+        pipeline = NarrationPipeline(
+            engine, NarrationCache(workdir, 0), voice="en-US-Studio-O", voices=["en-US-Studio-O"],
+            script_mode="text", prefetch=args.prefetch
+        )
+        segments = sum(len(pipeline.plan(article)) for article in articles)
+        print(f"{len(articles)} articles, {segments} segments, TTS latency {args.tts_latency_ms:.0f} ms, prefetch {args.prefetch}")
+        print(f"\n{'pass':<28}{'first chunk ms':>16}{'full stream ms':>16}{'engine calls':>14}")
+        for label, batch in (
+            ("cold cache", articles),
+            ("warm cache", articles),
+            ("one paragraph edited", [edit_one_paragraph(article) for article in articles]),
+        ):
+            calls = engine.calls
+            results = [await narrate(pipeline, article) for article in batch]
+            first = sum(r[0] for r in results) / len(results)
+            full = sum(r[1] for r in results) / len(results)
+            print(f"{label:<28}{first * 1000:>16.1f}{full * 1000:>16.1f}{engine.calls - calls:>14}")
+        print(f"\ncache: {pipeline.cache.stats()['bytes'] / 1e6:.1f} MB on disk")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tts-latency-ms", type=float, default=800.0, help="stub synthesis time per segment")
+    parser.add_argument("--prefetch", type=int, default=2, help="segments generated ahead of playback")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+PubMed XML Parser Benchmark
+Compares the streaming parse_pubmed_xml against the reference DOM parser
+(parse_pubmed_xml_tree) on 4-, 50- and 500-article efetch payloads.
+
+Payloads are read from benchmarks/fixtures/efetch_<N>.xml when present. Use
+--record to download real payloads from NCBI into those files; otherwise they
+are synthesized offline by repeating the articles in efetch_sample.xml with
+fresh PMIDs. Synthesized payloads repeat the same few articles, so record real
+ones before quoting numbers.
+
+The streaming parser is about as fast as the DOM parser (0.95-1.0x on the
+synthesized payloads); its gain is peak memory, which stays near one article
+instead of growing with the response (about 9x lower at 500 articles).
+Payloads here are parsed from memory, so only the parser's own allocations
+are measured. In the pipeline the efetch body is fed to PubMedFeedParser
+chunk by chunk as it downloads, so the response is never held whole either.
+
+Usage (from the backend directory):
+    python benchmarks/bench_pubmed_parser.py
+    python benchmarks/bench_pubmed_parser.py --record --term "sleep quality"
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import FIXTURES_DIR, synthesize_payload  # noqa: E402
+from pubmed_parser import parse_pubmed_xml, parse_pubmed_xml_tree  # noqa: E402
+
+
+SIZES = (4, 50, 500)
+
+
+# =============================================================================
+# PAYLOADS
+# =============================================================================
+
+def fixture_path(size: int) -> str:
+    return os.path.join(FIXTURES_DIR, f"efetch_{size}.xml")
+
+
+def load_payload(size: int) -> bytes:
+    path = fixture_path(size)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return synthesize_payload(size)
+
+
+def record_payloads(term: str) -> None:
+    """Download real efetch payloads for the benchmark sizes (requires network)."""
+    import httpx
+
+    params = {"db": "pubmed", "term": term, "retmax": max(SIZES), "retmode": "json", "sort": "relevance"}
+    api_key = os.getenv("NCBI_API_KEY")
+    if api_key:
+        params["api_key"] = api_key
+
+    with httpx.Client(base_url="https://eutils.ncbi.nlm.nih.gov/entrez/eutils", timeout=60.0) as client:
+        pmids = client.get("/esearch.fcgi", params=params).json()["esearchresult"]["idlist"]
+        for size in SIZES:
+            fetch_params = {"db": "pubmed", "id": ",".join(pmids[:size]), "retmode": "xml", "rettype": "abstract"}
+            if api_key:
+                fetch_params["api_key"] = api_key
+            response = client.post("/efetch.fcgi", data=fetch_params)
+            response.raise_for_status()
+            with open(fixture_path(size), "wb") as f:
+                f.write(response.content)
+            print(f"Recorded {fixture_path(size)} ({len(response.content) / 1024:.0f} KiB)")
+            time.sleep(0.5)
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def time_parser(parser, payload, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(payload)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def peak_memory(parser, payload) -> float:
+    """Peak traced allocation in KiB while parsing once."""
+    tracemalloc.start()
+    parser(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="download real payloads from NCBI first")
+    parser.add_argument("--term", default="sleep quality", help="esearch term used with --record")
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions per parser")
+    args = parser.parse_args()
+
+    if args.record:
+        record_payloads(args.term)
+
+    print(f"{'articles':>8}  {'KiB':>7}  {'tree ms':>8}  {'stream ms':>9}  {'speedup':>7}  {'tree peak KiB':>13}  {'stream peak KiB':>15}")
+    for size in SIZES:
+        payload = load_payload(size)
+        text = payload.decode("utf-8")
+
+        expected = parse_pubmed_xml_tree(text)
+        actual = parse_pubmed_xml(payload)
+        if actual != expected:
+            raise SystemExit(f"Parsers disagree on the {size}-article payload")
+
+        tree_ms = time_parser(parse_pubmed_xml_tree, text, args.repeat)
+        stream_ms = time_parser(parse_pubmed_xml, payload, args.repeat)
+        tree_peak = peak_memory(parse_pubmed_xml_tree, text)
+        stream_peak = peak_memory(parse_pubmed_xml, payload)
+
+        print(
+            f"{len(expected):>8}  {len(payload) / 1024:>7.0f}  {tree_ms:>8.2f}  {stream_ms:>9.2f}  "
+            f"{tree_ms / stream_ms:>6.2f}x  {tree_peak:>13.0f}  {stream_peak:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
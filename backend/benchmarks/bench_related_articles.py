@@ -0,0 +1,102 @@
+"""
+Related Articles Benchmark - Build, Incremental Update and Lookup Cost
+Synthesizes a corpus of articles from the vocabulary of add-test-articles.sql
+(random word mixes, so every article shares terms with many others: a
+pessimistic case for the similarity product) and reports:
+    - full build time (TF-IDF vectors + all-pairs similarities + top-N)
+    - incremental update time for a handful of edited and deleted articles,
+      and how many rows it recomputed
+    - on-disk table size
+    - p50/p99 latency of RelatedArticles.related()
+
+Usage (from the backend directory):
+    python benchmarks/bench_related_articles.py
+    python benchmarks/bench_related_articles.py --articles 20000 --edits 20
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from load_test import percentile  # noqa: E402
+from related_articles import RelatedArticles  # noqa: E402
+from reranker import tokenize  # noqa: E402
+from site_articles import parse_sql_dump, strip_markdown  # noqa: E402
+
+SAMPLE_DUMP = os.path.join(os.path.dirname(BACKEND_DIR), "add-test-articles.sql")
+CATEGORIES = ["nourishment", "restoration", "mindset", "relationships", "vitality"]
+
+
+def sample_vocabulary() -> list:
+    with open(SAMPLE_DUMP, encoding="utf-8") as f:
+        rows = parse_sql_dump(f.read())
+    return sorted({word for row in rows for word in tokenize(strip_markdown(row.get("content") or ""))})
+
+
+def synthesize_article(i: int, words: list, rng: random.Random, version: str = "1") -> dict:
+    return {
+        "slug": f"article-{i}",
+        "title": " ".join(rng.choices(words, k=8)),
+        "excerpt": " ".join(rng.choices(words, k=20)),
+        "category": rng.choice(CATEGORIES),
+        "content": " ".join(rng.choices(words, k=rng.randint(300, 900))),
+        "updated_at": version,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=10, help="articles edited (and deleted) in the update")
+    parser.add_argument("--top-n", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=10000, help="lookups timed")
+    args = parser.parse_args()
+
+    words = sample_vocabulary()
+    rng = random.Random(1)
+    articles = [synthesize_article(i, words, rng) for i in range(args.articles)]
+    table = RelatedArticles(args.top_n)
+    start = time.perf_counter()
+    table.build(articles)
+    build_seconds = time.perf_counter() - start
+    print(f"{args.articles} articles, {len(table.vocab)} terms")
+    print(f"full build   {build_seconds:>10.2f} s")
+
+    edited = [synthesize_article(i, words, rng, version="2") for i in rng.sample(range(args.articles), args.edits)]
+    removed = [f"article-{i}" for i in rng.sample(range(args.articles), args.edits)]
+    start = time.perf_counter()
+    result = table.update(edited, removed)
+    update_seconds = time.perf_counter() - start
+    print(
+        f"update       {update_seconds * 1000:>10.1f} ms  ({args.edits} edited + {args.edits} deleted: "
+        f"{result['recomputed']} rows recomputed, {result['merged']} merged)"
+    )
+
+    workdir = tempfile.mkdtemp(prefix="related_articles_")
+    try:
+        path = os.path.join(workdir, "related.npz")
+        table.save(path)
+        print(f"table size   {os.path.getsize(path) / 1e6:>10.2f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    slugs = list(table.rows)
+    samples = []
+    for _ in range(args.runs):
+        slug = slugs[rng.randrange(len(slugs))]
+        start = time.perf_counter()
+        table.related(slug, 4)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"lookup       {percentile(samples, 0.50) * 1e6:>10.1f} us p50  {percentile(samples, 0.99) * 1e6:.1f} us p99")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Multi-worker Benchmark - Throughput Scaling, NCBI Quota and Cross-worker Dedup
+Runs the app with 1 and N uvicorn workers (WEB_CONCURRENCY) sharing a fresh
+SQLite state file, against a fake E-utilities server in its own process and
+the stub chat model, and reports for each worker count:
+    - /chat requests/sec and p50/p95 latency for distinct questions
+    - the peak E-utilities requests seen in any one-second window; with the
+      shared budget it stays at the single-worker figure (--ncbi-rate-limit,
+      plus one for the single-token burst) however many workers run
+    - upstream esearch calls made while every client asks the same question
+      at once (1 pipeline run's worth means no worker duplicated the work)
+
+Usage (from the backend directory):
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1,2,4 --requests 400 --concurrency 64
+    python benchmarks/bench_workers.py --ncbi-rate-limit 10 --requests 40
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx  # noqa: E402
+
+from fake_eutils import EUTILS_PATH, free_port  # noqa: E402
+from load_test import QUESTIONS, percentile  # noqa: E402
+
+
+def create_stub_app():
+    """uvicorn app factory run inside each worker: the real app with the stub LLM."""
+    import llm_clients
+
+    tokens_per_second = float(os.environ.get("BENCH_TOKENS_PER_SECOND", "2000"))
+    first_token_ms = float(os.environ.get("BENCH_FIRST_TOKEN_MS", "20"))
+
+    def stub_factory(model_name, temperature, max_output_tokens):
+        from stub_llm import StubChatModel
+
+        return StubChatModel(
+            tokens_per_second=tokens_per_second, first_token_ms=first_token_ms, answer_tokens=150,
+            max_output_tokens=max_output_tokens, model=model_name
+        )
+
+    llm_clients.set_llm_factory(stub_factory)
+    from main import app
+    return app
+
+
+def wait_for(url: str, timeout: float) -> None:
+    """Poll url until it returns 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def start_fake_eutils(latency_ms: float) -> tuple:
+    """Run benchmarks/fake_eutils.py in its own process, so it does not share our GIL."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_eutils.py"),
+         "--port", str(port), "--latency-ms", str(latency_ms), "--jitter-ms", "0", "--seed", "1"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_for(base_url + "/stats", 30)
+    return process, base_url
+
+
+def start_server(workers: int, eutils_url: str, state_dir: str, args) -> tuple:
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "WEB_CONCURRENCY": str(workers),
+        "CACHE_DB_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "EUTILS_BASE_URL": eutils_url + EUTILS_PATH,
+        "NCBI_RATE_LIMIT": str(args.ncbi_rate_limit),
+        "ADMISSION_MAX_CONCURRENT": "0",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": os.pathsep.join([BENCHMARKS_DIR, BACKEND_DIR]),
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_workers:create_stub_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_for(base_url + "/health", args.timeout)
+    return process, base_url
+
+
+# =============================================================================
+# MEASUREMENTS
+# =============================================================================
+
+async def drive(base_url: str, questions: List[str], concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    pending = list(reversed(questions))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        async def worker() -> None:
+            nonlocal errors
+            while pending:
+                question = pending.pop()
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/chat", json={"message": question})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "errors": errors,
+    }
+
+
+def measure(workers: int, args) -> dict:
+    """One run on a fresh fake E-utilities server and a fresh shared state file."""
+    fake, eutils_url = start_fake_eutils(args.eutils_latency_ms)
+    state_dir = tempfile.TemporaryDirectory()
+    try:
+        server, base_url = start_server(workers, eutils_url, state_dir.name, args)
+        try:
+            # Requests are spread over workers, so poll /ready a few times per worker
+            for _ in range(workers * 4):
+                wait_for(base_url + "/ready", args.timeout)
+            before = httpx.get(eutils_url + "/stats").json()
+
+            questions = [f"{QUESTIONS[i % len(QUESTIONS)]} (workers {workers}, request {i})" for i in range(args.requests)]
+            result = asyncio.run(drive(base_url, questions, args.concurrency))
+            after = httpx.get(eutils_url + "/stats").json()
+            result["peak_per_second"] = after["peak_per_second"]
+
+            same = [f"{QUESTIONS[0]} (workers {workers}, shared)"] * args.concurrency
+            asyncio.run(drive(base_url, same, args.concurrency))
+            result["shared_esearch"] = httpx.get(eutils_url + "/stats").json()["esearch"] - after["esearch"]
+            result["distinct_esearch"] = after["esearch"] - before["esearch"]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+        state_dir.cleanup()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{min(4, os.cpu_count() or 1)}", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=200, help="distinct questions per worker count")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ncbi-rate-limit", type=float, default=200.0, help="host-wide NCBI requests/sec")
+    parser.add_argument("--eutils-latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the server")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.workers.split(",") if level.strip()]
+
+    results = {workers: measure(workers, args) for workers in levels}
+
+    print(f"NCBI limit {args.ncbi_rate_limit:.0f}/s, fake E-utilities {args.eutils_latency_ms:.0f} ms, "
+          f"{args.requests} questions at concurrency {args.concurrency}")
+    print(f"{'workers':>7}  {'req/s':>7}  {'p50 ms':>7}  {'p95 ms':>7}  {'errors':>6}  "
+          f"{'peak ncbi/s':>11}  {'esearch/q':>9}  {'same-q esearch':>14}")
+    for workers, r in results.items():
+        print(
+            f"{workers:>7}  {r['rps']:>7.1f}  {r['p50'] * 1000:>7.0f}  {r['p95'] * 1000:>7.0f}  {r['errors']:>6}  "
+            f"{r['peak_per_second']:>11}  {r['distinct_esearch'] / max(args.requests, 1):>9.2f}  {r['shared_esearch']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Fake E-utilities Server - Offline esearch/efetch Stand-in
+Serves PubMed esearch JSON and efetch XML built from the recorded fixtures,
+with configurable latency, jitter, 5xx errors and 429 throttling, so the
+pipeline can be load-tested without NCBI. GET /stats reports request counts
+and the peak requests per second.
+
+esearch returns deterministic PMIDs per search term (the same term always gets
+the same ids); efetch maps every PMID onto a fixture article.
+
+Usage (from the backend directory):
+    python benchmarks/fake_eutils.py --port 8765 --latency-ms 150 --error-rate 0.01
+    EUTILS_BASE_URL=http://127.0.0.1:8765/entrez/eutils python main.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request, Response  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from payloads import build_efetch_payload, fixture_pmids  # noqa: E402
+
+
+EUTILS_PATH = "/entrez/eutils"
+
+
+@dataclass
+class FakeEutilsConfig:
+    """Latency and fault-injection knobs for the fake server."""
+    latency_ms: float = 100.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0          # fraction of requests answered with 500
+    throttle_rate: float = 0.0       # fraction answered with 429 + Retry-After
+    zero_result_rate: float = 0.0    # fraction of search terms with no hits
+    retry_after_seconds: float = 1.0
+    seed: Optional[int] = None
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.sha1(term.strip().lower().encode()).digest()[:8], "big")
+
+
+def create_app(config: Optional[FakeEutilsConfig] = None) -> FastAPI:
+    """Build the fake E-utilities ASGI app."""
+    config = config or FakeEutilsConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Fake E-utilities")
+    app.state.config = config
+    app.state.requests = {"esearch": 0, "efetch": 0, "errors": 0, "throttled": 0, "peak_per_second": 0}
+    recent: deque = deque()
+
+    async def inject(operation: str) -> Optional[Response]:
+        """Sleep for the configured latency, then maybe return an injected failure."""
+        app.state.requests[operation] += 1
+        # Highest number of requests seen in any one-second window (NCBI quota check)
+        now = time.monotonic()
+        recent.append(now)
+        while recent[0] <= now - 1.0:
+            recent.popleft()
+        app.state.requests["peak_per_second"] = max(app.state.requests["peak_per_second"], len(recent))
+        delay = max(0.0, rng.gauss(config.latency_ms, config.jitter_ms)) if config.jitter_ms else config.latency_ms
+        await asyncio.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < config.throttle_rate:
+            app.state.requests["throttled"] += 1
+            return JSONResponse(
+                {"error": "API rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": str(config.retry_after_seconds)}
+            )
+        if roll < config.throttle_rate + config.error_rate:
+            app.state.requests["errors"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        return None
+
+    async def params_of(request: Request) -> dict:
+        params = dict(request.query_params)
+        if request.method == "POST":
+            params.update(parse_qsl((await request.body()).decode()))
+        return params
+
+    @app.api_route(f"{EUTILS_PATH}/esearch.fcgi", methods=["GET", "POST"])
+    async def esearch(request: Request):
+        failure = await inject("esearch")
+        if failure is not None:
+            return failure
+
+        params = await params_of(request)
+        term = params.get("term", "")
+        retmax = int(params.get("retmax", 20))
+        seed = _term_hash(term)
+        zero = (seed % 10000) / 10000 < config.zero_result_rate
+        ids = [] if zero or not term.strip() else fixture_pmids(retmax, seed)
+        return {
+            "header": {"type": "esearch", "version": "0.3"},
+            "esearchresult": {
+                "count": str(len(ids) * 25),
+                "retmax": str(len(ids)),
+                "retstart": "0",
+                "idlist": ids,
+                "querytranslation": term,
+            }
+        }
+
+    @app.api_route(f"{EUTILS_PATH}/efetch.fcgi", methods=["GET", "POST"])
+    async def efetch(request: Request):
+        failure = await inject("efetch")
+        if failure is not None:
+            return failure
+
+        params = await params_of(request)
+        pmids = [pmid for pmid in params.get("id", "").split(",") if pmid.strip().isdigit()]
+        return Response(build_efetch_payload(pmids), media_type="text/xml")
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.requests
+
+    return app
+
+
+# =============================================================================
+# BACKGROUND SERVING
+# =============================================================================
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_background(app, host: str = "127.0.0.1", port: int = 0) -> Tuple[uvicorn.Server, str]:
+    """
+    Run an ASGI app with uvicorn on a daemon thread (loopback only) and wait
+    until it accepts connections. Returns the server (set .should_exit to stop)
+    and its base URL.
+    """
+    port = port or free_port(host)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError(f"Server on {host}:{port} failed to start")
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--zero-result-rate", type=float, default=0.0, help="fraction of terms with no hits")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeEutilsConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        zero_result_rate=args.zero_result_rate,
+        seed=args.seed
+    )
+    print(f"Fake E-utilities at http://{args.host}:{args.port}{EUTILS_PATH}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
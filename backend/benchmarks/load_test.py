@@ -0,0 +1,226 @@
+"""
+Load Test - Offline Throughput and Tail Latency for the Chat Pipeline
+Drives process_wellness_query (in-process) and the FastAPI app (/chat over
+loopback HTTP) at several concurrency levels and reports p50/p95/p99 latency
+and requests/sec. NCBI is replaced by the fake E-utilities server and Gemini
+by the stub chat model, so no network access is needed.
+
+Caches are disabled by default so every request runs the full graph; pass
+--warm-cache to measure the cached path instead.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --target app --concurrency 1,16,64 --requests 200
+    python benchmarks/load_test.py --eutils-latency-ms 300 --error-rate 0.05 --tokens-per-second 40
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_eutils import EUTILS_PATH, FakeEutilsConfig, create_app, serve_in_background  # noqa: E402
+from stub_llm import install_stub_llm  # noqa: E402
+
+
+QUESTIONS = [
+    "What helps with sleep?",
+    "Is turmeric good for inflammation?",
+    "How much vitamin D do I need?",
+    "Does exercise help anxiety?",
+    "What are the benefits of omega-3?",
+    "Is coffee bad for your heart?",
+    "How to lower cholesterol naturally?",
+    "What causes headaches?",
+    "Does magnesium improve sleep quality?",
+    "Is intermittent fasting healthy?",
+    "Can meditation reduce blood pressure?",
+    "What foods support gut health?",
+]
+
+CACHE_PREFIXES = ("ARTICLE_CACHE", "QUERY_CACHE", "ANSWER_CACHE")
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[rank]
+
+
+def question_for(i: int, repeat_questions: bool) -> str:
+    question = QUESTIONS[i % len(QUESTIONS)]
+    # A per-request suffix gives every request its own answer-cache key, so
+    # identical in-flight questions are not coalesced
+    return question if repeat_questions else f"{question} (request {i})"
+
+
+async def run_level(
+    call: Callable[[str], Awaitable[None]],
+    concurrency: int,
+    total: int,
+    repeat_questions: bool
+) -> dict:
+    """Issue `total` requests with at most `concurrency` in flight."""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                await call(question_for(i, repeat_questions))
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def print_results(target: str, results: List[dict]) -> None:
+    print(f"\n{target}")
+    print(f"{'conc':>5}  {'reqs':>5}  {'errors':>6}  {'req/s':>7}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}")
+    for r in results:
+        print(
+            f"{r['concurrency']:>5}  {r['requests']:>5}  {r['errors']:>6}  {r['rps']:>7.2f}  "
+            f"{r['p50'] * 1000:>8.0f}  {r['p95'] * 1000:>8.0f}  {r['p99'] * 1000:>8.0f}"
+        )
+
+
+# =============================================================================
+# TARGETS
+# =============================================================================
+
+def reset_caches() -> None:
+    """Empty every pipeline cache between concurrency levels."""
+    from search_agent import answer_cache, article_cache, query_cache
+
+    for cache in (article_cache, query_cache, answer_cache):
+        cache.clear()
+
+
+async def bench_pipeline(args, levels: List[int]) -> List[dict]:
+    from pubmed_client import close_eutils_client
+    from search_agent import process_wellness_query
+
+    async def call(question: str) -> None:
+        await process_wellness_query(question)
+
+    results = []
+    try:
+        for concurrency in levels:
+            reset_caches()
+            results.append(await run_level(call, concurrency, args.requests, args.repeat_questions))
+    finally:
+        await close_eutils_client()
+    return results
+
+
+async def bench_app(args, levels: List[int]) -> List[dict]:
+    import httpx
+    from main import app
+
+    server, base_url = serve_in_background(app)
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+            async def call(question: str) -> None:
+                response = await client.post("/chat", json={"message": question})
+                response.raise_for_status()
+
+            results = []
+            for concurrency in levels:
+                reset_caches()
+                results.append(await run_level(call, concurrency, args.requests, args.repeat_questions))
+            return results
+    finally:
+        server.should_exit = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("pipeline", "app", "both"), default="both")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=48, help="requests per concurrency level")
+    parser.add_argument("--repeat-questions", action="store_true", help="reuse identical questions (exercises coalescing)")
+    parser.add_argument("--warm-cache", action="store_true", help="keep article/query/answer caches enabled")
+    parser.add_argument("--eutils-latency-ms", type=float, default=120.0)
+    parser.add_argument("--eutils-jitter-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of E-utilities 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of E-utilities 429s")
+    parser.add_argument("--zero-result-rate", type=float, default=0.0)
+    parser.add_argument("--ncbi-rate-limit", type=float, default=0.0,
+                        help="client-side NCBI requests/sec (default: unlimited against the fake server)")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="stub LLM output rate")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="stub LLM time to first token")
+    parser.add_argument("--answer-tokens", type=int, default=250, help="stub LLM answer length")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    fake_config = FakeEutilsConfig(
+        latency_ms=args.eutils_latency_ms,
+        jitter_ms=args.eutils_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        zero_result_rate=args.zero_result_rate,
+        seed=args.seed
+    )
+    fake_server, fake_url = serve_in_background(create_app(fake_config))
+
+    # Configuration is read at import time, so set it before importing the pipeline
+    os.environ["EUTILS_BASE_URL"] = fake_url + EUTILS_PATH
+    os.environ["NCBI_RATE_LIMIT"] = str(args.ncbi_rate_limit or 1_000_000)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.warm_cache:
+        os.environ["CACHE_DB_PATH"] = ""
+        for prefix in CACHE_PREFIXES:
+            os.environ[f"{prefix}_MAX_ENTRIES"] = "0"
+            os.environ[f"{prefix}_PATH"] = ""
+    install_stub_llm(args.tokens_per_second, args.first_token_ms, args.answer_tokens)
+
+    print(
+        f"fake E-utilities {args.eutils_latency_ms:.0f}±{args.eutils_jitter_ms:.0f} ms, "
+        f"errors {args.error_rate:.0%}, 429s {args.throttle_rate:.0%}; "
+        f"stub LLM {args.tokens_per_second:.0f} tok/s, TTFT {args.first_token_ms:.0f} ms, "
+        f"{args.answer_tokens} tokens; caches {'on' if args.warm_cache else 'off'}"
+    )
+    try:
+        if args.target in ("pipeline", "both"):
+            print_results("process_wellness_query", asyncio.run(bench_pipeline(args, levels)))
+        if args.target in ("app", "both"):
+            print_results("POST /chat (uvicorn, loopback)", asyncio.run(bench_app(args, levels)))
+    finally:
+        fake_server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark Payloads - efetch XML Built from Recorded Fixtures
+Shared by the parser benchmark and the fake E-utilities server: articles are
+taken from benchmarks/fixtures/efetch_*.xml and renumbered with the requested
+PMIDs, so any PMID can be served offline.
+"""
+
+import glob
+import os
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SAMPLE_FIXTURE = os.path.join(FIXTURES_DIR, "efetch_sample.xml")
+
+_ARTICLE_RE = re.compile(rb"<PubmedArticle>.*?</PubmedArticle>", re.S)
+# The citation's own PMID is the first one in the article
+_PMID_RE = re.compile(rb"<PMID Version=\"1\">\d+</PMID>")
+
+
+@lru_cache(maxsize=None)
+def load_fixture_articles() -> Tuple[bytes, Tuple[bytes, ...]]:
+    """
+    Return the efetch XML header and every <PubmedArticle> block found in the
+    fixture files (efetch_sample.xml plus any recorded efetch_<N>.xml).
+    """
+    with open(SAMPLE_FIXTURE, "rb") as f:
+        sample = f.read()
+    head = sample[:sample.index(b"<PubmedArticle>")]
+
+    articles = []
+    seen = set()
+    for path in [SAMPLE_FIXTURE] + sorted(set(glob.glob(os.path.join(FIXTURES_DIR, "efetch_*.xml"))) - {SAMPLE_FIXTURE}):
+        with open(path, "rb") as f:
+            for article in _ARTICLE_RE.findall(f.read()):
+                if article not in seen:
+                    seen.add(article)
+                    articles.append(article)
+    return head, tuple(articles)
+
+
+def renumber(article: bytes, pmid: str) -> bytes:
+    """Replace the citation PMID of one <PubmedArticle> block."""
+    return _PMID_RE.sub(b"<PMID Version=\"1\">" + pmid.encode() + b"</PMID>", article, count=1)
+
+
+def build_efetch_payload(pmids: Iterable[str]) -> bytes:
+    """efetch response for the given PMIDs, each mapped onto a fixture article."""
+    head, articles = load_fixture_articles()
+    body = [renumber(articles[int(pmid) % len(articles)], pmid) for pmid in pmids]
+    return head + b"\n".join(body) + b"\n</PubmedArticleSet>\n"
+
+
+def synthesize_payload(size: int, first_pmid: int = 40000000) -> bytes:
+    """Build an efetch payload of `size` articles from the sample fixture."""
+    return build_efetch_payload(str(first_pmid + i) for i in range(size))
+
+
+def fixture_pmids(count: int, seed: int, base: int = 40000000, span: int = 100000) -> List[str]:
+    """Deterministic pseudo-random PMIDs for a search term's hash."""
+    return [str(base + (seed * 7919 + i * 104729) % span) for i in range(count)]
@@ -0,0 +1,136 @@
+"""
+Stub Chat Model - Offline Stand-in for ChatGoogleGenerativeAI
+A LangChain chat model that answers without any network call, with a
+configurable time-to-first-token and output token rate. Installed into the
+graph through llm_clients.set_llm_factory, so every node's get_llm() returns it.
+
+Query-enhancement prompts get a short keyword query back (one per line when
+several variants are requested); every other prompt gets a canned answer of
+`answer_tokens` words, capped by max_output_tokens.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+import llm_clients  # noqa: E402
+
+
+_VARIANTS_RE = re.compile(r"Convert this to (\d+) different PubMed search queries.*?:\s*(.*)$", re.S)
+_QUERY_RE = re.compile(r"Convert this to a PubMed search query:\s*(.*)$", re.S)
+_PMID_RE = re.compile(r"PMID: (\d+)")
+_WORD_RE = re.compile(r"[A-Za-z0-9-]{4,}")
+
+_ANSWER_WORDS = (
+    "Research suggests that consistent habits matter more than any single intervention. "
+    "Several randomized trials report modest but meaningful improvements, although study "
+    "populations were small and follow-up periods were short. Talk to a healthcare "
+    "provider before making significant changes, especially if you take medication."
+).split()
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that fabricates responses at a fixed token rate."""
+
+    tokens_per_second: float = 80.0
+    first_token_ms: float = 300.0
+    answer_tokens: int = 250
+    max_output_tokens: Optional[int] = None
+    model: str = "stub"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _response_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = str(messages[-1].content) if messages else ""
+
+        match = _VARIANTS_RE.search(prompt)
+        if match:
+            words = _WORD_RE.findall(match.group(2))[:4] or ["health"]
+            count = int(match.group(1))
+            lines = [" AND ".join(words[:max(1, len(words) - i)]) for i in range(count)]
+            return ["\n".join(lines)]
+        match = _QUERY_RE.search(prompt)
+        if match:
+            words = _WORD_RE.findall(match.group(1))[:3] or ["health"]
+            return [" AND ".join(words)]
+
+        limit = self.answer_tokens
+        if self.max_output_tokens:
+            limit = min(limit, self.max_output_tokens)
+        citations = _PMID_RE.findall(" ".join(str(message.content) for message in messages))[:3]
+        tokens = [_ANSWER_WORDS[i % len(_ANSWER_WORDS)] + " " for i in range(limit)]
+        if citations and tokens:
+            tokens[-1] = "".join(f"[PMID: {pmid}] " for pmid in citations)
+        return tokens
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str]) -> dict:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": prompt_tokens, "output_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    def _delay(self, tokens: List[str]) -> float:
+        return self.first_token_ms / 1000 + len(tokens) / self.tokens_per_second
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._response_tokens(messages)
+        time.sleep(self._delay(tokens))
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._response_tokens(messages)
+        await asyncio.sleep(self._delay(tokens))
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._response_tokens(messages)
+        time.sleep(self.first_token_ms / 1000)
+        for token in tokens:
+            time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._response_tokens(messages)
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for token in tokens:
+            await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+
+def install_stub_llm(tokens_per_second: float = 80.0, first_token_ms: float = 300.0, answer_tokens: int = 250) -> None:
+    """Route every get_llm() call to a StubChatModel with the given speed."""
+    def factory(model_name: str, temperature: Optional[float], max_output_tokens: Optional[int]) -> StubChatModel:
+        return StubChatModel(
+            tokens_per_second=tokens_per_second,
+            first_token_ms=first_token_ms,
+            answer_tokens=answer_tokens,
+            max_output_tokens=max_output_tokens,
+            model=model_name
+        )
+
+    llm_clients.set_llm_factory(factory)
@@ -0,0 +1,444 @@
+"""
+Caching - In-process LRU and On-disk SQLite Tiers
+Generic TTL + size-bounded caches used by the RAG pipeline. A TieredCache puts a
+per-process LRU in front of an optional SQLite file that is shared by every
+worker on the host; SingleFlight and SharedFlight coalesce identical work
+within and across workers.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from config import cache_db_path, data_path, env_int, env_float, env_str
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# IN-PROCESS LRU TIER
+# =============================================================================
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with a per-entry time-to-live.
+    Least recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if over capacity."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# =============================================================================
+# ON-DISK SQLITE TIER
+# =============================================================================
+
+class SQLiteStore:
+    """
+    Base for tables in a SQLite file shared by worker processes. The file,
+    its directory and the tables are created on first use rather than at
+    construction, so building a store (e.g. at import) touches no disk.
+    """
+
+    path: str
+    _created = False
+    _schema_lock = threading.Lock()
+
+    def _schema(self) -> Iterable[str]:
+        """CREATE statements run once before the first query."""
+        return ()
+
+    def _create(self) -> None:
+        with self._schema_lock:
+            if self._created:
+                return
+            directory = os.path.dirname(self.path)
+            try:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                raise sqlite3.OperationalError(f"cannot create {directory}: {e}") from e
+            with sqlite3.connect(self.path, timeout=5.0) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                for statement in self._schema():
+                    conn.execute(statement)
+            self._created = True
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per operation keeps this safe across threads
+        if not self._created:
+            self._create()
+        return sqlite3.connect(self.path, timeout=5.0)
+
+
+class SQLiteCache(SQLiteStore):
+    """
+    JSON-valued key/value cache stored in a SQLite file.
+    Several caches can share one file by using different namespaces (tables).
+    WAL mode lets multiple worker processes read and write concurrently.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.table = f"cache_{namespace}"
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+    def _schema(self) -> Iterable[str]:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, expires_at REAL NOT NULL)",
+            f"CREATE INDEX IF NOT EXISTS {self.table}_stored_at ON {self.table} (stored_at)",
+        )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return {key: value} for every key that is present and not expired."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} "
+                f"WHERE key IN ({placeholders}) AND expires_at >= ?",
+                (*keys, now)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Store several values and evict expired / oldest rows beyond max_entries."""
+        if not items:
+            return
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        rows = [(key, json.dumps(value), now, now + ttl) for key, value in items.items()]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+# =============================================================================
+# TIERED CACHE
+# =============================================================================
+
+class TieredCache:
+    """
+    In-process LRU in front of an optional shared SQLite tier.
+    Disk hits are promoted into memory. Hit/miss counters are kept per process.
+    """
+
+    def __init__(self, name: str, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _count(self, field: str, amount: int = 1) -> None:
+        if amount:
+            with self._lock:
+                self._stats[field] += amount
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a single cached value, or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return {key: value} for every cached key, checking memory then disk."""
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        self._count("memory_hits", len(found))
+
+        if missing and self.disk is not None:
+            try:
+                disk_found = self.disk.get_many(missing)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk read failed: %s", self.name, e)
+                disk_found = {}
+            for key, value in disk_found.items():
+                self.memory.set(key, value)
+            found.update(disk_found)
+            self._count("disk_hits", len(disk_found))
+            missing = [key for key in missing if key not in disk_found]
+
+        self._count("misses", len(missing))
+        return found
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Like get(), but without touching the hit/miss counters (for polling)."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                value = self.disk.get_many([key]).get(key)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk read failed: %s", self.name, e)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a single value in both tiers."""
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """Store several values in both tiers."""
+        for key, value in items.items():
+            self.memory.set(key, value)
+        if items and self.disk is not None:
+            try:
+                self.disk.set_many(items)
+            except sqlite3.Error as e:
+                logger.warning("%s cache disk write failed: %s", self.name, e)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        stats["memory_entries"] = len(self.memory)
+        stats["memory_max_entries"] = self.memory.max_entries
+        if self.disk is not None:
+            try:
+                stats["disk_entries"] = len(self.disk)
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+            stats["disk_max_entries"] = self.disk.max_entries
+        return stats
+
+
+# =============================================================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# =============================================================================
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the work,
+    later callers await the same in-flight result instead of repeating it.
+    The shared task is shielded, so one caller cancelling does not cancel the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        """The task in flight for key, starting fn() if there is none, and whether this call started it."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task, False
+        self.executions += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task, True
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the execution already in flight for it."""
+        task, _ = self.start(key, fn)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
+
+
+# =============================================================================
+# CROSS-PROCESS LEASES
+# =============================================================================
+
+class SharedFlight(SQLiteStore):
+    """
+    Cross-process counterpart of SingleFlight for workers sharing a SQLite file.
+    The worker that claims a key's lease runs the work; workers that find the
+    lease held elsewhere poll `lookup` (normally the shared cache tier) for the
+    result instead of repeating it, and claim the lease themselves if it is
+    released without a result. Leases expire after lease_seconds, so a crashed
+    owner only delays the others.
+    """
+
+    def __init__(self, path: str, namespace: str, lease_seconds: float = 60.0, poll_seconds: float = 0.1):
+        self.path = path
+        self.table = f"lease_{namespace}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.executions = 0
+        self.joined = 0
+
+    def _schema(self) -> Iterable[str]:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)",
+        )
+
+    def _claim(self, key: str) -> bool:
+        """Take the lease for key unless another live owner holds it."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND expires_at < ?", (key, now))
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease_seconds)
+            )
+            row = conn.execute(f"SELECT owner FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == self.owner
+
+    def _held(self, key: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def _release(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND owner = ?", (key, self.owner))
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], lookup: Callable[[], Optional[Any]]) -> Any:
+        """Run fn() under key's lease, or wait for the lease holder's result via lookup()."""
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self._claim, key)
+            except sqlite3.Error as e:
+                logger.warning("Lease store unavailable, running %s locally: %s", self.table, e)
+                return await fn()
+
+            if claimed:
+                self.executions += 1
+                try:
+                    return await fn()
+                finally:
+                    try:
+                        await asyncio.to_thread(self._release, key)
+                    except sqlite3.Error as e:
+                        logger.warning("Could not release %s lease: %s", self.table, e)
+
+            while True:
+                await asyncio.sleep(self.poll_seconds)
+                value = await asyncio.to_thread(lookup)
+                if value is not None:
+                    self.joined += 1
+                    return value
+                if not await asyncio.to_thread(self._held, key):
+                    # Released without a stored result (failed or uncacheable): run it here
+                    break
+
+    def stats(self) -> dict:
+        return {"executions": self.executions, "joined": self.joined}
+
+
+def build_shared_flight(namespace: str, path: str, lease_seconds: float) -> Optional[SharedFlight]:
+    """Build a SharedFlight on path (opened on first use), or None when path is empty."""
+    return SharedFlight(path, namespace, lease_seconds) if path else None
+
+
+def build_tiered_cache(
+    name: str,
+    prefix: str,
+    memory_max_entries: int,
+    disk_max_entries: int,
+    ttl_seconds: float
+) -> TieredCache:
+    """
+    Build a TieredCache configured from `<PREFIX>_*` environment variables.
+
+    Environment variables:
+        <PREFIX>_MAX_ENTRIES: In-process LRU capacity
+        <PREFIX>_DISK_MAX_ENTRIES: SQLite tier capacity
+        <PREFIX>_TTL: Entry time-to-live in seconds
+        <PREFIX>_PATH: SQLite file for the shared tier; empty disables it
+            (defaults to CACHE_DB_PATH, i.e. data/cache.sqlite3). Relative
+            paths are resolved against the backend directory; the file is
+            created on first use.
+    """
+    ttl = env_float(f"{prefix}_TTL", ttl_seconds)
+    memory = LRUCache(env_int(f"{prefix}_MAX_ENTRIES", memory_max_entries), ttl)
+
+    path = data_path(env_str(f"{prefix}_PATH", cache_db_path()))
+    disk = SQLiteCache(path, name, env_int(f"{prefix}_DISK_MAX_ENTRIES", disk_max_entries), ttl) if path else None
+    return TieredCache(name, memory, disk)
@@ -0,0 +1,118 @@
+"""
+Configuration Helpers - Typed Environment Variable Access and Logging Setup
+Small helpers shared by backend modules that read tuning knobs from the environment.
+"""
+
+import json
+import logging
+import os
+from typing import Optional
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a string environment variable, falling back to a default."""
+    value = os.getenv(name)
+    return value if value is not None else default
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to a default."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to a default."""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean environment variable ("1", "true", "yes", "on" are truthy)."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def data_path(path: str) -> str:
+    """Resolve a relative data path against the backend directory (empty stays empty)."""
+    return os.path.join(BACKEND_DIR, path) if path else path
+
+
+def cache_db_path() -> str:
+    """Read the SQLite file of the shared cache tiers (CACHE_DB_PATH, default data/cache.sqlite3)."""
+    return data_path(env_str("CACHE_DB_PATH", "data/cache.sqlite3"))
+
+
+# =============================================================================
+# MULTI-WORKER SERVING
+# =============================================================================
+
+def worker_count() -> int:
+    """Read the uvicorn worker count (WEB_CONCURRENCY, default 1; 0 means one per CPU core)."""
+    workers = env_int("WEB_CONCURRENCY", 1)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def shared_state_path() -> str:
+    """Read the SQLite file shared by workers (SHARED_STATE_PATH, default CACHE_DB_PATH; empty for one worker)."""
+    if worker_count() <= 1:
+        return ""
+    return data_path(env_str("SHARED_STATE_PATH", cache_db_path()) or "")
+
+
+# =============================================================================
+# FULL-TEXT INDEXING
+# =============================================================================
+
+# Function words left out of the full-text indexes (the local PubMed index and
+# the site-article index); query words among them match everything
+INDEX_STOP_WORDS = frozenset({
+    'the', 'of', 'and', 'in', 'to', 'for', 'with', 'on', 'by', 'an', 'as', 'at',
+    'is', 'are', 'was', 'were', 'be', 'been', 'or', 'from', 'that', 'this', 'it'
+})
+
+
+# =============================================================================
+# LOGGING
+# =============================================================================
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per log line, including any `extra=` fields."""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """
+    Configure root logging from the environment.
+
+    Environment variables:
+        LOG_LEVEL: DEBUG, INFO (default), WARNING or ERROR
+        LOG_FORMAT: "text" (default) or "json" for structured one-line records
+    """
+    handler = logging.StreamHandler()
+    if env_str("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(env_str("LOG_LEVEL", "INFO").upper())
@@ -0,0 +1,153 @@
+"""
+Context Builder - Token-budgeted Research Context for Generation
+Assembles the article context for generate_research_node. When the full
+abstracts exceed the token budget, keeps the sentences most relevant to the
+question (with their abstract section labels) and drops near-duplicate
+sentences across articles.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from reranker import bm25_scores, tokenize
+
+
+# Rough characters-per-token ratio for English text with Gemini tokenizers
+CHARS_PER_TOKEN = 4
+# Sentences whose token sets overlap at least this much are treated as duplicates
+DUPLICATE_JACCARD = 0.8
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+# "BACKGROUND: ...", "Methods and results: ..." as written by parse_pubmed_xml
+_LABEL_RE = re.compile(r"^([A-Z][A-Za-z0-9 /&,()-]{1,48}):\s+(.*)$", re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting and prompt-size reporting."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_article(article: dict, abstract: Optional[str] = None) -> str:
+    """Format one article block for the LLM prompt."""
+    abstract = article['content'] if abstract is None else abstract
+    # In-house articles (site_articles) have no PMID and are not cited as sources
+    label = f"Total Life Daily article: {article['url']}" if article.get("source") == "site" else f"PMID: {article['id']}"
+    return (
+        f"{label}\nTitle: {article['title']}\nAuthors: {article.get('authors', 'Unknown')}\n"
+        f"Journal: {article.get('journal', 'Unknown')}\nYear: {article.get('year', 'Unknown')}\nAbstract: {abstract}"
+    )
+
+
+def split_sections(content: str) -> List[Tuple[str, str]]:
+    """
+    Split an abstract into (section label, sentence) pairs.
+    Sentences inherit the most recent "LABEL:" prefix; unlabeled abstracts get "".
+    """
+    units = []
+    label = ""
+    for sentence in _SENTENCE_SPLIT_RE.split(content.strip()):
+        match = _LABEL_RE.match(sentence)
+        if match:
+            label, sentence = match.group(1), match.group(2)
+        sentence = sentence.strip()
+        if sentence:
+            units.append((label, sentence))
+    return units
+
+
+def _join_sections(units: List[Tuple[str, str]]) -> str:
+    """Re-join (label, sentence) pairs, writing each label once per run."""
+    parts = []
+    current = None
+    for label, sentence in units:
+        if label and label != current:
+            parts.append(f"{label}: {sentence}")
+        else:
+            parts.append(sentence)
+        current = label
+    return " ".join(parts)
+
+
+def build_context(
+    question: str,
+    articles: List[dict],
+    token_budget: int,
+    stop_words: Iterable[str] = ()
+) -> Tuple[str, dict]:
+    """
+    Build the research context text within token_budget.
+
+    Returns the context text and size stats (tokens/sentences before and after,
+    duplicates dropped). If the full context fits and has no duplicate
+    sentences, it is returned unchanged.
+    """
+    full_text = "\n\n".join(format_article(article) for article in articles)
+    stats = {
+        "articles": len(articles),
+        "budget": token_budget,
+        "tokens_before": estimate_tokens(full_text),
+        "tokens_after": estimate_tokens(full_text),
+        "sentences_before": 0,
+        "sentences_after": 0,
+        "duplicates_dropped": 0,
+    }
+
+    # (article index, position, label, sentence) for every sentence in the batch
+    units = [
+        (i, position, label, sentence)
+        for i, article in enumerate(articles)
+        for position, (label, sentence) in enumerate(split_sections(article.get("content") or ""))
+    ]
+    stats["sentences_before"] = stats["sentences_after"] = len(units)
+    if not units:
+        return full_text, stats
+
+    scores = bm25_scores(question, [unit[3] for unit in units], stop_words)
+    # Best first; ties favour earlier articles and earlier sentences
+    order = sorted(range(len(units)), key=lambda u: (-scores[u], units[u][0], units[u][1]))
+
+    # Drop near-duplicate sentences, keeping the higher-scoring copy
+    token_sets = [set(tokenize(unit[3], stop_words)) for unit in units]
+    kept = []
+    for u in order:
+        tokens = token_sets[u]
+        duplicate = any(
+            tokens and len(tokens & token_sets[k]) / len(tokens | token_sets[k]) >= DUPLICATE_JACCARD
+            for k in kept
+        )
+        if duplicate:
+            stats["duplicates_dropped"] += 1
+        else:
+            kept.append(u)
+
+    if stats["tokens_before"] <= token_budget and not stats["duplicates_dropped"]:
+        return full_text, stats
+
+    # Fixed cost: metadata headers plus separators
+    remaining = token_budget - sum(estimate_tokens(format_article(article, "")) for article in articles)
+    remaining -= estimate_tokens("\n\n") * max(len(articles) - 1, 0)
+    sentence_tokens = [estimate_tokens(unit[3]) + 1 for unit in units]
+
+    # Every article keeps its best sentence so it can still be cited, then fill by score
+    selected = set()
+    first_per_article = {}
+    for u in kept:
+        first_per_article.setdefault(units[u][0], u)
+    for u in first_per_article.values():
+        selected.add(u)
+        remaining -= sentence_tokens[u]
+    for u in kept:
+        if u not in selected and sentence_tokens[u] <= remaining:
+            selected.add(u)
+            remaining -= sentence_tokens[u]
+
+    blocks = []
+    for i, article in enumerate(articles):
+        # An article whose sentences were all duplicates keeps only its metadata
+        chosen = [(units[u][2], units[u][3]) for u in sorted(selected) if units[u][0] == i]
+        blocks.append(format_article(article, _join_sections(chosen)))
+
+    context_text = "\n\n".join(blocks)
+    stats["tokens_after"] = estimate_tokens(context_text)
+    stats["sentences_after"] = len(selected)
+    return context_text, stats
@@ -0,0 +1,111 @@
+"""
+PubMed Ingest - Build the Local PubMed Index
+Streams PubMed baseline and update files (pubmed25n0001.xml.gz ...) through
+the same parser the pipeline uses for efetch responses and writes the
+on-disk index read by local_index.LocalPubMedIndex.
+
+Files are applied in name order, so update files that revise or delete
+citations (<DeleteCitation>) override the baseline. Each run rebuilds the
+index into a temporary directory and swaps it in when complete, so a running
+server keeps reading the previous index until it restarts.
+
+Usage (from the backend directory):
+    python ingest_pubmed.py /data/pubmed/baseline /data/pubmed/updatefiles
+    python ingest_pubmed.py "downloads/pubmed25n00*.xml.gz" --output data/pubmed_index
+"""
+
+import argparse
+import glob
+import gzip
+import logging
+import os
+import shutil
+import time
+from typing import Iterable, List
+
+from config import data_path, env_str
+from local_index import IndexWriter
+from pubmed_parser import iter_pubmed_records
+
+logger = logging.getLogger(__name__)
+
+
+XML_SUFFIXES = (".xml", ".xml.gz")
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Files named by paths, directories and glob patterns, in name order per input."""
+    files = []
+    for source in inputs:
+        if os.path.isdir(source):
+            matches = [
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.endswith(XML_SUFFIXES)
+            ]
+        else:
+            matches = glob.glob(source)
+        if not matches:
+            raise SystemExit(f"No PubMed XML files found for {source!r}")
+        files.extend(sorted(matches))
+    return files
+
+
+def ingest(files: List[str], output: str, segment_docs: int) -> dict:
+    """Index every file into output (replacing it); returns the index metadata."""
+    staging = output.rstrip(os.sep) + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    writer = IndexWriter(staging, segment_docs=segment_docs)
+
+    for path in files:
+        start = time.perf_counter()
+        added = deleted = 0
+        with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as source:
+            for kind, record in iter_pubmed_records(source):
+                if kind == "article":
+                    writer.add(record)
+                    added += 1
+                else:
+                    writer.delete(int(record))
+                    deleted += 1
+        logger.info(
+            "%s: %d articles, %d deletions in %.1fs",
+            os.path.basename(path), added, deleted, time.perf_counter() - start
+        )
+
+    meta = writer.close()
+    previous = output.rstrip(os.sep) + ".previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(output):
+        os.rename(output, previous)
+    os.rename(staging, output)
+    shutil.rmtree(previous, ignore_errors=True)
+    return meta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="PubMed XML files (.xml/.xml.gz), directories or glob patterns")
+    parser.add_argument(
+        "--output", default=data_path(env_str("LOCAL_INDEX_PATH", "data/pubmed_index")),
+        help="index directory (default: LOCAL_INDEX_PATH or data/pubmed_index)"
+    )
+    parser.add_argument(
+        "--segment-docs", type=int, default=200_000,
+        help="articles buffered in memory before a postings segment is flushed"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    files = expand_inputs(args.inputs)
+    start = time.perf_counter()
+    meta = ingest(files, args.output, args.segment_docs)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Indexed %d articles (%d superseded or deleted), %d terms, %d postings from %d files in %.1fs -> %s",
+        meta["articles"], meta["documents"] - meta["articles"], meta["terms"], meta["postings"],
+        len(files), elapsed, args.output
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+LLM Client Registry - Process-wide Gemini Clients
+Chat model clients are created once per model/config and reused by every graph
+node, instead of being rebuilt on each call.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from metrics import LLM_TOKENS_TOTAL, UPSTREAM_SECONDS
+
+if TYPE_CHECKING:
+    # langchain_google_genai is slow to import; it is loaded on the first get_llm() call
+    from langchain_core.messages import BaseMessage
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+DEFAULT_GEMINI_MODEL = "gemini-2.0-flash-exp"
+
+_registry: Dict[Tuple, "ChatGoogleGenerativeAI"] = {}
+_registry_lock = threading.Lock()
+
+# Optional replacement constructor (e.g. a local stub model for offline benchmarks)
+_llm_factory: Optional[Callable[..., object]] = None
+
+
+def set_llm_factory(factory: Optional[Callable[..., object]]) -> None:
+    """
+    Replace the chat model constructor used by get_llm, or restore Gemini with None.
+    The factory is called as factory(model_name, temperature, max_output_tokens)
+    and must return a LangChain chat model. Cached clients are dropped.
+    """
+    global _llm_factory
+    with _registry_lock:
+        _llm_factory = factory
+        _registry.clear()
+
+
+def get_llm(
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None
+) -> "ChatGoogleGenerativeAI":
+    """
+    Return the shared chat model client for the given model/config.
+    The client is constructed on first use and cached for the life of the process.
+
+    Args:
+        model_name: Gemini model name (defaults to GEMINI_MODEL env var)
+        temperature: Optional sampling temperature
+        max_output_tokens: Optional cap on generated tokens
+    """
+    model_name = model_name or os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
+    api_key = os.getenv("GOOGLE_API_KEY")
+
+    if not api_key and _llm_factory is None:
+        raise ValueError("GOOGLE_API_KEY environment variable is not set")
+
+    key = (model_name, temperature, max_output_tokens, api_key)
+    llm = _registry.get(key)
+    if llm is not None:
+        return llm
+
+    with _registry_lock:
+        llm = _registry.get(key)
+        if llm is None and _llm_factory is not None:
+            llm = _registry[key] = _llm_factory(model_name, temperature, max_output_tokens)
+        elif llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            if max_output_tokens is not None:
+                kwargs["max_output_tokens"] = max_output_tokens
+            llm = ChatGoogleGenerativeAI(
+                model=model_name,
+                google_api_key=api_key,
+                transport="rest",  # Use REST API instead of gRPC to avoid auth scope issues
+                **kwargs
+            )
+            _registry[key] = llm
+    return llm
+
+
+def clear_llm_registry() -> None:
+    """Drop all cached clients (e.g. after rotating GOOGLE_API_KEY)."""
+    with _registry_lock:
+        _registry.clear()
+
+
+async def ainvoke_llm(llm, messages: List["BaseMessage"], operation: str, timeout: Optional[float] = None):
+    """
+    Call llm.ainvoke with latency and token-count metrics recorded under
+    `operation` (the graph node making the call). With a timeout, the call is
+    cancelled after that many seconds and asyncio.TimeoutError is raised.
+    """
+    start = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(llm.ainvoke(messages), timeout)
+    except asyncio.TimeoutError:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="gemini", operation=operation, outcome="timeout")
+        raise
+    except Exception:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="gemini", operation=operation, outcome="error")
+        raise
+    UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="gemini", operation=operation, outcome="ok")
+
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        LLM_TOKENS_TOTAL.inc(usage.get("input_tokens", 0), node=operation, kind="prompt")
+        LLM_TOKENS_TOTAL.inc(usage.get("output_tokens", 0), node=operation, kind="response")
+    return response
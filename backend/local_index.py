@@ -0,0 +1,602 @@
+"""
+Local PubMed Index - On-disk Inverted Index and Memory-mapped Article Store
+An offline retrieval backend. PubMed baseline/update files are ingested once
+(see ingest_pubmed.py) into a directory of flat binary files that are
+memory-mapped at query time, so Boolean searches and article lookups take
+milliseconds and need no network.
+
+Index directory layout:
+    meta.json          format version, document/term/posting counts, average document length
+    vocab.txt          sorted terms, one per line
+    vocab_offsets.bin  int64[terms + 1]: byte offset of each term in vocab.txt
+    term_offsets.bin   int64[terms + 1]: each term's slice of the postings arrays
+    postings_docs.bin  uint32[postings]: document ids, ascending within a term
+    postings_tf.bin    uint16[postings]: term frequency (title tokens count twice)
+    docs.bin           DOC_DTYPE[documents]: pmid, article record offset/length, token count
+    deleted.bin        uint8[documents]: 1 for superseded or deleted citations
+    pmids.bin          int64[live articles]: sorted PMIDs, with
+    pmid_docs.bin      uint32[live articles]: the document id of each
+    articles.bin       zlib-compressed JSON article records
+"""
+
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import INDEX_STOP_WORDS, data_path, env_str
+from pubmed_parser import PUBMED_BASE_URL
+from reranker import BM25_B, BM25_K1, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+FORMAT_VERSION = 2
+
+DOC_DTYPE = np.dtype([("pmid", "<i8"), ("offset", "<i8"), ("length", "<u4"), ("doc_len", "<u4")])
+
+# Article fields kept in the store ("id" and "url" are rebuilt from the PMID)
+STORED_FIELDS = ("title", "content", "authors", "journal", "year")
+
+TITLE_WEIGHT = 2
+
+_MAX_TF = np.iinfo(np.uint16).max
+
+# Rows read at a time when merging the spilled PMID runs
+_MERGE_CHUNK = 1 << 16
+
+
+def document_terms(article: dict) -> Counter:
+    """Term frequencies of an article's title (weighted) and abstract."""
+    counts = Counter(tokenize(article.get("content") or "", INDEX_STOP_WORDS))
+    for term in tokenize(article.get("title") or "", INDEX_STOP_WORDS):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def _read_array(path: str, dtype) -> np.ndarray:
+    """Memory-map a flat binary array (empty files map to an empty array)."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _read_vocab(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def _iter_run(keys_path: str, values_path: str) -> Iterator[Tuple[int, int]]:
+    """(key, value) rows of a spilled pair of int64 arrays, read in chunks."""
+    keys = _read_array(keys_path, np.int64)
+    values = _read_array(values_path, np.int64)
+    for start in range(0, len(keys), _MERGE_CHUNK):
+        yield from zip(keys[start:start + _MERGE_CHUNK].tolist(), values[start:start + _MERGE_CHUNK].tolist())
+
+
+class _Vocabulary:
+    """
+    Sorted terms read from a memory-mapped vocab.txt through its byte offsets,
+    so looking a term up is a binary search rather than a dict of every term.
+    """
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, index: int) -> str:
+        # Each term is followed by a newline except the last
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return self._data[start:end].decode("utf-8").rstrip("\n")
+
+    def get(self, term: str) -> Optional[int]:
+        index = bisect.bisect_left(self, term)
+        return index if index < len(self) and self[index] == term else None
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+# =============================================================================
+# INDEX WRITER
+# =============================================================================
+
+class IndexWriter:
+    """
+    Builds an index directory from a stream of articles and deletions.
+
+    Postings, (PMID, document) pairs and deletions are accumulated in memory
+    for segment_docs documents at a time and flushed as sorted segments.
+    close() merges the segments term by term into the final postings files
+    and PMID by PMID into the lookup table, so memory is bounded by the
+    segment size rather than the corpus. A PMID that is added again (a
+    revised citation in an update file) supersedes its earlier document.
+    """
+
+    def __init__(self, path: str, segment_docs: int = 200_000):
+        self.path = path
+        self.segment_docs = segment_docs
+        os.makedirs(path, exist_ok=True)
+        self._segments_dir = os.path.join(path, "segments")
+        shutil.rmtree(self._segments_dir, ignore_errors=True)
+        os.makedirs(self._segments_dir)
+
+        self._articles = open(os.path.join(path, "articles.bin"), "wb")
+        self._docs = open(os.path.join(path, "docs.bin"), "wb")
+        self._offset = 0
+        self._pending_docs: List[Tuple[int, int, int, int]] = []
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._segments: List[str] = []
+        # Deletions as (pmid, documents added before it): they drop only earlier documents
+        self._pending_deletes: List[Tuple[int, int]] = []
+        self.documents = 0
+        self.articles = 0
+        self.deleted = 0
+        self._total_len = 0
+
+    def add(self, article: dict) -> None:
+        """Append one article dict (as produced by pubmed_parser)."""
+        pmid_text = str(article.get("id", ""))
+        if not pmid_text.isdigit():
+            return
+        pmid = int(pmid_text)
+
+        record = zlib.compress(json.dumps(
+            {field: article.get(field) for field in STORED_FIELDS}, separators=(",", ":")
+        ).encode("utf-8"))
+        self._articles.write(record)
+
+        doc_id = self.documents
+        terms = document_terms(article)
+        doc_len = sum(terms.values())
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = ([], [])
+            postings[0].append(doc_id)
+            postings[1].append(min(tf, _MAX_TF))
+
+        self._pending_docs.append((pmid, self._offset, len(record), doc_len))
+        self._offset += len(record)
+        self._total_len += doc_len
+        self.documents += 1
+        if len(self._pending_docs) >= self.segment_docs:
+            self._flush_segment()
+
+    def delete(self, pmid: int) -> None:
+        """Drop a citation (e.g. listed under <DeleteCitation> in an update file)."""
+        self._pending_deletes.append((int(pmid), self.documents))
+
+    def _flush_segment(self) -> None:
+        if not self._pending_docs and not self._pending_deletes:
+            return
+        segment = os.path.join(self._segments_dir, f"{len(self._segments):05d}")
+        os.makedirs(segment)
+
+        # The segment's PMIDs and deletions, sorted by PMID for the merge in close()
+        docs = np.array(self._pending_docs, dtype=DOC_DTYPE)
+        docs.tofile(self._docs)
+        doc_ids = np.arange(self.documents - len(docs), self.documents, dtype=np.int64)
+        order = np.argsort(docs["pmid"], kind="stable")
+        docs["pmid"][order].tofile(os.path.join(segment, "pmids.bin"))
+        doc_ids[order].tofile(os.path.join(segment, "pmid_docs.bin"))
+        deletes = np.array(sorted(self._pending_deletes), dtype=np.int64).reshape(-1, 2)
+        deletes[:, 0].tofile(os.path.join(segment, "deleted_pmids.bin"))
+        deletes[:, 1].tofile(os.path.join(segment, "deleted_before.bin"))
+        self._pending_docs = []
+        self._pending_deletes = []
+
+        terms = sorted(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        with open(os.path.join(segment, "postings_docs.bin"), "wb") as docs_file, \
+                open(os.path.join(segment, "postings_tf.bin"), "wb") as tf_file:
+            for i, term in enumerate(terms):
+                doc_ids, tfs = self._postings[term]
+                np.asarray(doc_ids, dtype=np.uint32).tofile(docs_file)
+                np.asarray(tfs, dtype=np.uint16).tofile(tf_file)
+                offsets[i + 1] = offsets[i] + len(doc_ids)
+        offsets.tofile(os.path.join(segment, "term_offsets.bin"))
+        with open(os.path.join(segment, "vocab.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        self._segments.append(segment)
+        self._postings = {}
+        logger.info("Flushed index segment %d (%d documents so far)", len(self._segments), self.documents)
+
+    def _merge_segments(self) -> Tuple[int, int]:
+        """Merge segment postings into the final files; returns (terms, postings)."""
+        segments = []
+        for segment in self._segments:
+            segments.append((
+                _read_vocab(os.path.join(segment, "vocab.txt")),
+                _read_array(os.path.join(segment, "term_offsets.bin"), np.int64),
+                _read_array(os.path.join(segment, "postings_docs.bin"), np.uint32),
+                _read_array(os.path.join(segment, "postings_tf.bin"), np.uint16),
+            ))
+
+        # Segments hold ascending document ranges, so appending a term's
+        # postings in segment order keeps them sorted
+        def segment_terms(index: int, vocab: List[str]):
+            for position, term in enumerate(vocab):
+                yield term, index, position
+
+        merged = heapq.merge(*(segment_terms(index, segment[0]) for index, segment in enumerate(segments)))
+        terms = 0
+        postings = 0
+        offsets = [0]
+        vocab_offsets = [0]
+        current = None
+        with open(os.path.join(self.path, "vocab.txt"), "wb") as vocab_file, \
+                open(os.path.join(self.path, "postings_docs.bin"), "wb") as docs_file, \
+                open(os.path.join(self.path, "postings_tf.bin"), "wb") as tf_file:
+            for term, index, position in merged:
+                if term != current:
+                    if current is not None:
+                        offsets.append(postings)
+                    line = (("\n" if terms else "") + term).encode("utf-8")
+                    vocab_file.write(line)
+                    vocab_offsets.append(vocab_offsets[-1] + len(line))
+                    current = term
+                    terms += 1
+                _, term_offsets, doc_ids, tfs = segments[index]
+                start, end = term_offsets[position], term_offsets[position + 1]
+                doc_ids[start:end].tofile(docs_file)
+                tfs[start:end].tofile(tf_file)
+                postings += int(end - start)
+            if current is not None:
+                offsets.append(postings)
+        np.asarray(offsets, dtype=np.int64).tofile(os.path.join(self.path, "term_offsets.bin"))
+        # Offsets point at each term's leading newline, except the first term's
+        vocab_offsets = np.asarray(vocab_offsets, dtype=np.int64)
+        vocab_offsets[1:-1] += 1
+        vocab_offsets.tofile(os.path.join(self.path, "vocab_offsets.bin"))
+        return terms, postings
+
+    def _merge_pmids(self) -> None:
+        """
+        Merge the segments' sorted PMID runs into pmids.bin/pmid_docs.bin and
+        mark superseded or deleted documents in deleted.bin. The latest
+        document of each PMID is live unless a later deletion names it.
+        """
+        def run(keys: str, values: str):
+            return heapq.merge(*(
+                _iter_run(os.path.join(segment, keys), os.path.join(segment, values))
+                for segment in self._segments
+            ))
+
+        deleted = np.memmap(os.path.join(self.path, "deleted.bin"), dtype=np.uint8, mode="w+", shape=(self.documents,)) \
+            if self.documents else None
+        deletes = run("deleted_pmids.bin", "deleted_before.bin")
+        pending_delete = next(deletes, None)
+        pmids: List[int] = []
+        doc_ids: List[int] = []
+        with open(os.path.join(self.path, "pmids.bin"), "wb") as pmids_file, \
+                open(os.path.join(self.path, "pmid_docs.bin"), "wb") as docs_file:
+            def flush() -> None:
+                np.asarray(pmids, dtype=np.int64).tofile(pmids_file)
+                np.asarray(doc_ids, dtype=np.uint32).tofile(docs_file)
+                pmids.clear()
+                doc_ids.clear()
+
+            # Runs are ordered by (pmid, document); a trailing None settles the last PMID
+            current, current_doc = None, None
+            for pmid, doc_id in itertools.chain(run("pmids.bin", "pmid_docs.bin"), [(None, None)]):
+                if pmid is not None and pmid == current:
+                    deleted[current_doc] = 1
+                    current_doc = doc_id
+                    continue
+                if current is not None:
+                    # The last deletion of this PMID decides whether its latest document survives
+                    deleted_before = -1
+                    while pending_delete is not None and pending_delete[0] <= current:
+                        if pending_delete[0] == current:
+                            deleted_before = max(deleted_before, pending_delete[1])
+                        pending_delete = next(deletes, None)
+                    if deleted_before > current_doc:
+                        deleted[current_doc] = 1
+                    else:
+                        pmids.append(current)
+                        doc_ids.append(current_doc)
+                        if len(pmids) >= _MERGE_CHUNK:
+                            flush()
+                current, current_doc = pmid, doc_id
+            flush()
+        if deleted is not None:
+            self.deleted = int(np.count_nonzero(deleted))
+            deleted.flush()
+            del deleted
+        else:
+            open(os.path.join(self.path, "deleted.bin"), "wb").close()
+        self.articles = self.documents - self.deleted
+
+    def close(self) -> dict:
+        """Flush, merge and write the lookup tables; returns the index metadata."""
+        self._flush_segment()
+        self._articles.close()
+        self._docs.close()
+        terms, postings = self._merge_segments()
+        self._merge_pmids()
+        shutil.rmtree(self._segments_dir, ignore_errors=True)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "documents": self.documents,
+            "articles": self.articles,
+            "deleted": self.deleted,
+            "terms": terms,
+            "postings": postings,
+            "avg_doc_len": self._total_len / self.documents if self.documents else 0.0,
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+# =============================================================================
+# BOOLEAN QUERY PARSER
+# =============================================================================
+
+# Quoted phrases, parentheses, field tags like [tiab] and bare words
+_QUERY_TOKEN_RE = re.compile(r'"[^"]*"|\(|\)|\[[^\]]*\]|[^\s()"\[\]]+')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def parse_query(query: str):
+    """
+    Parse a PubMed-style Boolean query into a tree of
+    ("terms", [words]) and (operator, left, right) tuples.
+
+    Like PubMed, operators are evaluated left to right without precedence
+    ("a OR b AND c" is "(a OR b) AND c"); adjacent words and quoted phrases
+    are ANDed together; field tags are ignored. Returns None for an empty query.
+    """
+    tokens = [token for token in _QUERY_TOKEN_RE.findall(query) if not token.startswith("[")]
+    position = 0
+
+    def operand():
+        nonlocal position
+        if position < len(tokens) and tokens[position] == "(":
+            position += 1
+            node = expression()
+            if position < len(tokens) and tokens[position] == ")":
+                position += 1
+            return node
+        words = []
+        while position < len(tokens) and tokens[position] not in _OPERATORS and tokens[position] not in "()":
+            words.append(tokens[position].strip('"'))
+            position += 1
+        return ("terms", words) if words else None
+
+    def expression():
+        nonlocal position
+        node = operand()
+        while position < len(tokens) and tokens[position] != ")":
+            token = tokens[position]
+            if token in _OPERATORS:
+                position += 1
+                right = operand()
+                if right is not None:
+                    if node is None:
+                        # A leading NOT excludes from everything
+                        node = ("NOT", ("terms", []), right) if token == "NOT" else right
+                    else:
+                        node = (token, node, right)
+            else:
+                # Implicit AND between a group and following words/groups
+                right = operand()
+                if right is None:
+                    position += 1
+                    continue
+                node = right if node is None else ("AND", node, right)
+        return node
+
+    nodes = []
+    while position < len(tokens):
+        node = expression()
+        if node is not None:
+            nodes.append(node)
+        position += 1  # skip a stray ")"
+    tree = None
+    for node in nodes:
+        tree = node if tree is None else ("AND", tree, node)
+    return tree
+
+
+# =============================================================================
+# INDEX READER AND QUERY ENGINE
+# =============================================================================
+
+class LocalPubMedIndex:
+    """
+    Read-only view of an index directory. Arrays and the vocabulary are
+    memory-mapped, so opening is cheap whatever the corpus size, and the OS page cache
+    keeps hot postings and articles in memory across worker processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format {self.meta.get('format_version')} in {path}")
+
+        self._terms = _Vocabulary(
+            os.path.join(path, "vocab.txt"), _read_array(os.path.join(path, "vocab_offsets.bin"), np.int64)
+        )
+        self._term_offsets = _read_array(os.path.join(path, "term_offsets.bin"), np.int64)
+        self._postings_docs = _read_array(os.path.join(path, "postings_docs.bin"), np.uint32)
+        self._postings_tf = _read_array(os.path.join(path, "postings_tf.bin"), np.uint16)
+        self._docs = _read_array(os.path.join(path, "docs.bin"), DOC_DTYPE)
+        self._deleted = _read_array(os.path.join(path, "deleted.bin"), np.uint8)
+        self._pmids = _read_array(os.path.join(path, "pmids.bin"), np.int64)
+        self._pmid_docs = _read_array(os.path.join(path, "pmid_docs.bin"), np.uint32)
+        self._doc_len = np.asarray(self._docs["doc_len"], dtype=np.float32) if len(self._docs) else np.zeros(0, np.float32)
+
+        self._articles_file = open(os.path.join(path, "articles.bin"), "rb")
+        size = os.fstat(self._articles_file.fileno()).st_size
+        self._articles = mmap.mmap(self._articles_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @property
+    def documents(self) -> int:
+        return len(self._docs)
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(document ids, term frequencies) for a term; empty if unknown."""
+        index = self._terms.get(term)
+        if index is None:
+            return np.zeros(0, np.uint32), np.zeros(0, np.uint16)
+        start, end = self._term_offsets[index], self._term_offsets[index + 1]
+        return self._postings_docs[start:end], self._postings_tf[start:end]
+
+    def _evaluate(self, node, positive: List[str], negated: bool = False) -> Optional[np.ndarray]:
+        """
+        Sorted matching document ids, or None when the node held only stop-words.
+        A stop-word operand drops out ("sleep OR the" is "sleep"), except left
+        of NOT, where it stands for every document.
+        """
+        if node[0] == "terms":
+            result = None
+            for word in node[1]:
+                for term in tokenize(word, INDEX_STOP_WORDS):
+                    if not negated:
+                        positive.append(term)
+                    docs = self.postings(term)[0]
+                    result = docs if result is None else np.intersect1d(result, docs, assume_unique=True)
+            return result
+
+        operator, left_node, right_node = node
+        left = self._evaluate(left_node, positive, negated)
+        right = self._evaluate(right_node, positive, negated or operator == "NOT")
+        if operator == "NOT":
+            if right is None:
+                return left
+            if left is None:
+                left = np.arange(self.documents, dtype=np.uint32)
+            return np.setdiff1d(left, right, assume_unique=True)
+        if left is None or right is None:
+            return right if left is None else left
+        if operator == "AND":
+            return np.intersect1d(left, right, assume_unique=True)
+        return np.union1d(left, right)
+
+    def _scores(self, candidates: np.ndarray, terms: Iterable[str]) -> np.ndarray:
+        """BM25 score of each candidate document for the query's positive terms."""
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        avg_doc_len = self.meta["avg_doc_len"] or 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[candidates] / avg_doc_len)
+        for term in set(terms):
+            docs, tfs = self.postings(term)
+            if not len(docs):
+                continue
+            positions = np.searchsorted(docs, candidates)
+            positions[positions == len(docs)] = 0
+            hit = docs[positions] == candidates
+            tf = tfs[positions[hit]].astype(np.float32)
+            idf = math.log(1 + (self.documents - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[hit] += idf * tf * (BM25_K1 + 1) / (tf + norm[hit])
+        return scores
+
+    def search(self, query: str, max_results: int = 5) -> List[str]:
+        """
+        PMIDs of the best-matching live articles for a Boolean query, ranked by
+        BM25 over the query's (non-negated) terms.
+        """
+        tree = parse_query(query)
+        if tree is None or not self.documents:
+            return []
+        positive: List[str] = []
+        candidates = self._evaluate(tree, positive)
+        if candidates is None:
+            return []
+        candidates = candidates[self._deleted[candidates] == 0]
+        if not len(candidates):
+            return []
+
+        # Ties go to the most recently ingested document (newer citations)
+        keys = self._scores(candidates, positive).astype(np.float64)
+        keys += candidates / (self.documents + 1.0) * 1e-6
+        if len(candidates) > max_results:
+            top = np.argpartition(-keys, max_results - 1)[:max_results]
+            candidates, keys = candidates[top], keys[top]
+        ranked = candidates[np.argsort(-keys)]
+        return [str(pmid) for pmid in self._docs["pmid"][ranked]]
+
+    def get_articles(self, pmids: Iterable[str]) -> Dict[str, dict]:
+        """Stored articles for the PMIDs that are in the index, keyed by PMID."""
+        wanted = [pmid for pmid in pmids if str(pmid).isdigit()]
+        if not wanted or not len(self._pmids):
+            return {}
+        keys = np.array([int(pmid) for pmid in wanted], dtype=np.int64)
+        positions = np.searchsorted(self._pmids, keys)
+        positions[positions == len(self._pmids)] = 0
+        found = {}
+        for pmid, key, position in zip(wanted, keys, positions):
+            if self._pmids[position] != key:
+                continue
+            doc = self._docs[self._pmid_docs[position]]
+            offset, length = int(doc["offset"]), int(doc["length"])
+            article = json.loads(zlib.decompress(self._articles[offset:offset + length]))
+            article["id"] = str(pmid)
+            article["url"] = f"{PUBMED_BASE_URL}/{pmid}"
+            found[str(pmid)] = article
+        return found
+
+    def stats(self) -> dict:
+        size = sum(
+            os.path.getsize(os.path.join(self.path, name))
+            for name in os.listdir(self.path) if os.path.isfile(os.path.join(self.path, name))
+        )
+        return {**self.meta, "path": self.path, "bytes": size}
+
+    def close(self) -> None:
+        self._terms.close()
+        if isinstance(self._articles, mmap.mmap):
+            self._articles.close()
+        self._articles_file.close()
+
+
+# The configured index (singleton), opened on first use
+_local_index: Optional[LocalPubMedIndex] = None
+_local_index_error: Optional[str] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalPubMedIndex]:
+    """
+    Open the index at LOCAL_INDEX_PATH (default data/pubmed_index) once.
+    Returns None if it is missing or unreadable, after logging why.
+    """
+    global _local_index, _local_index_error
+    if _local_index is not None or _local_index_error is not None:
+        return _local_index
+    with _local_index_lock:
+        if _local_index is None and _local_index_error is None:
+            path = data_path(env_str("LOCAL_INDEX_PATH", "data/pubmed_index"))
+            try:
+                _local_index = LocalPubMedIndex(path)
+                logger.info(
+                    "Opened local PubMed index %s (%d articles, %d terms)",
+                    path, _local_index.meta["articles"], _local_index.meta["terms"]
+                )
+            except (OSError, ValueError) as e:
+                _local_index_error = str(e)
+                logger.warning("Local PubMed index unavailable, using E-utilities: %s", e)
+    return _local_index
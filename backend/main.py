@@ -3,26 +3,160 @@ Wellness Chatbot Backend - FastAPI Server
 A health/wellness chatbot API that provides research-backed answers.
 """
 
-from typing import List
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Union
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.routing import Match
 
-from search_agent import process_wellness_query
-
-# Load environment variables from .env file
+# Load environment variables from .env file (before local modules read their config)
 load_dotenv()
 
+from config import configure_logging, env_bool, env_float, env_int, shared_state_path, worker_count
+
+configure_logging()
+
+from search_agent import (
+    BATCH_CONCURRENCY,
+    REQUEST_BUDGET_SECONDS,
+    ArticleMemo,
+    process_wellness_query,
+    process_wellness_batch,
+    stream_wellness_query,
+    article_cache,
+    query_cache,
+    answer_cache,
+    answer_flights,
+    answer_leases,
+    sessions,
+    efetch_batcher,
+    local_index,
+    is_warm,
+    warm_up
+)
+from site_articles import SITE_ARTICLES_REFRESH_SECONDS, site_index, site_source
+from related_articles import RELATED_ARTICLES_PATH, RELATED_REBUILD_GROWTH, load_related_articles
+from narration import close_narration_pipeline, open_narration_pipeline
+from admission import AdmissionRejected, AdmissionSlot, build_admission_controller
+from pubmed_client import open_eutils_client, close_eutils_client
+from metrics import REGISTRY, HTTP_REQUEST_SECONDS, REQUESTS_IN_FLIGHT, build_shared_metrics, render_families
+
+logger = logging.getLogger(__name__)
+
 
 # =============================================================================
 # FASTAPI APPLICATION
 # =============================================================================
 
+# Warm the pipeline in the background at startup (otherwise the first request does it)
+WARMUP_ON_STARTUP = env_bool("WARMUP_ON_STARTUP", True)
+
+# Background warm-up progress, reported by /ready
+warmup_status = {"status": "pending", "seconds": None, "error": None}
+
+# Cross-worker metric snapshots (None when serving with a single worker)
+shared_metrics = build_shared_metrics()
+METRICS_PUBLISH_SECONDS = env_float("METRICS_PUBLISH_SECONDS", 5.0)
+
+
+async def warm_up_pipeline() -> None:
+    """Import the LLM/graph libraries and compile the graph off the event loop."""
+    warmup_status["status"] = "warming"
+    start = time.perf_counter()
+    try:
+        timings = await asyncio.to_thread(warm_up)
+    except Exception as e:
+        logger.exception("Pipeline warm-up failed")
+        warmup_status.update(status="failed", error=str(e))
+    else:
+        warmup_status.update(status="ready", **{key: round(value, 3) for key, value in timings.items()})
+    warmup_status["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info("Pipeline warm-up %s in %.2fs", warmup_status["status"], warmup_status["seconds"])
+
+
+async def publish_metrics_periodically() -> None:
+    """Keep this worker's snapshot in the shared metrics store fresh."""
+    while True:
+        try:
+            await asyncio.to_thread(shared_metrics.publish, REGISTRY.collect())
+        except Exception as e:
+            logger.warning("Publishing worker metrics failed: %s", e)
+        await asyncio.sleep(METRICS_PUBLISH_SECONDS)
+
+
+# Precomputed related-articles table (related_articles.py), kept in step with site_index
+related_table = load_related_articles()
+
+
+def update_related_articles(changes: dict, first: bool) -> None:
+    """Recompute related articles for the rows a site-index refresh touched, then persist."""
+    if first:
+        # The stored table may predate edits made while the server was down
+        result = related_table.sync(site_index.rows(), RELATED_REBUILD_GROWTH)
+    elif changes["changed"] or changes["removed"]:
+        changed = [row for row in (site_index.get(slug) for slug in changes["changed"]) if row is not None]
+        result = related_table.update(changed, changes["removed"])
+    else:
+        return
+    if result["recomputed"] or result.get("merged") or changes["removed"]:
+        related_table.save(RELATED_ARTICLES_PATH)
+        logger.info("Related articles: %s", result)
+
+
+async def refresh_site_articles_periodically() -> None:
+    """Apply new, changed and deleted site articles to the in-memory index and related table."""
+    first = True
+    while True:
+        try:
+            changes = await asyncio.to_thread(site_index.refresh, site_source)
+            await asyncio.to_thread(update_related_articles, changes, first)
+            first = False
+        except Exception as e:
+            logger.warning("Refreshing site articles from %r failed: %s", site_source, e)
+        await asyncio.sleep(SITE_ARTICLES_REFRESH_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: open shared outbound clients at startup and
+    close them at shutdown. Pipeline warm-up runs in the background so the
+    server starts accepting requests (/, /health) immediately.
+    """
+    await open_eutils_client()
+    background = []
+    if WARMUP_ON_STARTUP:
+        background.append(asyncio.create_task(warm_up_pipeline()))
+    if shared_metrics is not None:
+        background.append(asyncio.create_task(publish_metrics_periodically()))
+    if site_source is not None:
+        background.append(asyncio.create_task(refresh_site_articles_periodically()))
+        background.append(asyncio.create_task(open_narration_pipeline()))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        # Let cancelled tasks unwind before the clients they may be using are closed
+        await asyncio.gather(*background, return_exceptions=True)
+        await close_narration_pipeline()
+        await close_eutils_client()
+
+
 app = FastAPI(
     title="Total Life Daily API",
     description="A health and wellness AI chatbot API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - allows frontend to access API from different origins
@@ -35,6 +169,101 @@ app.add_middleware(
 )
 
 
+def route_template(request: Request) -> str:
+    """Route path template for metrics labels (e.g. "/chat"), or "other"."""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "other"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Track in-flight requests and request latency per endpoint."""
+    endpoint = route_template(request)
+    start = time.perf_counter()
+    status = "500"
+    with REQUESTS_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method, endpoint=endpoint, status=status
+            )
+
+
+def cache_metrics():
+    """Expose cache hit/miss counters and sizes to the metrics registry."""
+    caches = {"articles": article_cache, "queries": query_cache, "answers": answer_cache}
+    lookups, entries = [], []
+    for name, cache in caches.items():
+        stats = cache.stats()
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lookups.append(({"cache": name, "result": result}, stats[result]))
+        entries.append(({"cache": name, "tier": "memory"}, stats["memory_entries"]))
+        if stats.get("disk_entries") is not None:
+            entries.append(({"cache": name, "tier": "disk"}, stats["disk_entries"]))
+    coalesced = answer_flights.stats()
+    batching = efetch_batcher.stats()
+    leased = answer_leases.stats()["joined"] if answer_leases is not None else 0
+    return [
+        ("wellness_cache_lookups_total", "counter", "Cache lookups by result", lookups),
+        ("wellness_cache_entries", "gauge", "Cached entries by tier", entries),
+        ("wellness_answer_coalesced_total", "counter", "Questions served by joining an in-flight execution",
+         [({}, coalesced["coalesced"])]),
+        ("wellness_answer_lease_joined_total", "counter", "Questions answered by waiting on another worker's execution",
+         [({}, leased)]),
+        ("wellness_efetch_batches_total", "counter", "Combined efetch requests issued by the micro-batcher",
+         [({}, batching["batches"])]),
+    ]
+
+
+REGISTRY.register_collector(cache_metrics)
+
+
+# Bounds concurrent /chat and /chat/stream pipeline runs, queueing fairly per user
+admission = build_admission_controller()
+
+
+def admission_metrics():
+    """Expose admission-control occupancy to the metrics registry."""
+    stats = admission.stats()
+    return [
+        ("wellness_admission_in_flight", "gauge", "Chat requests holding an admission slot",
+         [({}, stats["in_flight"])]),
+        ("wellness_admission_queued", "gauge", "Chat requests waiting for an admission slot",
+         [({}, stats["queued"])]),
+    ]
+
+
+REGISTRY.register_collector(admission_metrics)
+
+
+def session_metrics():
+    """Expose the number of live conversation sessions to the metrics registry."""
+    return [
+        ("wellness_chat_sessions", "gauge", "Conversation sessions held in memory",
+         [({}, sessions.stats()["sessions"])]),
+    ]
+
+
+REGISTRY.register_collector(session_metrics)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a fast 429/503 and a Retry-After hint."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # =============================================================================
 # REQUEST/RESPONSE MODELS
 # =============================================================================
@@ -42,6 +271,8 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     message: str
+    user_id: Optional[str] = None  # anonymous user id from the frontend, for fair queueing
+    session_id: Optional[str] = Field(None, max_length=128)  # conversation id; follow-ups reuse its context
 
 
 class ArticleSource(BaseModel):
@@ -58,6 +289,82 @@ class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     answer: str
     sources: List[ArticleSource]
+    degradations: List[str] = []  # shortcuts taken to meet the latency budget, if any
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    questions: List[str]
+    concurrency: Optional[int] = None
+    user_id: Optional[str] = None
+
+
+class SiteArticleResult(BaseModel):
+    """One in-house article matching an /articles/search query."""
+    id: Optional[int] = None
+    slug: str
+    title: str
+    excerpt: Optional[str] = None
+    category: Optional[str] = None
+    published_at: Optional[str] = None
+    url: str
+    score: float
+    coverage: float  # share of the query's words the article contains
+    snippet: str
+
+
+class SiteArticleSearchResponse(BaseModel):
+    """Response model for the in-house article search endpoint."""
+    query: str
+    results: List[SiteArticleResult]
+    took_ms: float
+
+
+class FeaturedImage(BaseModel):
+    url: str
+    alt: str = ""
+
+
+class RelatedArticle(BaseModel):
+    """One precomputed neighbour of an article, shaped like the frontend's ArticlePreview."""
+    article_id: Optional[int] = None
+    slug: str
+    title: str
+    excerpt: Optional[str] = None
+    category: Optional[str] = None
+    featured_image: Optional[FeaturedImage] = None
+    is_featured: bool = False
+    published_at: Optional[str] = None
+    url: str
+    score: float  # cosine similarity of the TF-IDF vectors
+
+
+class RelatedArticlesResponse(BaseModel):
+    """Response model for the related-articles endpoint."""
+    slug: str
+    related: List[RelatedArticle]
+
+
+class NarrationSegment(BaseModel):
+    """Cache state of one narration segment (intro, paragraph or closing)."""
+    index: int
+    kind: str
+    chars: int
+    script_cached: bool
+    audio_cached: bool
+
+
+class NarrationManifest(BaseModel):
+    """Response model for the narration manifest endpoint."""
+    slug: str
+    voice: str
+    etag: str
+    media_type: str
+    segments: List[NarrationSegment]
+
+
+# Largest batch accepted by /chat/batch
+BATCH_MAX_QUESTIONS = env_int("BATCH_MAX_QUESTIONS", 500)
 
 
 # =============================================================================
@@ -80,16 +387,248 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness check: 200 once the pipeline is warm (graph compiled, LLM
+    client loaded), 503 while the background warm-up is still running.
+    """
+    warm = is_warm() and warmup_status["status"] != "warming"
+    body = {**warmup_status, "status": "ready" if warm else warmup_status["status"]}
+    return JSONResponse(status_code=200 if warm else 503, content=body)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text-format metrics: per-node and upstream latency histograms,
+    route/fallback counters, in-flight requests, token counts and cache stats.
+    With several workers, every worker's counters and histograms are summed
+    and gauges carry a `worker` label, whichever worker serves the scrape.
+    """
+    if shared_metrics is not None:
+        try:
+            await asyncio.to_thread(shared_metrics.publish, REGISTRY.collect())
+            families = await asyncio.to_thread(shared_metrics.merged)
+            return PlainTextResponse(render_families(families), media_type="text/plain; version=0.0.4")
+        except sqlite3.Error as e:
+            logger.warning("Shared metrics store unavailable, serving this worker's metrics: %s", e)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters and sizes for the backend caches (per worker process),
+    plus the local PubMed index when it is the retrieval backend.
+    """
+    index = local_index()
+    narration = await open_narration_pipeline() if site_source is not None else None
+    return {
+        "articles": article_cache.stats(),
+        "queries": query_cache.stats(),
+        "answers": answer_cache.stats(),
+        "answer_coalescing": answer_flights.stats(),
+        "answer_leases": answer_leases.stats() if answer_leases is not None else None,
+        "efetch_batching": efetch_batcher.stats(),
+        "sessions": sessions.stats(),
+        "local_index": index.stats() if index is not None else None,
+        "site_articles": site_index.stats() if site_source is not None else None,
+        "related_articles": related_table.stats() if site_source is not None else None,
+        "narration": narration.stats() if narration is not None else None
+    }
+
+
+@app.get("/articles/search", response_model=SiteArticleSearchResponse)
+async def search_site_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    category: Optional[str] = None
+):
+    """
+    Full-text search over Total Life Daily's own articles (title, excerpt,
+    category and body), ranked with BM25. A trailing partial word matches
+    the words it starts, for search-as-you-type.
+    """
+    if site_source is None:
+        raise HTTPException(status_code=503, detail="Article search is not configured (SITE_ARTICLES_SOURCE)")
+    start = time.perf_counter()
+    results = site_index.search(q, limit=limit, category=category)
+    return SiteArticleSearchResponse(
+        query=q,
+        results=[SiteArticleResult(**result) for result in results],
+        took_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
+
+
+@app.get("/articles/{slug}/related", response_model=RelatedArticlesResponse)
+async def related_site_articles(slug: str, limit: int = Query(4, ge=1, le=20)):
+    """
+    Articles most similar to the given one, read from the precomputed
+    related-articles table (a lookup, no scoring at request time).
+    """
+    if site_source is None:
+        raise HTTPException(status_code=503, detail="Related articles are not configured (SITE_ARTICLES_SOURCE)")
+    neighbours = related_table.related(slug)
+    if neighbours is None:
+        raise HTTPException(status_code=404, detail=f"Unknown article {slug!r}")
+    related = []
+    for neighbour, score in neighbours:
+        row = site_index.get(neighbour)
+        if row is None:
+            continue
+        related.append(to_related_article(row, score))
+        if len(related) == limit:
+            break
+    return RelatedArticlesResponse(slug=slug, related=related)
+
+
+@app.get("/articles/{slug}/narration")
+async def narrate_site_article(slug: str, http_request: Request, voice: Optional[str] = None):
+    """
+    The article read aloud, streamed as one audio file segment by segment
+    (intro, each paragraph, closing). Scripts and audio are cached per
+    segment by content hash, so only new or edited paragraphs are generated;
+    the response starts once the first segment is ready.
+    """
+    pipeline, article, voice = await narration_request(slug, voice)
+    segments = pipeline.plan(article)
+    etag = pipeline.etag(segments, voice)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Narration-Segments": str(len(segments))}
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    chunks = pipeline.stream(segments, voice)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=502, detail="Narration could not be generated")
+
+    async def body() -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type=pipeline.engine.media_type, headers=headers)
+
+
+@app.get("/articles/{slug}/narration/manifest", response_model=NarrationManifest)
+async def narration_manifest(slug: str, voice: Optional[str] = None):
+    """
+    The narration segments of an article and whether each one's script and
+    audio are already cached (e.g. to see what an edit will regenerate).
+    """
+    pipeline, article, voice = await narration_request(slug, voice)
+    segments = pipeline.plan(article)
+    return NarrationManifest(
+        slug=slug,
+        voice=voice,
+        etag=pipeline.etag(segments, voice),
+        media_type=pipeline.engine.media_type,
+        segments=[NarrationSegment(**segment) for segment in await pipeline.manifest(segments, voice)]
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Process a wellness-related question and return an AI-generated answer
     based on PubMed research articles.
+
+    Subject to admission control: responds 429/503 with Retry-After when
+    too many requests are already queued. Time spent queued counts against
+    the request's latency budget.
+    """
+    arrived = time.monotonic()
+    async with await admission.acquire(user_key(request, http_request)):
+        result = await process_wellness_query(request.message, request_budget(arrived), request.session_id)
+    sources = to_article_sources(result.get("context", []))
+
+    return ChatResponse(
+        answer=result["answer"],
+        sources=sources,
+        degradations=result.get("degradations", [])
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
     """
-    result = await process_wellness_query(request.message)
+    Stream the answer to a wellness question as Server-Sent Events.
 
-    # Convert context articles to ArticleSource models
-    sources = [
+    Events, in order:
+        - query: {"search_query": ...} once the PubMed query is ready
+        - sources: {"sources": [ArticleSource, ...]} once articles are retrieved
+        - token: {"text": ...} for each answer chunk as the LLM emits it
+        - done: {"answer": ..., "sources": [ArticleSource, ...]} with the final ChatResponse
+        - error: {"detail": ...} if the pipeline fails mid-stream
+
+    The admission slot is held until the stream ends.
+    """
+    arrived = time.monotonic()
+    slot = await admission.acquire(user_key(request, http_request))
+    return StreamingResponse(
+        sse_chat_events(request.message, slot, request_budget(arrived), request.session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release)
+    )
+
+
+@app.delete("/chat/sessions/{session_id}", status_code=204)
+async def end_chat_session(session_id: str):
+    """
+    Forget a conversation's turns and articles (e.g. when the user starts a
+    new chat). Sessions also expire on their own after SESSION_TTL seconds.
+    """
+    sessions.delete(session_id)
+    return Response(status_code=204)
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """
+    Answer a list of wellness questions, streaming results as NDJSON
+    (one JSON object per line) in completion order.
+
+    Each question holds an admission slot while it runs, queued fairly with
+    the same user's chat requests; with admission control on, at most
+    ADMISSION_MAX_QUEUE_PER_USER questions run or wait at once. A question
+    rejected by admission control is reported as an error line.
+
+    Lines:
+        - {"index", "question", "answer", "sources"} for each answered question
+        - {"index", "question", "error"} for each question that failed
+        - {"summary": {...}} last, with counts, PMID dedup stats and elapsed seconds
+    """
+    if not request.questions:
+        raise HTTPException(status_code=422, detail="questions must not be empty")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.questions)} questions (max {BATCH_MAX_QUESTIONS})"
+        )
+
+    key = user_key(request, http_request)
+    concurrency = request.concurrency
+    if admission.enabled:
+        # Never queue more of this batch than one user may have waiting
+        concurrency = min(concurrency or BATCH_CONCURRENCY, admission.max_queue_per_user)
+
+    return StreamingResponse(
+        ndjson_batch_lines(request.questions, concurrency, lambda: admission.acquire(key)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def to_article_sources(context: List[dict]) -> List[ArticleSource]:
+    """Convert context articles to ArticleSource models."""
+    return [
         ArticleSource(
             id=article["id"],
             title=article["title"],
@@ -98,10 +637,126 @@ async def chat(request: ChatRequest):
             year=article.get("year", "Unknown"),
             url=article["url"]
         )
-        for article in result.get("context", [])
+        for article in context
     ]
 
-    return ChatResponse(answer=result["answer"], sources=sources)
+
+async def narration_request(slug: str, voice: Optional[str]):
+    """The narration pipeline, article row and voice for a request, or the HTTP error to return."""
+    pipeline = await open_narration_pipeline() if site_source is not None else None
+    if pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Narration is not configured (SITE_ARTICLES_SOURCE and NARRATION_TTS_ENGINE)"
+        )
+    article = site_index.get(slug)
+    if article is None:
+        raise HTTPException(status_code=404, detail=f"Unknown article {slug!r}")
+    voice = voice or pipeline.voice
+    if voice not in pipeline.voices:
+        raise HTTPException(status_code=422, detail=f"Voice must be one of: {', '.join(pipeline.voices)}")
+    return pipeline, article, voice
+
+
+def to_related_article(row: dict, score: float) -> RelatedArticle:
+    """Map a stored articles-table row to the related-article preview."""
+    image = row.get("featured_image_url")
+    return RelatedArticle(
+        article_id=row.get("article_id") or row.get("id"),
+        slug=row["slug"],
+        title=row["title"],
+        excerpt=row.get("excerpt"),
+        category=row.get("category"),
+        featured_image=FeaturedImage(url=image, alt=row.get("featured_image_alt") or "") if image else None,
+        is_featured=bool(row.get("is_featured")),
+        published_at=row.get("published_at"),
+        url=site_index.article_url(row["slug"]),
+        score=score
+    )
+
+
+def user_key(request: Union[ChatRequest, BatchChatRequest], http_request: Request) -> str:
+    """Fair-queueing key: the anonymous user id, or the client address without one."""
+    if request.user_id:
+        return f"user:{request.user_id}"
+    client = http_request.client
+    return f"ip:{client.host if client else 'unknown'}"
+
+
+def request_budget(arrived: float) -> float:
+    """Latency budget left for the pipeline after admission queueing (0 = unlimited)."""
+    if REQUEST_BUDGET_SECONDS <= 0:
+        return 0.0
+    # Keep a tiny positive budget when exhausted, since 0 would mean "no deadline"
+    return max(REQUEST_BUDGET_SECONDS - (time.monotonic() - arrived), 0.001)
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def sse_chat_events(
+    message: str,
+    slot: Optional[AdmissionSlot] = None,
+    budget_seconds: Optional[float] = None,
+    session_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Translate pipeline progress events into SSE frames."""
+    try:
+        async for event, data in stream_wellness_query(message, budget_seconds, session_id):
+            if event == "query":
+                yield format_sse("query", data)
+            elif event == "context":
+                sources = to_article_sources(data["context"])
+                yield format_sse("sources", {"sources": [s.model_dump() for s in sources]})
+            elif event == "token":
+                yield format_sse("token", data)
+            elif event == "done":
+                response = ChatResponse(
+                    answer=data["answer"],
+                    sources=to_article_sources(data["context"]),
+                    degradations=data.get("degradations", [])
+                )
+                yield format_sse("done", response.model_dump())
+    except Exception as e:
+        yield format_sse("error", {"detail": str(e)})
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+async def ndjson_batch_lines(
+    questions: List[str],
+    concurrency: Optional[int],
+    admit: Optional[Callable[[], Awaitable[AdmissionSlot]]] = None
+) -> AsyncIterator[str]:
+    """Translate batch results into NDJSON lines, ending with a summary line."""
+    articles = ArticleMemo()
+    start = time.perf_counter()
+    succeeded = failed = 0
+    async for item in process_wellness_batch(questions, concurrency, articles, admit):
+        if "error" in item:
+            failed += 1
+            yield json.dumps(item) + "\n"
+            continue
+        succeeded += 1
+        sources = to_article_sources(item["context"])
+        yield json.dumps({
+            "index": item["index"],
+            "question": item["question"],
+            "answer": item["answer"],
+            "sources": [s.model_dump() for s in sources]
+        }) + "\n"
+
+    summary = {
+        "questions": len(questions),
+        "succeeded": succeeded,
+        "failed": failed,
+        **articles.stats(),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+    yield json.dumps({"summary": summary}) + "\n"
 
 
 # =============================================================================
@@ -114,4 +769,22 @@ if __name__ == "__main__":
     
     # Use PORT environment variable for Cloud Run, default to 8000 for local
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = worker_count()
+    if workers > 1:
+        # Each worker imports main:app itself; pin the resolved count so they
+        # agree on the shared NCBI budget split and enable the shared state
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        if shared_metrics is not None:
+            try:
+                shared_metrics.reset()
+            except sqlite3.Error as e:
+                logger.warning("Could not reset the shared metrics store: %s", e)
+        else:
+            logger.warning(
+                "Running %d workers without SHARED_STATE_PATH: each gets 1/%d of the NCBI rate "
+                "and its own answer leases and metrics", workers, workers
+            )
+        logger.info("Starting %d workers (shared state: %s)", workers, shared_state_path() or "none")
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
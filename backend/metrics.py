@@ -0,0 +1,377 @@
+"""
+Metrics - Prometheus Text-format Counters, Gauges and Histograms
+A small dependency-free metrics registry for the chatbot pipeline, rendered by
+the /metrics endpoint in the Prometheus exposition format. With several worker
+processes, snapshots are merged through a shared SQLite file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from cache import SQLiteStore
+from config import shared_state_path
+
+logger = logging.getLogger(__name__)
+
+
+# Latency buckets in seconds, spanning cache hits to slow LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+# Sub-millisecond latency buckets for in-process lookups
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Token-count buckets for prompt/response sizes
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000, 3000, 5000, 10000)
+
+# (labels, value) pairs produced by a metric or collector
+Sample = Tuple[Dict[str, str], float]
+# (family name, type, help, [(sample name, labels, value)]) as collected for rendering
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# =============================================================================
+# METRIC TYPES
+# =============================================================================
+
+class _Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _add(self, key: tuple, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._add(self._key(labels), amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (e.g. in-flight requests)."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._add(self._key(labels), amount)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self._add(self._key(labels), -amount)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, plus sum and count."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[tuple, List[float]] = {}
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Layout: [bucket counts..., sum, count]
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        samples = []
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count))
+            samples.append((f"{self.name}_sum", labels, series[-2]))
+            samples.append((f"{self.name}_count", labels, series[-1]))
+        return samples
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class MetricsRegistry:
+    """
+    Holds metric families and collector callbacks, and renders them as
+    Prometheus text. Collectors return (name, type, help, samples) tuples and
+    are evaluated at scrape time (e.g. cache sizes).
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, str, str, List[Sample]]]]) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Family]:
+        """Snapshot every metric family and collector as (name, type, help, samples)."""
+        families = [
+            (metric.name, metric.type_name, metric.documentation, metric.samples())
+            for metric in self._metrics
+        ]
+        for collector in self._collectors:
+            for name, type_name, documentation, samples in collector():
+                families.append((name, type_name, documentation, [(name, labels, value) for labels, value in samples]))
+        return families
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+def render_families(families: List[Family]) -> str:
+    """Render collected families in the Prometheus text format."""
+    lines = []
+    for family, type_name, documentation, samples in families:
+        lines.append(f"# HELP {family} {documentation}")
+        lines.append(f"# TYPE {family} {type_name}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# =============================================================================
+# MULTI-WORKER AGGREGATION
+# =============================================================================
+
+class SharedMetricsStore(SQLiteStore):
+    """
+    Per-worker metric snapshots in a SQLite file shared by all workers.
+
+    Each worker publishes its collected families under its pid, and any worker
+    can render the merged view: counters and histograms are summed across
+    every worker that has published since the server started (so totals do
+    not drop when a worker exits), while gauges are reported per live worker
+    with a `worker` label.
+    """
+
+    def __init__(self, path: str, stale_seconds: float = 60.0):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.worker = str(os.getpid())
+
+    def _schema(self) -> Iterable[str]:
+        return (
+            "CREATE TABLE IF NOT EXISTS metric_samples ("
+            "worker TEXT NOT NULL, position INTEGER NOT NULL, family TEXT NOT NULL, "
+            "type TEXT NOT NULL, help TEXT NOT NULL, sample TEXT NOT NULL, labels TEXT NOT NULL, "
+            "value REAL NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (worker, sample, labels))",
+        )
+
+    def publish(self, families: List[Family]) -> None:
+        """Replace this worker's snapshot."""
+        now = time.time()
+        rows = [
+            (self.worker, position, family, type_name, documentation, name, json.dumps(labels), value, now)
+            for position, (family, type_name, documentation, samples) in enumerate(families)
+            for name, labels, value in samples
+        ]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM metric_samples WHERE worker = ?", (self.worker,))
+            conn.executemany("INSERT OR REPLACE INTO metric_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def merged(self) -> List[Family]:
+        """Combine every worker's latest snapshot into one set of families."""
+        live_after = time.time() - self.stale_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT worker, position, family, type, help, sample, labels, value, updated_at "
+                "FROM metric_samples ORDER BY position, rowid"
+            ).fetchall()
+
+        families: Dict[str, Tuple[str, str, Dict[Tuple[str, str], Tuple[Dict[str, str], float]]]] = {}
+        for worker, _, family, type_name, documentation, name, labels_json, value, updated_at in rows:
+            labels = json.loads(labels_json)
+            if type_name == "gauge":
+                if updated_at < live_after:
+                    continue
+                labels = {**labels, "worker": worker}
+            _, _, samples = families.setdefault(family, (type_name, documentation, {}))
+            key = (name, json.dumps(labels, sort_keys=True))
+            previous = samples.get(key)
+            samples[key] = (labels, value + (previous[1] if previous else 0.0))
+
+        return [
+            (family, type_name, documentation, [(key[0], labels, value) for key, (labels, value) in samples.items()])
+            for family, (type_name, documentation, samples) in families.items()
+        ]
+
+    def reset(self) -> None:
+        """Drop all snapshots (called once before workers start)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM metric_samples")
+
+
+def build_shared_metrics() -> Optional[SharedMetricsStore]:
+    """SharedMetricsStore on config.shared_state_path() (opened on first use), or None for a single worker."""
+    path = shared_state_path()
+    return SharedMetricsStore(path) if path else None
+
+
+# =============================================================================
+# PIPELINE METRICS
+# =============================================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "wellness_http_request_seconds",
+    "HTTP request latency by endpoint",
+    ["method", "endpoint", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "wellness_requests_in_flight",
+    "HTTP requests currently being processed",
+    ["endpoint"]
+)
+NODE_SECONDS = Histogram(
+    "wellness_graph_node_seconds",
+    "Latency of each LangGraph node",
+    ["node"]
+)
+UPSTREAM_SECONDS = Histogram(
+    "wellness_upstream_request_seconds",
+    "Latency of outbound calls (NCBI esearch/efetch, Gemini, text-to-speech)",
+    ["service", "operation", "outcome"]
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "wellness_ncbi_rate_limit_wait_seconds",
+    "Time spent waiting for the NCBI rate limiter"
+)
+XML_PARSE_SECONDS = Histogram(
+    "wellness_pubmed_xml_parse_seconds",
+    "Time spent parsing efetch XML"
+)
+LOCAL_INDEX_SECONDS = Histogram(
+    "wellness_local_index_seconds",
+    "Latency of local PubMed index searches and article lookups",
+    ["operation"],
+    buckets=FAST_BUCKETS
+)
+ROUTE_TOTAL = Counter(
+    "wellness_route_total",
+    "Generation path chosen by route_by_context",
+    ["route"]
+)
+RETRIEVAL_FALLBACK_TOTAL = Counter(
+    "wellness_retrieval_fallback_total",
+    "Retrieval fallbacks taken (simplified query, speculative result, upstream error, local index miss)",
+    ["kind"]
+)
+ZERO_RESULTS_TOTAL = Counter(
+    "wellness_pubmed_zero_results_total",
+    "esearch calls that returned no PMIDs",
+    ["query"]
+)
+LLM_TOKENS_TOTAL = Counter(
+    "wellness_llm_tokens_total",
+    "Gemini tokens by node and direction",
+    ["node", "kind"]
+)
+PROMPT_CONTEXT_TOKENS = Histogram(
+    "wellness_prompt_context_tokens",
+    "Research-context prompt size before and after compression",
+    ["stage"],
+    buckets=TOKEN_BUCKETS
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "wellness_admission_queue_seconds",
+    "Time chat requests waited for an admission slot"
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "wellness_admission_rejected_total",
+    "Chat requests rejected by admission control",
+    ["reason"]
+)
+NARRATION_CHUNKS_TOTAL = Counter(
+    "wellness_narration_chunks_total",
+    "Narration scripts and audio chunks served from the disk cache, generated, generated without caching (uncached) or failed",
+    ["step", "outcome"]
+)
+SESSION_CONTEXT_TOTAL = Counter(
+    "wellness_session_context_total",
+    "Follow-up questions answered from session context vs. fresh retrieval",
+    ["decision"]
+)
@@ -0,0 +1,655 @@
+"""
+Article Narration - Cached Per-Paragraph Narration Scripts and Audio
+Turns a site article into spoken audio on the server, replacing the
+browser-side rewrite + Google TTS round trip in ArticleNarrator.tsx.
+
+An article is split into segments (an introduction, one per paragraph, a
+closing line). Each segment's narration script (an LLM rewrite, or the
+cleaned text) and its audio are cached on disk under a hash of their
+input: the script under the paragraph text and script settings, the audio
+under the script, TTS engine and voice. Editing an article therefore only
+regenerates the paragraphs that changed, and changing the voice reuses the
+scripts. Audio is streamed segment by segment, so playback starts as soon
+as the first one is ready while later ones are generated ahead.
+
+TTS engines are pluggable (NARRATION_TTS_ENGINE): "google" (Cloud
+Text-to-Speech), "stub" (silent MP3 of the right length, for tests and
+benchmarks, no network), or "package.module:factory" for another engine.
+Engines must return audio whose segments can be concatenated into one
+stream (e.g. MP3 frames).
+"""
+
+import asyncio
+import base64
+import hashlib
+import importlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+
+from cache import SingleFlight, build_shared_flight
+from config import data_path, env_float, env_int, env_str, shared_state_path
+from llm_clients import DEFAULT_GEMINI_MODEL, ainvoke_llm, get_llm
+from metrics import NARRATION_CHUNKS_TOTAL, UPSTREAM_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+# Bump to invalidate every cached script and audio chunk
+FORMAT_VERSION = 1
+
+CLOSING_TEXT = (
+    "I hope you found these insights valuable. Remember to consult with "
+    "healthcare professionals for personalized advice. Thank you for listening!"
+)
+
+SCRIPT_PROMPT = """You are a calm, soothing wellness narrator with a warm voice, reading an article aloud.
+Rewrite the passage below as natural spoken narration:
+- Keep every fact, number and caveat; explain jargon briefly in plain words
+- You may open with a short, natural transition (e.g. "Now let's explore...", "Another important point...")
+- No greeting and no sign-off: other passages come before and after this one
+- Write only the words to be spoken - no stage directions, no [brackets], no markdown
+
+Passage:
+{text}"""
+
+INTRO_PROMPT = """You are a calm, soothing wellness narrator with a warm voice, about to read an article aloud.
+Write a brief, warm welcome (2-3 sentences) that introduces the topic naturally.
+Do not repeat the title word for word; weave it into the greeting.
+Write only the words to be spoken - no stage directions, no [brackets], no markdown.
+
+Article title: {title}
+Summary: {excerpt}"""
+
+
+# =============================================================================
+# ARTICLE SEGMENTS
+# =============================================================================
+
+_CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```")
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_EMPHASIS_RE = re.compile(r"(\*\*|__|\*|_)(.+?)\1")
+_INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+_LINE_PREFIX_RE = re.compile(r"^\s*(#{1,6}\s+|>\s*|[-*+]\s+|\d+\.\s+)")
+_RULE_RE = re.compile(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$")
+_BLANK_LINE_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def clean_block(block: str) -> str:
+    """Speakable text of one markdown block; list items and headings become sentences."""
+    block = _IMAGE_RE.sub("", block)
+    block = _LINK_RE.sub(r"\1", block)
+    block = _INLINE_CODE_RE.sub(r"\1", block)
+    block = _EMPHASIS_RE.sub(r"\2", block)
+    lines = []
+    for line in block.splitlines():
+        if _RULE_RE.match(line):
+            continue
+        line = " ".join(_LINE_PREFIX_RE.sub("", line).replace("|", " ").split())
+        if line:
+            lines.append(line if line[-1] in ".!?:;," else line + ".")
+    return " ".join(lines)
+
+
+def split_long(text: str, max_chars: int) -> List[str]:
+    """Split text at sentence boundaries into pieces of at most max_chars (where possible)."""
+    if len(text) <= max_chars:
+        return [text]
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_paragraphs(content: str, max_chars: int = 1200, min_chars: int = 80) -> List[str]:
+    """
+    Narration paragraphs of a markdown body. Headings and other short blocks
+    are joined to the block after them and long blocks are split at sentence
+    boundaries; both decisions only look at the block itself and its
+    neighbour, so an edit does not shift the boundaries of other paragraphs.
+    """
+    blocks = [clean_block(block) for block in _BLANK_LINE_RE.split(_CODE_BLOCK_RE.sub("", content or ""))]
+    paragraphs, carry = [], ""
+    for block in blocks:
+        if not block:
+            continue
+        text = f"{carry} {block}" if carry else block
+        if len(text) < min_chars:
+            carry = text
+            continue
+        carry = ""
+        paragraphs.extend(split_long(text, max_chars))
+    if carry:
+        paragraphs.append(carry)
+    return paragraphs
+
+
+def plan_segments(article: dict, max_chars: int = 1200) -> List[dict]:
+    """Narration segments of an article row: intro, one per paragraph, closing."""
+    title = clean_block(article.get("title") or "")
+    excerpt = clean_block(article.get("excerpt") or "")
+    segments = [{"kind": "intro", "text": f"{title} {excerpt}".strip(), "title": title, "excerpt": excerpt}]
+    segments.extend({"kind": "body", "text": text} for text in split_paragraphs(article.get("content") or "", max_chars))
+    segments.append({"kind": "closing", "text": CLOSING_TEXT})
+    for index, segment in enumerate(segments):
+        segment["index"] = index
+    return segments
+
+
+def content_key(*parts) -> str:
+    return hashlib.sha256(json.dumps([FORMAT_VERSION, *parts]).encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# TTS ENGINES
+# =============================================================================
+
+class TTSEngine(ABC):
+    """
+    Interface for text-to-speech engines. `cache_id` must change whenever the
+    engine's output for the same text and voice would (model, rate, format).
+    """
+
+    name = "engine"
+    media_type = "audio/mpeg"
+    suffix = ".mp3"
+
+    @property
+    def cache_id(self) -> str:
+        return self.name
+
+    @abstractmethod
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """Audio for text spoken in voice."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+def to_ssml(text: str) -> str:
+    """Wrap narration text in SSML with pauses at paragraph, sentence and clause breaks."""
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    text = re.sub(r"\n\s*\n", '<break time="700ms"/>', text)
+    text = re.sub(r"([.?!])\s+", r'\1 <break time="400ms"/>', text)
+    text = re.sub(r",\s+", ', <break time="200ms"/>', text)
+    text = re.sub(r"([:;])\s+", r'\1 <break time="300ms"/>', text)
+    return f'<speak><prosody rate="medium">{text}</prosody></speak>'
+
+
+class GoogleTTSEngine(TTSEngine):
+    """Google Cloud Text-to-Speech (text:synthesize) returning MP3."""
+
+    name = "google"
+    endpoint = "https://texttospeech.googleapis.com/v1/text:synthesize"
+
+    def __init__(self, api_key: str, speaking_rate: float = 0.92, volume_gain_db: float = 2.0, timeout: float = 30.0):
+        self.api_key = api_key
+        self.speaking_rate = speaking_rate
+        self.volume_gain_db = volume_gain_db
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    @classmethod
+    def from_env(cls) -> Optional["GoogleTTSEngine"]:
+        api_key = env_str("GOOGLE_TTS_API_KEY") or env_str("GOOGLE_API_KEY")
+        if not api_key:
+            return None
+        return cls(api_key, env_float("NARRATION_SPEAKING_RATE", 0.92), env_float("NARRATION_VOLUME_GAIN_DB", 2.0))
+
+    @property
+    def cache_id(self) -> str:
+        return f"google:mp3:{self.speaking_rate}:{self.volume_gain_db}"
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        body = {
+            "input": {"ssml": to_ssml(text)},
+            "voice": {"languageCode": "-".join(voice.split("-")[:2]), "name": voice},
+            "audioConfig": {
+                "audioEncoding": "MP3",
+                "speakingRate": self.speaking_rate,
+                "volumeGainDb": self.volume_gain_db,
+                "effectsProfileId": ["large-home-entertainment-class-device"],
+            },
+        }
+        start = time.perf_counter()
+        try:
+            response = await self._client.post(self.endpoint, params={"key": self.api_key}, json=body)
+            response.raise_for_status()
+            audio = base64.b64decode(response.json()["audioContent"])
+        except Exception:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="tts", operation="synthesize", outcome="error")
+            raise
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="tts", operation="synthesize", outcome="ok")
+        return audio
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class StubTTSEngine(TTSEngine):
+    """
+    Offline engine returning silent MP3 frames (MPEG-1 Layer III, 32 kbps,
+    44.1 kHz mono) lasting as long as the text would take to read, after a
+    configurable synthesis delay.
+    """
+
+    name = "stub"
+    # Frame header; with all-zero side info the frame decodes to silence
+    FRAME = bytes([0xFF, 0xFB, 0x10, 0xC0]) + bytes(100)
+    FRAME_SECONDS = 1152 / 44100
+
+    def __init__(self, latency_ms: float = 0.0, chars_per_second: float = 15.0):
+        self.latency_ms = latency_ms
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "StubTTSEngine":
+        return cls(env_float("NARRATION_STUB_LATENCY_MS", 0.0))
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        seconds = len(text) / self.chars_per_second
+        return self.FRAME * max(1, math.ceil(seconds / self.FRAME_SECONDS))
+
+
+TTS_ENGINES = {
+    "google": GoogleTTSEngine.from_env,
+    "stub": StubTTSEngine.from_env,
+}
+
+
+def build_tts_engine(spec: Optional[str] = None) -> Optional[TTSEngine]:
+    """
+    The engine named by NARRATION_TTS_ENGINE: "google" (default), "stub", or
+    "package.module:factory" (a zero-argument callable returning a TTSEngine).
+    Returns None when the engine is not usable (e.g. no API key).
+    """
+    spec = spec or env_str("NARRATION_TTS_ENGINE", "google")
+    if spec in TTS_ENGINES:
+        return TTS_ENGINES[spec]()
+    module_name, _, attribute = spec.partition(":")
+    try:
+        factory = getattr(importlib.import_module(module_name), attribute or "build_engine")
+    except (ImportError, AttributeError) as e:
+        logger.warning("Unknown NARRATION_TTS_ENGINE %r: %s", spec, e)
+        return None
+    return factory()
+
+
+# =============================================================================
+# DISK CACHE
+# =============================================================================
+
+class NarrationCache:
+    """
+    Content-addressed files (<directory>/<kind>/<ab>/<key><suffix>) shared by
+    every worker on the host. Writes are atomic; reads refresh the file's
+    mtime, and the least recently used files are deleted once the directory
+    grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._bytes = self._scan_bytes()
+
+    def _path(self, kind: str, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, kind, key[:2], key + suffix)
+
+    def _files(self) -> List[str]:
+        return [os.path.join(root, name) for root, _, names in os.walk(self.directory) for name in names]
+
+    def _scan_bytes(self) -> int:
+        total = 0
+        for path in self._files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def exists(self, kind: str, key: str, suffix: str) -> bool:
+        return os.path.exists(self._path(kind, key, suffix))
+
+    def get(self, kind: str, key: str, suffix: str) -> Optional[bytes]:
+        path = self._path(kind, key, suffix)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, kind: str, key: str, suffix: str, data: bytes) -> None:
+        path = self._path(kind, key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+        with self._lock:
+            self.writes += 1
+            self._bytes += len(data)
+            over = self.max_bytes and self._bytes > self.max_bytes
+        if over:
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete least recently used files until the cache is under 90% of max_bytes."""
+        with self._lock:
+            entries = []
+            for path in self._files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+            self._bytes = total
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self._bytes,
+        }
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class NarrationPipeline:
+    """Plans, generates (once per content hash) and streams article narration."""
+
+    def __init__(
+        self,
+        engine: TTSEngine,
+        cache: NarrationCache,
+        voice: str,
+        voices: List[str],
+        script_mode: str = "llm",
+        script_model: Optional[str] = None,
+        max_chars: int = 1200,
+        prefetch: int = 2
+    ):
+        self.engine = engine
+        self.cache = cache
+        self.voice = voice
+        self.voices = voices
+        self.script_mode = script_mode
+        self.script_model = script_model
+        self.max_chars = max_chars
+        self.prefetch = max(1, prefetch)
+        model = script_model or env_str("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
+        self.script_id = f"llm:{model}" if script_mode == "llm" else "text"
+        self._flights = SingleFlight()
+        # Other workers wait for the one generating a chunk instead of paying for it again
+        self._leases = build_shared_flight(
+            "narration", shared_state_path(), lease_seconds=env_float("NARRATION_LEASE_SECONDS", 120.0)
+        )
+
+    def plan(self, article: dict) -> List[dict]:
+        """Segments of an article, each with the key of its cached script."""
+        segments = plan_segments(article, self.max_chars)
+        for segment in segments:
+            segment["script_key"] = content_key(self.script_id, segment["kind"], segment["text"])
+        return segments
+
+    def etag(self, segments: List[dict], voice: str) -> str:
+        return '"' + content_key(self.engine.cache_id, voice, [s["script_key"] for s in segments])[:32] + '"'
+
+    async def _once(self, key: str, fn, lookup):
+        """Run fn for key once across concurrent requests and workers."""
+        if self._leases is None:
+            return await self._flights.do(key, fn)
+        return await self._flights.do(key, lambda: self._leases.do(key, fn, lookup))
+
+    # -------------------------------------------------------------------------
+    # Scripts
+    # -------------------------------------------------------------------------
+
+    async def _write_script(self, segment: dict) -> Optional[str]:
+        """The LLM rewrite of a segment, or None to read the cleaned text as-is."""
+        if self.script_mode != "llm" or segment["kind"] == "closing":
+            return None
+        from langchain_core.messages import HumanMessage
+
+        if segment["kind"] == "intro":
+            prompt = INTRO_PROMPT.format(title=segment["title"], excerpt=segment["excerpt"] or "(none)")
+        else:
+            prompt = SCRIPT_PROMPT.format(text=segment["text"])
+        llm = get_llm(self.script_model, temperature=0.7, max_output_tokens=env_int("NARRATION_SCRIPT_MAX_TOKENS", 800))
+        response = await ainvoke_llm(llm, [HumanMessage(content=prompt)], operation="narration_script")
+        return str(response.content).strip() or None
+
+    def _fallback_script(self, segment: dict) -> str:
+        if segment["kind"] == "intro":
+            return f"Hello, and welcome. Today we're exploring: {segment['text']}"
+        return segment["text"]
+
+    async def script(self, segment: dict) -> Tuple[str, bool]:
+        """
+        A segment's narration script, from the disk cache or written now, and
+        whether it is cached. A failed rewrite falls back to the article text
+        without caching it, so the rewrite is retried next time.
+        """
+        key = segment["script_key"]
+        cached = await asyncio.to_thread(self.cache.get, "scripts", key, ".txt")
+        if cached is not None:
+            NARRATION_CHUNKS_TOTAL.inc(step="script", outcome="cached")
+            return cached.decode("utf-8"), True
+
+        async def write() -> Tuple[str, bool]:
+            try:
+                text = await self._write_script(segment)
+            except Exception as e:
+                NARRATION_CHUNKS_TOTAL.inc(step="script", outcome="failed")
+                logger.warning("Narration script for segment %d failed, using the article text: %s", segment["index"], e)
+                return self._fallback_script(segment), False
+            text = text or self._fallback_script(segment)
+            await asyncio.to_thread(self.cache.put, "scripts", key, ".txt", text.encode("utf-8"))
+            NARRATION_CHUNKS_TOTAL.inc(step="script", outcome="generated")
+            return text, True
+
+        def lookup() -> Optional[Tuple[str, bool]]:
+            data = self.cache.get("scripts", key, ".txt")
+            return (data.decode("utf-8"), True) if data is not None else None
+
+        return await self._once(f"script:{key}", write, lookup)
+
+    # -------------------------------------------------------------------------
+    # Audio
+    # -------------------------------------------------------------------------
+
+    async def audio(self, segment: dict, voice: str) -> bytes:
+        """A segment's audio, from the disk cache or synthesized now."""
+        script, cacheable = await self.script(segment)
+        key = content_key(self.engine.cache_id, voice, script)
+        suffix = self.engine.suffix
+        cached = await asyncio.to_thread(self.cache.get, "audio", key, suffix)
+        if cached is not None:
+            NARRATION_CHUNKS_TOTAL.inc(step="audio", outcome="cached")
+            return cached
+
+        async def synthesize() -> bytes:
+            try:
+                data = await self.engine.synthesize(script, voice)
+            except Exception:
+                NARRATION_CHUNKS_TOTAL.inc(step="audio", outcome="failed")
+                raise
+            if not cacheable:
+                NARRATION_CHUNKS_TOTAL.inc(step="audio", outcome="uncached")
+                return data
+            await asyncio.to_thread(self.cache.put, "audio", key, suffix, data)
+            NARRATION_CHUNKS_TOTAL.inc(step="audio", outcome="generated")
+            return data
+
+        if not cacheable:
+            # Audio of a fallback script is played but not kept: once the rewrite
+            # succeeds the segment is narrated from the rewritten script
+            return await self._flights.do(f"audio:{key}", synthesize)
+        return await self._once(f"audio:{key}", synthesize, lambda: self.cache.get("audio", key, suffix))
+
+    async def stream(self, segments: List[dict], voice: str) -> AsyncIterator[bytes]:
+        """
+        Yield each segment's audio in order while the next `prefetch` segments
+        are generated. Segments that fail are skipped. Generation already
+        started keeps running if the client goes away, so it still lands in
+        the cache.
+        """
+        pending: deque = deque()
+        upcoming = iter(segments)
+
+        def schedule() -> None:
+            while len(pending) < self.prefetch:
+                segment = next(upcoming, None)
+                if segment is None:
+                    return
+                task = asyncio.ensure_future(self.audio(segment, voice))
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                pending.append((segment, task))
+
+        schedule()
+        while pending:
+            segment, task = pending.popleft()
+            schedule()
+            try:
+                data = await asyncio.shield(task)
+            except Exception as e:
+                logger.warning("Narration segment %d failed, skipping it: %s", segment["index"], e)
+                continue
+            yield data
+
+    async def manifest(self, segments: List[dict], voice: str) -> List[dict]:
+        """Per-segment cache state: which scripts and audio chunks are already generated."""
+
+        def state(segment: dict) -> dict:
+            script = self.cache.get("scripts", segment["script_key"], ".txt")
+            audio_cached = script is not None and self.cache.exists(
+                "audio", content_key(self.engine.cache_id, voice, script.decode("utf-8")), self.engine.suffix
+            )
+            return {
+                "index": segment["index"],
+                "kind": segment["kind"],
+                "chars": len(segment["text"]),
+                "script_cached": script is not None,
+                "audio_cached": audio_cached,
+            }
+
+        return await asyncio.to_thread(lambda: [state(segment) for segment in segments])
+
+    def stats(self) -> dict:
+        return {
+            "engine": self.engine.cache_id,
+            "script": self.script_id,
+            "voice": self.voice,
+            "in_flight": self._flights.stats()["in_flight"],
+            "cache": self.cache.stats(),
+        }
+
+    async def aclose(self) -> None:
+        await self.engine.aclose()
+
+
+_pipeline: Optional[NarrationPipeline] = None
+_pipeline_error: Optional[str] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_narration_pipeline() -> Optional[NarrationPipeline]:
+    """
+    Build the narration pipeline once. Returns None when the TTS engine is
+    not usable, after logging why.
+
+    Environment variables:
+        NARRATION_TTS_ENGINE: "google" (default), "stub" or "package.module:factory"
+        NARRATION_VOICE: Default voice (en-US-Studio-O)
+        NARRATION_VOICES: Comma-separated extra voices a request may pick
+        NARRATION_SCRIPT: "llm" (default) rewrites paragraphs for listening; "text" reads them as written
+        NARRATION_MODEL: Model for the script rewrite (defaults to GEMINI_MODEL)
+        NARRATION_CACHE_DIR: Script and audio cache directory (data/narration)
+        NARRATION_CACHE_MAX_MB: Cache size before least recently used chunks are deleted
+        NARRATION_CHUNK_CHARS: Longest paragraph synthesized in one request
+        NARRATION_PREFETCH: Segments generated ahead of the one being streamed
+    """
+    global _pipeline, _pipeline_error
+    if _pipeline is not None or _pipeline_error is not None:
+        return _pipeline
+    with _pipeline_lock:
+        if _pipeline is None and _pipeline_error is None:
+            engine = build_tts_engine()
+            if engine is None:
+                _pipeline_error = "no usable TTS engine"
+                logger.warning("Narration disabled: NARRATION_TTS_ENGINE is not usable (missing API key?)")
+                return None
+            voice = env_str("NARRATION_VOICE", "en-US-Studio-O")
+            extra = [v.strip() for v in (env_str("NARRATION_VOICES", "") or "").split(",") if v.strip()]
+            _pipeline = NarrationPipeline(
+                engine,
+                NarrationCache(
+                    data_path(env_str("NARRATION_CACHE_DIR", "data/narration")),
+                    env_int("NARRATION_CACHE_MAX_MB", 1024) * 1024 * 1024
+                ),
+                voice=voice,
+                voices=[voice] + [v for v in extra if v != voice],
+                script_mode=env_str("NARRATION_SCRIPT", "llm"),
+                script_model=env_str("NARRATION_MODEL") or None,
+                max_chars=env_int("NARRATION_CHUNK_CHARS", 1200),
+                prefetch=env_int("NARRATION_PREFETCH", 2),
+            )
+    return _pipeline
+
+
+async def open_narration_pipeline() -> Optional[NarrationPipeline]:
+    """
+    get_narration_pipeline() for the event loop: the first call builds the
+    pipeline in a worker thread, since opening the cache walks its directory.
+    """
+    if _pipeline is not None or _pipeline_error is not None:
+        return _pipeline
+    return await asyncio.to_thread(get_narration_pipeline)
+
+
+async def close_narration_pipeline() -> None:
+    """Close the TTS engine's connections, if the pipeline was built. Called at shutdown."""
+    if _pipeline is not None:
+        await _pipeline.aclose()
@@ -0,0 +1,371 @@
+"""
+PubMed E-utilities Client - Shared HTTP Connection Pool
+Keeps a single keep-alive httpx client open for the lifetime of the app so that
+esearch/efetch calls reuse TCP+TLS connections to eutils.ncbi.nlm.nih.gov.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+import httpx
+
+from config import env_bool, env_float, env_int, env_str, shared_state_path, worker_count
+from metrics import RATE_LIMIT_WAIT_SECONDS, UPSTREAM_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Override to point at a local stand-in (see benchmarks/fake_eutils.py)
+EUTILS_BASE_URL = env_str("EUTILS_BASE_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+
+# Per-call timeouts (seconds) used by search_pubmed / fetch_pubmed_articles
+SEARCH_TIMEOUT = env_float("EUTILS_SEARCH_TIMEOUT", 10.0)
+FETCH_TIMEOUT = env_float("EUTILS_FETCH_TIMEOUT", 15.0)
+
+
+def _build_client() -> httpx.AsyncClient:
+    """
+    Create the pooled E-utilities client from environment configuration.
+
+    Environment variables:
+        EUTILS_MAX_CONNECTIONS: Maximum open connections (default 20)
+        EUTILS_MAX_KEEPALIVE: Maximum idle keep-alive connections (default 10)
+        EUTILS_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 30)
+        EUTILS_CONNECT_TIMEOUT: Connect timeout in seconds (default 5)
+        EUTILS_HTTP2: Enable HTTP/2 if the optional `h2` package is installed
+    """
+    limits = httpx.Limits(
+        max_connections=env_int("EUTILS_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=env_int("EUTILS_MAX_KEEPALIVE", 10),
+        keepalive_expiry=env_float("EUTILS_KEEPALIVE_EXPIRY", 30.0),
+    )
+    timeout = httpx.Timeout(FETCH_TIMEOUT, connect=env_float("EUTILS_CONNECT_TIMEOUT", 5.0))
+
+    http2 = env_bool("EUTILS_HTTP2")
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("EUTILS_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        base_url=EUTILS_BASE_URL,
+        limits=limits,
+        timeout=timeout,
+        http2=http2,
+    )
+
+
+# =============================================================================
+# SHARED CLIENT LIFECYCLE
+# =============================================================================
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def open_eutils_client() -> httpx.AsyncClient:
+    """
+    Open the shared E-utilities client. Called once at application startup.
+    Calling it again while a client is open returns the existing client.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_eutils_client() -> None:
+    """Close the shared E-utilities client. Called at application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_eutils_client() -> httpx.AsyncClient:
+    """
+    Return the shared E-utilities client.
+    If the app lifespan did not open one (e.g. scripts calling the agent directly),
+    a client is created lazily and reused for subsequent calls.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+# =============================================================================
+# NCBI RATE LIMITING
+# =============================================================================
+
+# NCBI E-utilities quotas (requests per second)
+NCBI_RATE_WITHOUT_KEY = 3.0
+NCBI_RATE_WITH_KEY = 10.0
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+    Waiters are served in arrival order; bursts are capped at `burst` tokens.
+    The default burst of 1 spaces requests evenly: any one-second window sees
+    at most `rate` + 1 requests, whereas a burst equal to the rate would let
+    up to twice the quota through in the first second after an idle period.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1.0
+
+
+class SharedTokenBucket:
+    """
+    Token bucket whose balance lives in a SQLite row, so every worker process
+    on the host draws from one NCBI budget. A caller takes its token in a short
+    IMMEDIATE transaction (the balance may go negative, which queues later
+    callers behind it) and then sleeps until the token is due, outside the lock.
+    If the file becomes unusable, each worker falls back to an equal share of
+    the rate in a private bucket. Bursts default to 1 token, as in TokenBucket.
+    """
+
+    def __init__(self, path: str, name: str, rate: float, burst: float = 1.0, workers: int = 1):
+        self.path = path
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._fallback = TokenBucket(rate / max(workers, 1), burst=1.0)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode so _reserve controls the transaction explicitly
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def _reserve(self) -> float:
+        """Take one token and return the seconds to wait before it may be used."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            tokens -= 1.0
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        """Wait until this process's token from the shared budget is due."""
+        try:
+            wait = await asyncio.to_thread(self._reserve)
+        except sqlite3.Error as e:
+            logger.warning("Shared NCBI rate limiter unavailable, using this worker's share: %s", e)
+            await self._fallback.acquire()
+            return
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiters: Dict[float, Union[TokenBucket, SharedTokenBucket]] = {}
+
+
+def ncbi_rate_limit() -> float:
+    """
+    Requests per second allowed by NCBI for this host (shared by all workers).
+    NCBI_RATE_LIMIT overrides; otherwise 10/s with NCBI_API_KEY and 3/s without.
+    """
+    override = env_float("NCBI_RATE_LIMIT", 0.0)
+    if override > 0:
+        return override
+    return NCBI_RATE_WITH_KEY if os.getenv("NCBI_API_KEY") else NCBI_RATE_WITHOUT_KEY
+
+
+def get_rate_limiter() -> Union[TokenBucket, SharedTokenBucket]:
+    """
+    Return the NCBI token bucket for the current quota: a SQLite-backed bucket
+    shared by all workers when running several (see config.shared_state_path),
+    otherwise an in-process one holding this worker's equal share of the quota.
+    """
+    rate = ncbi_rate_limit()
+    limiter = _rate_limiters.get(rate)
+    if limiter is None:
+        path = shared_state_path()
+        if path:
+            try:
+                limiter = SharedTokenBucket(path, "ncbi", rate, workers=worker_count())
+            except sqlite3.Error as e:
+                logger.warning("Shared NCBI rate limiter disabled: %s", e)
+        if limiter is None:
+            limiter = TokenBucket(rate / worker_count())
+        _rate_limiters[rate] = limiter
+    return limiter
+
+
+async def eutils_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict,
+    timeout: float,
+    stream: bool = False
+) -> httpx.Response:
+    """
+    GET an E-utilities endpoint under the NCBI rate limit.
+    429 responses are retried (EUTILS_MAX_RETRIES, default 2), honouring Retry-After.
+    With stream=True the body is left unread (read it with aiter_bytes()) and
+    the caller must aclose() the response.
+    """
+    max_retries = max(0, env_int("EUTILS_MAX_RETRIES", 2))
+    limiter = get_rate_limiter()
+    operation = "esearch" if "esearch" in url else "efetch"
+
+    for attempt in range(max_retries + 1):
+        with RATE_LIMIT_WAIT_SECONDS.time():
+            await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            request = client.build_request("GET", url, params=params, timeout=timeout)
+            response = await client.send(request, stream=stream)
+        except httpx.HTTPError:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, service="ncbi", operation=operation, outcome="error")
+            raise
+        UPSTREAM_SECONDS.observe(
+            time.perf_counter() - start,
+            service="ncbi", operation=operation, outcome=str(response.status_code)
+        )
+        if response.status_code != 429 or attempt == max_retries:
+            break
+        await response.aclose()
+        retry_after = response.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else 0.5 * (2 ** attempt)
+        logger.info("NCBI returned 429, retrying in %.1fs", delay)
+        await asyncio.sleep(delay)
+
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError:
+        await response.aclose()
+        raise
+    return response
+
+
+# =============================================================================
+# EFETCH MICRO-BATCHING
+# =============================================================================
+
+class MicroBatcher:
+    """
+    Collects PMIDs requested by concurrent callers over a short window and
+    issues one combined fetch, then hands each caller back its own articles.
+
+    Args:
+        fetch_fn: Coroutine taking a list of PMIDs and returning article dicts
+        window_seconds: How long to wait for more callers before flushing
+        max_batch_size: Flush immediately once this many PMIDs are pending
+    """
+
+    def __init__(
+        self,
+        fetch_fn: Callable[[List[str]], Awaitable[List[dict]]],
+        window_seconds: float,
+        max_batch_size: int
+    ):
+        self.fetch_fn = fetch_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._pending_ids: Dict[str, None] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Running batch tasks, referenced so they are not garbage collected mid-fetch
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def fetch(self, pmids: List[str]) -> List[dict]:
+        """Fetch articles for pmids as part of the next combined request."""
+        if not pmids:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((pmids, future))
+        self._pending_ids.update(dict.fromkeys(pmids))
+        self.requests += 1
+
+        if len(self._pending_ids) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        waiters, pmids = self._pending, list(self._pending_ids)
+        self._pending, self._pending_ids = [], {}
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run_batch(pmids, waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, pmids: List[str], waiters: List[Tuple[List[str], asyncio.Future]]) -> None:
+        try:
+            articles = await self.fetch_fn(pmids)
+            by_id = {article["id"]: article for article in articles}
+            for requested, future in waiters:
+                if not future.done():
+                    future.set_result([by_id[pmid] for pmid in requested if pmid in by_id])
+        except Exception as e:
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Cancelled (e.g. at shutdown): callers get CancelledError rather than waiting forever
+            for _, future in waiters:
+                if not future.done():
+                    future.cancel()
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "batches": self.batches}
@@ -0,0 +1,297 @@
+"""
+PubMed XML Parsing - efetch Response Parsers
+Turns PubMed efetch XML into the article dicts used throughout the RAG pipeline.
+"""
+
+import io
+import logging
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+
+PUBMED_BASE_URL = "https://pubmed.ncbi.nlm.nih.gov"
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# STREAMING PARSER
+# =============================================================================
+
+def _child(elem: Optional[ET.Element], path: str) -> Optional[ET.Element]:
+    """Find a direct-child path under elem, tolerating a missing parent."""
+    return elem.find(path) if elem is not None else None
+
+
+def _article_from_element(article_elem: ET.Element) -> dict:
+    """
+    Build an article dict from one <PubmedArticle> element using direct child paths.
+    Mirrors the field rules of parse_pubmed_xml_tree exactly.
+    """
+    citation = article_elem.find("MedlineCitation")
+    article = _child(citation, "Article")
+    journal_elem = _child(article, "Journal")
+
+    # Get PMID
+    pmid_elem = _child(citation, "PMID")
+    pmid = pmid_elem.text if pmid_elem is not None else "Unknown"
+
+    # Get title
+    title_elem = _child(article, "ArticleTitle")
+    title = title_elem.text if title_elem is not None else "No title available"
+
+    # Get abstract (main abstract first, then any OtherAbstract, in document order)
+    abstract_parts = []
+    abstract_elems = []
+    if article is not None:
+        abstract_elems.extend(article.iterfind("Abstract/AbstractText"))
+    if citation is not None:
+        abstract_elems.extend(citation.iterfind("OtherAbstract/AbstractText"))
+    for abstract_elem in abstract_elems:
+        label = abstract_elem.get("Label", "")
+        text = abstract_elem.text or ""
+        if label:
+            abstract_parts.append(f"{label}: {text}")
+        else:
+            abstract_parts.append(text)
+    abstract = " ".join(abstract_parts) if abstract_parts else "No abstract available."
+
+    # Get authors
+    authors = []
+    if article is not None:
+        for author_elem in article.iterfind("AuthorList/Author"):
+            last_name = author_elem.find("LastName")
+            initials = author_elem.find("Initials")
+            if last_name is not None:
+                author_name = last_name.text
+                if initials is not None:
+                    author_name += f" {initials.text}"
+                authors.append(author_name)
+
+    # Format authors string
+    if len(authors) > 3:
+        authors_str = f"{authors[0]}, {authors[1]}, {authors[2]}, et al."
+    elif authors:
+        authors_str = ", ".join(authors)
+    else:
+        authors_str = "Unknown authors"
+
+    # Get journal info
+    journal_title = _child(journal_elem, "Title")
+    journal = journal_title.text if journal_title is not None else "Unknown journal"
+
+    # Get publication year
+    pub_date = _child(journal_elem, "JournalIssue/PubDate")
+    year_elem = _child(pub_date, "Year")
+    if year_elem is None:
+        year_elem = _child(pub_date, "MedlineDate")
+    year = year_elem.text[:4] if year_elem is not None and year_elem.text else "Unknown"
+
+    return {
+        "id": pmid,
+        "title": title,
+        "content": abstract,
+        "authors": authors_str,
+        "journal": journal,
+        "year": year,
+        "url": f"{PUBMED_BASE_URL}/{pmid}"
+    }
+
+
+class _RecordBuilder:
+    """Turns "end" events into records; shared by the pull and push parsers."""
+
+    def __init__(self):
+        self._pending: Optional[ET.Element] = None
+
+    def end(self, elem: ET.Element) -> Iterator[Tuple[str, Union[dict, str]]]:
+        # An article is handled on the following event; a <PubmedArticle> that
+        # ends last is the document root, which (like ".//PubmedArticle") is skipped
+        if self._pending is not None:
+            try:
+                yield "article", _article_from_element(self._pending)
+            except Exception as e:
+                logger.warning("Error parsing article: %s", e)
+            self._pending.clear()
+            self._pending = None
+        if elem.tag == "PubmedArticle":
+            self._pending = elem
+        elif elem.tag == "DeleteCitation":
+            for pmid_elem in elem.iterfind("PMID"):
+                if pmid_elem.text:
+                    yield "delete", pmid_elem.text.strip()
+            elem.clear()
+
+
+def iter_pubmed_records(source: Union[str, IO]) -> Iterator[Tuple[str, Union[dict, str]]]:
+    """
+    Incrementally parse PubMed XML, including baseline and update files.
+    Yields ("article", article dict) per <PubmedArticle> and ("delete", pmid)
+    per PMID listed under <DeleteCitation>, in document order. Each element is
+    cleared once consumed, so memory stays flat regardless of document size.
+
+    Args:
+        source: File path or binary/text file-like object
+
+    Raises:
+        ET.ParseError: If the document is malformed
+    """
+    records = _RecordBuilder()
+    for _, elem in ET.iterparse(source, events=("end",)):
+        yield from records.end(elem)
+
+
+def iter_pubmed_articles(source: Union[str, IO]) -> Iterator[dict]:
+    """
+    Incrementally parse PubMed XML, yielding one article dict per <PubmedArticle>.
+    Each article element is cleared once consumed, so memory stays flat
+    regardless of how many articles the document holds.
+
+    Args:
+        source: File path or binary/text file-like object
+
+    Raises:
+        ET.ParseError: If the document is malformed
+    """
+    for kind, record in iter_pubmed_records(source):
+        if kind == "article":
+            yield record
+
+
+class PubMedFeedParser:
+    """
+    Push-style counterpart of iter_pubmed_articles for a body that arrives in
+    chunks (e.g. an efetch response read with aiter_bytes): feed() each chunk
+    and collect the articles it completes, then close(). Only the current
+    chunk and the article being built are held, never the whole document.
+
+    Raises:
+        ET.ParseError: From feed() or close(), if the document is malformed
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("end",))
+        self._records = _RecordBuilder()
+
+    def _articles(self) -> List[dict]:
+        return [
+            record
+            for _, elem in self._parser.read_events()
+            for kind, record in self._records.end(elem)
+            if kind == "article"
+        ]
+
+    def feed(self, data: bytes) -> List[dict]:
+        """Parse the next chunk; returns the articles it completed."""
+        self._parser.feed(data)
+        return self._articles()
+
+    def close(self) -> List[dict]:
+        """Finish the document; returns any articles still pending."""
+        self._parser.close()
+        return self._articles()
+
+
+def parse_pubmed_xml(xml_content: Union[str, bytes]) -> List[dict]:
+    """
+    Parse PubMed XML response and extract article information.
+    Accepts the raw response bytes (preferred) or decoded text.
+    Returns the same dicts as parse_pubmed_xml_tree; a malformed document
+    yields an empty list.
+    """
+    if isinstance(xml_content, bytes):
+        source = io.BytesIO(xml_content)
+    else:
+        source = io.StringIO(xml_content)
+
+    try:
+        return list(iter_pubmed_articles(source))
+    except ET.ParseError as e:
+        logger.warning("Error parsing PubMed XML: %s", e)
+        return []
+
+
+# =============================================================================
+# REFERENCE TREE PARSER
+# =============================================================================
+
+def parse_pubmed_xml_tree(xml_content: str) -> List[dict]:
+    """
+    Parse PubMed XML response and extract article information.
+    Reference DOM-based parser: loads the whole document with ET.fromstring.
+    parse_pubmed_xml produces identical output and is used by the pipeline;
+    this version is kept for equivalence checks and benchmarks.
+    """
+    articles = []
+    
+    try:
+        root = ET.fromstring(xml_content)
+        
+        for article_elem in root.findall(".//PubmedArticle"):
+            try:
+                # Get PMID
+                pmid_elem = article_elem.find(".//PMID")
+                pmid = pmid_elem.text if pmid_elem is not None else "Unknown"
+                
+                # Get title
+                title_elem = article_elem.find(".//ArticleTitle")
+                title = title_elem.text if title_elem is not None else "No title available"
+                
+                # Get abstract
+                abstract_parts = []
+                for abstract_elem in article_elem.findall(".//AbstractText"):
+                    label = abstract_elem.get("Label", "")
+                    text = abstract_elem.text or ""
+                    if label:
+                        abstract_parts.append(f"{label}: {text}")
+                    else:
+                        abstract_parts.append(text)
+                abstract = " ".join(abstract_parts) if abstract_parts else "No abstract available."
+                
+                # Get authors
+                authors = []
+                for author_elem in article_elem.findall(".//Author"):
+                    last_name = author_elem.find("LastName")
+                    initials = author_elem.find("Initials")
+                    if last_name is not None:
+                        author_name = last_name.text
+                        if initials is not None:
+                            author_name += f" {initials.text}"
+                        authors.append(author_name)
+                
+                # Format authors string
+                if len(authors) > 3:
+                    authors_str = f"{authors[0]}, {authors[1]}, {authors[2]}, et al."
+                elif authors:
+                    authors_str = ", ".join(authors)
+                else:
+                    authors_str = "Unknown authors"
+                
+                # Get journal info
+                journal_elem = article_elem.find(".//Journal/Title")
+                journal = journal_elem.text if journal_elem is not None else "Unknown journal"
+                
+                # Get publication year
+                year_elem = article_elem.find(".//PubDate/Year")
+                if year_elem is None:
+                    year_elem = article_elem.find(".//PubDate/MedlineDate")
+                year = year_elem.text[:4] if year_elem is not None and year_elem.text else "Unknown"
+                
+                articles.append({
+                    "id": pmid,
+                    "title": title,
+                    "content": abstract,
+                    "authors": authors_str,
+                    "journal": journal,
+                    "year": year,
+                    "url": f"{PUBMED_BASE_URL}/{pmid}"
+                })
+                
+            except Exception as e:
+                logger.warning("Error parsing article: %s", e)
+                continue
+                
+    except ET.ParseError as e:
+        logger.warning("Error parsing PubMed XML: %s", e)
+        
+    return articles
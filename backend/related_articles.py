@@ -0,0 +1,442 @@
+"""
+Related Articles - Precomputed TF-IDF Nearest Neighbours for Site Articles
+A batch job that vectorizes every article (field-weighted TF-IDF over the
+same terms as the site search index), finds each article's top-N most
+similar articles with a sparse matrix product in NumPy (a dense BLAS product
+when the corpus is small), and stores them as a compact table: neighbour row
+ids (int32) and cosine scores (float16) per article. /articles/{slug}/related looks an article up in O(1).
+
+Updates are incremental: only new and edited articles get their similarities
+recomputed, plus the few articles whose neighbour lists contained a changed
+or deleted article. IDF weights are frozen between full rebuilds, which
+happen on --full or once the corpus has grown by RELATED_REBUILD_GROWTH.
+
+Usage (from the backend directory):
+    python related_articles.py                # incremental update from SITE_ARTICLES_SOURCE
+    python related_articles.py --full --top-n 8
+"""
+
+import argparse
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import data_path, env_float, env_int, env_str
+from site_articles import article_terms, build_site_source, row_version
+
+logger = logging.getLogger(__name__)
+
+
+FORMAT_VERSION = 1
+
+# Query rows whose similarities are accumulated in one bincount
+SIMILARITY_BATCH_ROWS = 256
+# Largest rows x terms matrix multiplied densely (BLAS) instead of via the sparse index
+DENSE_MAX_CELLS = 1 << 24
+
+
+class RelatedArticles:
+    """
+    Top-N related-articles table with the TF-IDF vectors needed to update it.
+
+    Rows are article slots: deleted articles free their row for reuse, so row
+    ids (and the stored neighbour ids) stay stable across updates. Vectors are
+    L2-normalized, so a dot product is the cosine similarity.
+
+    build() and update() run in a worker thread while related() serves requests
+    on the event loop, so lookups read a snapshot of the table that is replaced
+    by a single assignment once a build or update has finished.
+    """
+
+    def __init__(self, top_n: int = 6):
+        self.top_n = top_n
+        self.slugs: List[Optional[str]] = []
+        self.versions: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.vocab: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.vectors: List[Optional[Tuple[np.ndarray, np.ndarray]]] = []
+        self.neighbors = np.full((0, top_n), -1, dtype=np.int32)
+        self.scores = np.zeros((0, top_n), dtype=np.float16)
+        self.built_with = 0  # live articles when IDF was last computed
+        self._columns = None  # term-major copy of the vectors (CSC), rebuilt on change
+        self.recomputed = 0
+        self._lookup: Tuple[Dict[str, int], List[Optional[str]], np.ndarray, np.ndarray] = (
+            {}, [], self.neighbors, self.scores
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # -------------------------------------------------------------------------
+    # Vectors
+    # -------------------------------------------------------------------------
+
+    def _vector(self, terms: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sublinear TF-IDF vector (term ids, weights), L2-normalized; new terms get the rarest IDF."""
+        default_idf = math.log((1 + max(self.built_with, 1)) / 2) + 1
+        ids = np.empty(len(terms), dtype=np.int32)
+        weights = np.empty(len(terms), dtype=np.float32)
+        for i, (term, tf) in enumerate(terms.items()):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                term_id = self.vocab[term] = len(self.vocab)
+                self.idf = np.append(self.idf, np.float32(default_idf))
+            ids[i] = term_id
+            weights[i] = (1 + math.log(tf)) * self.idf[term_id]
+        norm = float(np.linalg.norm(weights))
+        if norm:
+            weights /= norm
+        order = np.argsort(ids)
+        return ids[order], weights[order]
+
+    def _column_index(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr by term, row ids, weights): the vectors transposed, for similarity products."""
+        if self._columns is None:
+            live = [(row, vector) for row, vector in enumerate(self.vectors) if vector is not None]
+            if live:
+                rows = np.concatenate([np.full(len(vector[0]), row, dtype=np.int32) for row, vector in live])
+                terms = np.concatenate([vector[0] for _, vector in live])
+                weights = np.concatenate([vector[1] for _, vector in live])
+            else:
+                rows = terms = np.zeros(0, dtype=np.int32)
+                weights = np.zeros(0, dtype=np.float32)
+            order = np.argsort(terms, kind="stable")
+            indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=indptr[1:])
+            self._columns = (indptr, rows[order], weights[order])
+        return self._columns
+
+    def similarities(self, query_rows: List[int]) -> np.ndarray:
+        """
+        Cosine similarity of each query row to every row: a (queries x rows)
+        block of X @ X.T, gathered from the term-major index and summed with
+        one bincount per batch.
+        """
+        n = len(self.vectors)
+        if n * len(self.vocab) <= DENSE_MAX_CELLS:
+            # Small corpus: a dense matrix product is faster than gathering postings
+            dense = np.zeros((n, len(self.vocab)), dtype=np.float32)
+            for row, vector in enumerate(self.vectors):
+                if vector is not None:
+                    dense[row, vector[0]] = vector[1]
+            return dense[list(query_rows)] @ dense.T
+
+        indptr, column_rows, column_weights = self._column_index()
+        result = np.zeros((len(query_rows), n), dtype=np.float32)
+        for start in range(0, len(query_rows), SIMILARITY_BATCH_ROWS):
+            batch = query_rows[start:start + SIMILARITY_BATCH_ROWS]
+            targets, values = [], []
+            for i, row in enumerate(batch):
+                term_ids, weights = self.vectors[row]
+                starts, ends = indptr[term_ids], indptr[term_ids + 1]
+                lengths = ends - starts
+                if not lengths.sum():
+                    continue
+                positions = np.repeat(ends - lengths.cumsum(), lengths) + np.arange(lengths.sum())
+                targets.append(column_rows[positions] + i * n)
+                values.append(column_weights[positions] * np.repeat(weights, lengths))
+            if targets:
+                block = np.bincount(
+                    np.concatenate(targets), weights=np.concatenate(values), minlength=len(batch) * n
+                )
+                result[start:start + len(batch)] = block.reshape(len(batch), n)
+        return result
+
+    def _free_rows(self) -> np.ndarray:
+        return np.array([row for row, vector in enumerate(self.vectors) if vector is None], dtype=np.int64)
+
+    def _top(self, row: int, similarity: np.ndarray, free_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-N neighbour rows and scores from one row's similarity vector."""
+        similarity = similarity.copy()
+        similarity[row] = -1.0
+        similarity[free_rows] = -1.0
+        k = min(self.top_n, max(len(similarity) - 1, 0))
+        neighbors = np.full(self.top_n, -1, dtype=np.int32)
+        scores = np.zeros(self.top_n, dtype=np.float16)
+        if k:
+            top = np.argpartition(-similarity, k - 1)[:k]
+            top = top[np.argsort(-similarity[top], kind="stable")]
+            top = top[similarity[top] > 0]
+            neighbors[:len(top)] = top
+            scores[:len(top)] = similarity[top]
+        return neighbors, scores
+
+    def _recompute(self, rows: Iterable[int]) -> None:
+        rows = sorted(set(rows))
+        free_rows = self._free_rows()
+        for start in range(0, len(rows), SIMILARITY_BATCH_ROWS):
+            batch = rows[start:start + SIMILARITY_BATCH_ROWS]
+            block = self.similarities(batch)
+            for row, similarity in zip(batch, block):
+                self.neighbors[row], self.scores[row] = self._top(row, similarity, free_rows)
+        self.recomputed += len(rows)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+
+    def build(self, articles: List[dict]) -> None:
+        """Full rebuild: recompute IDF over articles, then every neighbour list."""
+        top_n, lookup = self.top_n, self._lookup
+        self.__init__(top_n)
+        self._lookup = lookup  # keep serving the old table until the rebuild is done
+        documents = [article_terms(article) for article in articles]
+        df: Dict[str, int] = {}
+        for terms in documents:
+            for term in terms:
+                df[term] = df.get(term, 0) + 1
+        self.vocab = {term: i for i, term in enumerate(sorted(df))}
+        n = len(articles)
+        self.idf = np.array(
+            [math.log((1 + n) / (1 + df[term])) + 1 for term in sorted(df)], dtype=np.float32
+        )
+        self.built_with = n
+        self.slugs = [None] * n
+        self.versions = [""] * n
+        self.vectors = [None] * n
+        self.neighbors = np.full((n, self.top_n), -1, dtype=np.int32)
+        self.scores = np.zeros((n, self.top_n), dtype=np.float16)
+        for article, terms in zip(articles, documents):
+            self._assign(article, terms)
+        self._recompute(range(len(self.slugs)))
+        self._publish()
+
+    def _assign(self, article: dict, terms: Optional[Dict[str, float]] = None) -> int:
+        """Store an article's vector in its row (a free or new one if it is new)."""
+        slug = article["slug"]
+        row = self.rows.get(slug)
+        if row is None:
+            free = self.slugs.index(None) if len(self.rows) < len(self.slugs) else -1
+            if free >= 0:
+                row = free
+            else:
+                row = len(self.slugs)
+                self.slugs.append(None)
+                self.versions.append("")
+                self.vectors.append(None)
+                self.neighbors = np.vstack([self.neighbors, np.full((1, self.top_n), -1, dtype=np.int32)])
+                self.scores = np.vstack([self.scores, np.zeros((1, self.top_n), dtype=np.float16)])
+            self.rows[slug] = row
+            self.slugs[row] = slug
+        self.versions[row] = row_version(article)
+        self.vectors[row] = self._vector(terms if terms is not None else article_terms(article))
+        self._columns = None
+        return row
+
+    def _remove(self, slug: str) -> Optional[int]:
+        row = self.rows.pop(slug, None)
+        if row is not None:
+            self.slugs[row] = None
+            self.versions[row] = ""
+            self.vectors[row] = None
+            self.neighbors[row] = -1
+            self.scores[row] = 0
+            self._columns = None
+        return row
+
+    def update(self, changed: List[dict], removed: Iterable[str] = ()) -> dict:
+        """
+        Apply new/edited articles and deletions, recomputing only affected rows:
+            - changed rows get fresh neighbour lists
+            - rows that listed a changed or removed article are recomputed
+              (the article's score changed, so the list may need its next-best)
+            - every other row only merges in changed articles that now beat
+              its weakest neighbour, using the similarities already computed
+        Returns counts of rows recomputed and merged.
+        """
+        changed = [article for article in changed if article.get("slug")]
+        stale = {self.rows[a["slug"]] for a in changed if a["slug"] in self.rows}
+        stale.update(row for row in (self._remove(slug) for slug in removed) if row is not None)
+        changed_rows = [self._assign(article) for article in changed]
+
+        affected = set()
+        if stale or changed_rows:
+            listed = np.isin(self.neighbors, np.fromiter(stale | set(changed_rows), dtype=np.int32))
+            affected = {int(row) for row in np.nonzero(listed.any(axis=1))[0] if self.slugs[row] is not None}
+        affected -= set(changed_rows)
+
+        merged = 0
+        if changed_rows:
+            block = self.similarities(changed_rows)
+            free_rows = self._free_rows()
+            for row, similarity in zip(changed_rows, block):
+                self.neighbors[row], self.scores[row] = self._top(row, similarity, free_rows)
+            self.recomputed += len(changed_rows)
+
+            # Similarity is symmetric: column r of the block is row r's similarity to each changed article
+            changed_index = np.array(changed_rows, dtype=np.int32)
+            for row in range(len(self.slugs)):
+                if self.slugs[row] is None or row in affected or row in changed_rows:
+                    continue
+                candidates = block[:, row]
+                weakest = float(self.scores[row, -1]) if self.neighbors[row, -1] >= 0 else 0.0
+                better = candidates > weakest
+                if not better.any():
+                    continue
+                pool = {int(n): float(s) for n, s in zip(self.neighbors[row], self.scores[row]) if n >= 0}
+                pool.update((int(n), float(s)) for n, s in zip(changed_index[better], candidates[better]))
+                best = sorted(pool.items(), key=lambda item: -item[1])[:self.top_n]
+                self.neighbors[row] = -1
+                self.scores[row] = 0
+                for i, (neighbor, score) in enumerate(best):
+                    self.neighbors[row, i] = neighbor
+                    self.scores[row, i] = score
+                merged += 1
+
+        self._recompute(affected)
+        self._publish()
+        return {"changed": len(changed_rows), "recomputed": len(changed_rows) + len(affected), "merged": merged}
+
+    def sync(self, articles: List[dict], rebuild_growth: float = 0.25, full: bool = False) -> dict:
+        """
+        Bring the table in line with a full list of articles: rebuild when asked
+        or when the corpus grew by more than rebuild_growth since IDF was computed,
+        otherwise update only the new, edited and removed articles.
+        """
+        if full or not self.built_with or len(articles) > self.built_with * (1 + rebuild_growth):
+            self.build(articles)
+            return {"rebuilt": True, "changed": len(articles), "recomputed": len(articles), "merged": 0}
+        live = {article["slug"]: article for article in articles if article.get("slug")}
+        changed = [
+            article for slug, article in live.items()
+            if slug not in self.rows or self.versions[self.rows[slug]] != row_version(article)
+        ]
+        removed = [slug for slug in self.rows if slug not in live]
+        return {"rebuilt": False, **self.update(changed, removed)}
+
+    # -------------------------------------------------------------------------
+    # Lookup and storage
+    # -------------------------------------------------------------------------
+
+    def _publish(self) -> None:
+        """Swap in a lookup snapshot of the current table for related()."""
+        self._lookup = (dict(self.rows), list(self.slugs), self.neighbors.copy(), self.scores.copy())
+
+    def related(self, slug: str, limit: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        """(slug, score) of an article's nearest neighbours, best first; None if unknown."""
+        rows, slugs, neighbors, scores = self._lookup
+        row = rows.get(slug)
+        if row is None:
+            return None
+        result = []
+        for neighbor, score in zip(neighbors[row], scores[row]):
+            if neighbor < 0 or slugs[neighbor] is None:
+                break
+            result.append((slugs[neighbor], round(float(score), 4)))
+        return result[:limit] if limit else result
+
+    def save(self, path: str) -> None:
+        """Write the table atomically (.npz, no pickled objects)."""
+        lengths = np.array([len(v[0]) if v is not None else 0 for v in self.vectors], dtype=np.int64)
+        indptr = np.zeros(len(self.vectors) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        live = [vector for vector in self.vectors if vector is not None]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(
+                f,
+                meta=np.array([FORMAT_VERSION, self.top_n, self.built_with], dtype=np.int64),
+                slugs=np.array([slug or "" for slug in self.slugs], dtype=str),
+                versions=np.array(self.versions, dtype=str),
+                vocab=np.array(sorted(self.vocab, key=self.vocab.get), dtype=str),
+                idf=self.idf,
+                vector_indptr=indptr,
+                vector_terms=np.concatenate([v[0] for v in live]) if live else np.zeros(0, np.int32),
+                vector_weights=np.concatenate([v[1] for v in live]) if live else np.zeros(0, np.float32),
+                neighbors=self.neighbors,
+                scores=self.scores,
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RelatedArticles":
+        with np.load(path, allow_pickle=False) as data:
+            version, top_n, built_with = (int(value) for value in data["meta"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported related-articles format {version} in {path}")
+            table = cls(top_n)
+            table.built_with = built_with
+            table.slugs = [str(slug) or None for slug in data["slugs"]]
+            table.versions = [str(version) for version in data["versions"]]
+            table.rows = {slug: row for row, slug in enumerate(table.slugs) if slug}
+            table.vocab = {str(term): i for i, term in enumerate(data["vocab"])}
+            table.idf = data["idf"].astype(np.float32)
+            indptr, terms, weights = data["vector_indptr"], data["vector_terms"], data["vector_weights"]
+            table.vectors = [
+                (terms[indptr[row]:indptr[row + 1]].copy(), weights[indptr[row]:indptr[row + 1]].copy())
+                if table.slugs[row] else None
+                for row in range(len(table.slugs))
+            ]
+            table.neighbors = data["neighbors"].astype(np.int32)
+            table.scores = data["scores"].astype(np.float16)
+        table._publish()
+        return table
+
+    def stats(self) -> dict:
+        return {
+            "articles": len(self.rows),
+            "top_n": self.top_n,
+            "terms": len(self.vocab),
+            "idf_articles": self.built_with,
+            "rows_recomputed": self.recomputed,
+        }
+
+
+RELATED_ARTICLES_PATH = data_path(env_str("RELATED_ARTICLES_PATH", "data/related_articles.npz"))
+RELATED_ARTICLES_TOP_N = env_int("RELATED_ARTICLES_TOP_N", 6)
+RELATED_REBUILD_GROWTH = env_float("RELATED_REBUILD_GROWTH", 0.25)
+
+
+def load_related_articles(path: str = RELATED_ARTICLES_PATH) -> RelatedArticles:
+    """
+    The stored table, or an empty one if it is missing or unreadable.
+
+    Environment variables:
+        RELATED_ARTICLES_PATH: Where the table is stored (.npz)
+        RELATED_ARTICLES_TOP_N: Neighbours kept per article
+        RELATED_REBUILD_GROWTH: Corpus growth (fraction) that triggers a full rebuild
+    """
+    if path and os.path.exists(path):
+        try:
+            table = RelatedArticles.load(path)
+            if table.top_n == RELATED_ARTICLES_TOP_N:
+                return table
+            logger.info("RELATED_ARTICLES_TOP_N changed; the related-articles table will be rebuilt")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load related articles from %s: %s", path, e)
+    return RelatedArticles(RELATED_ARTICLES_TOP_N)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=RELATED_ARTICLES_PATH, help="table path (default: RELATED_ARTICLES_PATH)")
+    parser.add_argument("--full", action="store_true", help="recompute IDF and every row")
+    parser.add_argument("--top-n", type=int, default=RELATED_ARTICLES_TOP_N)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    source = build_site_source()
+    if source is None:
+        raise SystemExit("Set SITE_ARTICLES_SOURCE to a .sql/.json dump or \"supabase\"")
+    articles = [article for article in (source.changes(None) or []) if article.get("slug") and article.get("title")]
+
+    table = load_related_articles(args.output) if not args.full else RelatedArticles(args.top_n)
+    if table.top_n != args.top_n:
+        table = RelatedArticles(args.top_n)
+    result = table.sync(articles, RELATED_REBUILD_GROWTH, full=args.full)
+    table.save(args.output)
+    logger.info(
+        "%s: %d articles, %d rows recomputed, %d merged -> %s",
+        "Rebuilt" if result["rebuilt"] else "Updated", len(table), result["recomputed"], result["merged"], args.output
+    )
+
+
+if __name__ == "__main__":
+    main()
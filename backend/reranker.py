@@ -0,0 +1,99 @@
+"""
+Local Reranker - Vectorized BM25 over Retrieved Articles
+Scores a batch of PubMed articles (title + abstract) against the user's question
+with NumPy and keeps only the most relevant ones for the generation prompt.
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str, stop_words: Iterable[str] = ()) -> List[str]:
+    """Lowercase word tokens, dropping stop-words and single characters."""
+    stop_words = set(stop_words)
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in stop_words
+    ]
+
+
+def bm25_scores(
+    query: str,
+    documents: List[str],
+    stop_words: Iterable[str] = (),
+    k1: float = BM25_K1,
+    b: float = BM25_B
+) -> np.ndarray:
+    """
+    BM25 score of every document against the query, computed for the whole
+    batch at once.
+
+    Tokens from all documents are flattened into one array and mapped to
+    query-term columns with a vectorized searchsorted, the term-frequency
+    matrix (documents x query terms) is built with a single scatter-add, and
+    IDF weighting, length normalization and the query dot-product are dense
+    array operations.
+    """
+    stop_words = set(stop_words)
+    query_tokens = tokenize(query, stop_words)
+    if not documents or not query_tokens:
+        return np.zeros(len(documents))
+
+    terms = np.array(sorted(set(query_tokens)))
+    query_weights = np.zeros(len(terms))
+    np.add.at(query_weights, np.searchsorted(terms, query_tokens), 1.0)
+
+    # Flatten every document's tokens into one array with a parallel doc-id array
+    token_lists = [tokenize(document, stop_words) for document in documents]
+    doc_lengths = np.array([len(tokens) for tokens in token_lists], dtype=float)
+    flat_tokens = [token for tokens in token_lists for token in tokens]
+    if not flat_tokens:
+        return np.zeros(len(documents))
+    all_tokens = np.array(flat_tokens)
+    doc_ids = np.repeat(np.arange(len(documents)), doc_lengths.astype(np.intp))
+
+    # Map tokens to query-term columns; tokens outside the query are dropped
+    positions = np.minimum(np.searchsorted(terms, all_tokens), len(terms) - 1)
+    matched = terms[positions] == all_tokens
+
+    tf = np.zeros((len(documents), len(terms)))
+    np.add.at(tf, (doc_ids[matched], positions[matched]), 1.0)
+
+    n_docs = len(documents)
+    doc_freq = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    avg_length = doc_lengths.mean() or 1.0
+    norm = k1 * (1.0 - b + b * doc_lengths / avg_length)
+    saturated = tf * (k1 + 1.0) / (tf + norm[:, None])
+
+    return saturated @ (idf * query_weights)
+
+
+def rerank_articles(
+    question: str,
+    articles: List[dict],
+    top_k: int,
+    stop_words: Optional[Iterable[str]] = None
+) -> List[dict]:
+    """
+    Return the top_k articles most relevant to the question by BM25 over
+    title + abstract. Ties keep the original (PubMed relevance) order.
+    """
+    if len(articles) <= 1:
+        return articles[:top_k]
+
+    documents = [f"{article.get('title') or ''} {article.get('content') or ''}" for article in articles]
+    scores = bm25_scores(question, documents, stop_words or ())
+    # Stable sort on negated scores keeps PubMed order for ties
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [articles[i] for i in order]
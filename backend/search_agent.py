@@ -3,31 +3,136 @@ Wellness Search Agent - LangGraph RAG Implementation
 Handles PubMed article retrieval and AI-powered answer generation.
 """
 
+import asyncio
+import logging
+import operator
 import os
+import re
+import threading
+import time
 import xml.etree.ElementTree as ET
-from typing import List, Optional
-from typing_extensions import TypedDict
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from typing_extensions import Annotated, TypedDict
 import httpx
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from langgraph.graph import StateGraph, START, END
+from cache import SingleFlight, build_shared_flight, build_tiered_cache
+from llm_clients import ainvoke_llm, get_llm
+from config import env_bool, env_float, env_int, env_str, shared_state_path
+from local_index import LocalPubMedIndex, get_local_index
+from pubmed_parser import PubMedFeedParser
+from reranker import rerank_articles, tokenize
+from sessions import Session, build_session_store
+from site_articles import site_index, site_source
+from context_builder import build_context, estimate_tokens, format_article
+from metrics import (
+    LOCAL_INDEX_SECONDS,
+    NODE_SECONDS,
+    PROMPT_CONTEXT_TOKENS,
+    RETRIEVAL_FALLBACK_TOTAL,
+    ROUTE_TOTAL,
+    SESSION_CONTEXT_TOTAL,
+    XML_PARSE_SECONDS,
+    ZERO_RESULTS_TOTAL
+)
+from pubmed_client import (
+    EUTILS_BASE_URL,
+    MicroBatcher,
+    eutils_get,
+    get_eutils_client,
+    SEARCH_TIMEOUT,
+    FETCH_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
 
 
 # =============================================================================
 # PUBMED API CLIENT
 # =============================================================================
 
-PUBMED_SEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-PUBMED_FETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-PUBMED_BASE_URL = "https://pubmed.ncbi.nlm.nih.gov"
+PUBMED_SEARCH_URL = f"{EUTILS_BASE_URL}/esearch.fcgi"
+PUBMED_FETCH_URL = f"{EUTILS_BASE_URL}/efetch.fcgi"
+
+# Parsed articles keyed by PMID: per-process LRU + SQLite tier shared by workers
+article_cache = build_tiered_cache(
+    "articles",
+    "ARTICLE_CACHE",
+    memory_max_entries=1000,
+    disk_max_entries=50000,
+    ttl_seconds=7 * 24 * 3600
+)
+
+# Enhanced PubMed queries keyed by normalized question
+query_cache = build_tiered_cache(
+    "queries",
+    "QUERY_CACHE",
+    memory_max_entries=5000,
+    disk_max_entries=100000,
+    ttl_seconds=7 * 24 * 3600
+)
+
+# Full pipeline results ({"answer", "context"}) keyed by normalized question
+answer_cache = build_tiered_cache(
+    "answers",
+    "ANSWER_CACHE",
+    memory_max_entries=2000,
+    disk_max_entries=20000,
+    ttl_seconds=3600
+)
+
+# Concurrent identical questions share one in-flight graph execution
+answer_flights = SingleFlight()
+
+# With several workers, one worker runs the graph for a question while the
+# others wait for its answer to land in the shared answer cache
+answer_leases = build_shared_flight(
+    "answers",
+    shared_state_path() if answer_cache.disk is not None else "",
+    lease_seconds=env_float("ANSWER_LEASE_SECONDS", 60.0)
+)
+
+# Where PMIDs and articles come from: "eutils" (live NCBI) or "local" (the
+# offline index built by ingest_pubmed.py, with E-utilities as the fallback)
+RETRIEVAL_BACKEND = env_str("RETRIEVAL_BACKEND", "eutils").lower()
+# Whether a local-index search with no hits (or a missing index) goes to E-utilities
+LOCAL_INDEX_FALLBACK = env_bool("LOCAL_INDEX_FALLBACK", True)
+
+
+def local_index() -> Optional[LocalPubMedIndex]:
+    """The local PubMed index when it is the configured backend and opens, else None."""
+    return get_local_index() if RETRIEVAL_BACKEND == "local" else None
+
+
+def _timed_index_call(operation: str, fn, *args):
+    """Run a (blocking) local index call, recording its latency."""
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        LOCAL_INDEX_SECONDS.observe(time.perf_counter() - start, operation=operation)
 
 
-async def search_pubmed(query: str, max_results: int = 5) -> List[str]:
+async def search_pubmed(
+    query: str,
+    max_results: int = 5,
+    client: Optional[httpx.AsyncClient] = None
+) -> List[str]:
     """
     Search PubMed for articles matching the query.
     Returns a list of PubMed IDs (PMIDs).
+    With the local backend the offline index answers first; E-utilities
+    (the shared pooled client unless one is passed in) is the fallback.
     """
+    index = local_index()
+    if index is not None:
+        pmids = await asyncio.to_thread(_timed_index_call, "search", index.search, query, max_results)
+        if pmids or not LOCAL_INDEX_FALLBACK:
+            return pmids
+        RETRIEVAL_FALLBACK_TOTAL.inc(kind="local_index_miss")
+    elif RETRIEVAL_BACKEND == "local" and not LOCAL_INDEX_FALLBACK:
+        raise RuntimeError("Local PubMed index unavailable and E-utilities fallback disabled")
+
     params = {
         "db": "pubmed",
         "term": query,
@@ -41,22 +146,122 @@ async def search_pubmed(query: str, max_results: int = 5) -> List[str]:
     if api_key:
         params["api_key"] = api_key
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(PUBMED_SEARCH_URL, params=params, timeout=10.0)
-        response.raise_for_status()
-        data = response.json()
+    client = client or get_eutils_client()
+    response = await eutils_get(client, PUBMED_SEARCH_URL, params, SEARCH_TIMEOUT)
+    data = response.json()
         
     return data.get("esearchresult", {}).get("idlist", [])
 
 
-async def fetch_pubmed_articles(pmids: List[str]) -> List[dict]:
+async def fetch_pubmed_articles(
+    pmids: List[str],
+    client: Optional[httpx.AsyncClient] = None,
+    use_cache: bool = True
+) -> List[dict]:
     """
     Fetch article details from PubMed given a list of PMIDs.
-    Returns a list of article dictionaries with title, abstract, authors, etc.
+    Returns a list of article dictionaries with title, abstract, authors, etc.,
+    in the order of the requested PMIDs.
+    Articles in the local index (with the local backend) or the article
+    cache are served from them; only the remaining PMIDs are requested from NCBI.
     """
     if not pmids:
         return []
     
+    if not use_cache:
+        return await _efetch_articles(pmids, client)
+    
+    memo = batch_articles.get()
+    found = {}
+    if memo is not None:
+        memo.requested += len(pmids)
+        found = {pmid: memo.articles[pmid] for pmid in pmids if pmid in memo.articles}
+    
+    index = local_index()
+    lookup = [pmid for pmid in pmids if pmid not in found]
+    if lookup and index is not None:
+        found.update(await asyncio.to_thread(_timed_index_call, "fetch", index.get_articles, lookup))
+    
+    lookup = [pmid for pmid in pmids if pmid not in found]
+    if lookup:
+        found.update(await asyncio.to_thread(article_cache.get_many, lookup))
+    
+    missing = [pmid for pmid in pmids if pmid not in found]
+    if missing:
+        found.update(await _fetch_missing_articles(missing, client))
+    
+    if memo is not None:
+        memo.articles.update((pmid, found[pmid]) for pmid in pmids if pmid in found)
+    return [dict(found[pmid]) for pmid in pmids if pmid in found]
+
+
+async def _fetch_missing_articles(
+    pmids: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, dict]:
+    """
+    Download articles missing from the cache, keyed by PMID.
+    PMIDs already being downloaded for another request join that download
+    instead of being fetched and parsed again.
+    """
+    downloads: Dict[asyncio.Future, List[str]] = {}
+    owned = []
+    for pmid in pmids:
+        task = _pmid_flights.get(pmid)
+        if task is None:
+            owned.append(pmid)
+        else:
+            downloads.setdefault(task, []).append(pmid)
+    
+    if owned:
+        task = asyncio.ensure_future(_download_articles(owned, client))
+        for pmid in owned:
+            _pmid_flights[pmid] = task
+        
+        def forget(done: asyncio.Future) -> None:
+            for pmid in owned:
+                if _pmid_flights.get(pmid) is done:
+                    del _pmid_flights[pmid]
+        
+        task.add_done_callback(forget)
+        downloads[task] = owned
+        memo = batch_articles.get()
+        if memo is not None:
+            memo.fetched += len(owned)
+    
+    # Shielded so one caller cancelling does not cancel a download others are waiting on
+    results = await asyncio.gather(*(asyncio.shield(task) for task in downloads))
+    found = {}
+    for wanted, fetched in zip(downloads.values(), results):
+        found.update((pmid, fetched[pmid]) for pmid in wanted if pmid in fetched)
+    return found
+
+
+async def _download_articles(
+    pmids: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, dict]:
+    """efetch the given PMIDs (micro-batched when possible) and cache the results."""
+    if client is None and efetch_batcher.window_seconds > 0:
+        fetched = await efetch_batcher.fetch(pmids)
+    else:
+        fetched = await _efetch_articles(pmids, client)
+    wanted = set(pmids)
+    fetched_by_id = {
+        article["id"]: article for article in fetched if article["id"] in wanted
+    }
+    await asyncio.to_thread(article_cache.set_many, fetched_by_id)
+    return fetched_by_id
+
+
+async def _efetch_articles(
+    pmids: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> List[dict]:
+    """
+    Download and parse article details from NCBI efetch (no caching).
+    Uses the shared pooled E-utilities client unless one is passed in.
+    """
     params = {
         "db": "pubmed",
         "id": ",".join(pmids),
@@ -69,93 +274,65 @@ async def fetch_pubmed_articles(pmids: List[str]) -> List[dict]:
     if api_key:
         params["api_key"] = api_key
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(PUBMED_FETCH_URL, params=params, timeout=15.0)
-        response.raise_for_status()
-        xml_content = response.text
+    client = client or get_eutils_client()
+    response = await eutils_get(client, PUBMED_FETCH_URL, params, FETCH_TIMEOUT, stream=True)
     
-    return parse_pubmed_xml(xml_content)
-
-
-def parse_pubmed_xml(xml_content: str) -> List[dict]:
-    """
-    Parse PubMed XML response and extract article information.
-    """
+    # Parse the body as it arrives, so the whole document is never held in memory
+    parser = PubMedFeedParser()
     articles = []
-    
+    parse_seconds = 0.0
     try:
-        root = ET.fromstring(xml_content)
-        
-        for article_elem in root.findall(".//PubmedArticle"):
-            try:
-                # Get PMID
-                pmid_elem = article_elem.find(".//PMID")
-                pmid = pmid_elem.text if pmid_elem is not None else "Unknown"
-                
-                # Get title
-                title_elem = article_elem.find(".//ArticleTitle")
-                title = title_elem.text if title_elem is not None else "No title available"
-                
-                # Get abstract
-                abstract_parts = []
-                for abstract_elem in article_elem.findall(".//AbstractText"):
-                    label = abstract_elem.get("Label", "")
-                    text = abstract_elem.text or ""
-                    if label:
-                        abstract_parts.append(f"{label}: {text}")
-                    else:
-                        abstract_parts.append(text)
-                abstract = " ".join(abstract_parts) if abstract_parts else "No abstract available."
-                
-                # Get authors
-                authors = []
-                for author_elem in article_elem.findall(".//Author"):
-                    last_name = author_elem.find("LastName")
-                    initials = author_elem.find("Initials")
-                    if last_name is not None:
-                        author_name = last_name.text
-                        if initials is not None:
-                            author_name += f" {initials.text}"
-                        authors.append(author_name)
-                
-                # Format authors string
-                if len(authors) > 3:
-                    authors_str = f"{authors[0]}, {authors[1]}, {authors[2]}, et al."
-                elif authors:
-                    authors_str = ", ".join(authors)
-                else:
-                    authors_str = "Unknown authors"
-                
-                # Get journal info
-                journal_elem = article_elem.find(".//Journal/Title")
-                journal = journal_elem.text if journal_elem is not None else "Unknown journal"
-                
-                # Get publication year
-                year_elem = article_elem.find(".//PubDate/Year")
-                if year_elem is None:
-                    year_elem = article_elem.find(".//PubDate/MedlineDate")
-                year = year_elem.text[:4] if year_elem is not None and year_elem.text else "Unknown"
-                
-                articles.append({
-                    "id": pmid,
-                    "title": title,
-                    "content": abstract,
-                    "authors": authors_str,
-                    "journal": journal,
-                    "year": year,
-                    "url": f"{PUBMED_BASE_URL}/{pmid}"
-                })
-                
-            except Exception as e:
-                print(f"Error parsing article: {e}")
-                continue
-                
+        async for chunk in response.aiter_bytes():
+            start = time.perf_counter()
+            articles.extend(parser.feed(chunk))
+            parse_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        articles.extend(parser.close())
+        parse_seconds += time.perf_counter() - start
     except ET.ParseError as e:
-        print(f"Error parsing PubMed XML: {e}")
-        
+        # Same all-or-nothing result as parse_pubmed_xml for a malformed document
+        logger.warning("Error parsing PubMed XML: %s", e)
+        return []
+    finally:
+        await response.aclose()
+        XML_PARSE_SECONDS.observe(parse_seconds)
     return articles
 
 
+# Combines efetch calls from concurrent requests (EFETCH_BATCH_WINDOW_MS=0 disables)
+efetch_batcher = MicroBatcher(
+    _efetch_articles,
+    window_seconds=env_int("EFETCH_BATCH_WINDOW_MS", 20) / 1000,
+    max_batch_size=env_int("EFETCH_BATCH_MAX_PMIDS", 200)
+)
+
+# PMIDs currently being downloaded, mapped to the shared download task
+_pmid_flights: Dict[str, asyncio.Future] = {}
+
+
+class ArticleMemo:
+    """
+    Articles looked up during one batch run, so PMIDs shared by several
+    questions are fetched and parsed once even if the article cache is
+    disabled or evicts them. Active for the tasks that set batch_articles.
+    """
+
+    def __init__(self):
+        self.articles: Dict[str, dict] = {}
+        self.requested = 0   # PMID lookups across all questions
+        self.fetched = 0     # PMIDs downloaded from NCBI
+
+    def stats(self) -> dict:
+        return {
+            "pmids_requested": self.requested,
+            "unique_pmids": len(self.articles),
+            "pmids_fetched": self.fetched
+        }
+
+
+batch_articles: ContextVar[Optional[ArticleMemo]] = ContextVar("batch_articles", default=None)
+
+
 # =============================================================================
 # LANGGRAPH STATE DEFINITION
 # =============================================================================
@@ -164,30 +341,380 @@ class AgentState(TypedDict):
     """State that flows through the RAG pipeline."""
     question: str                    # User's original question
     search_query: Optional[str]      # Enhanced search query for PubMed
+    search_queries: Optional[List[str]]  # Query variants for multi-query fan-out
     context: List[dict]              # Retrieved articles from PubMed
+    context_stats: Optional[dict]    # Prompt size before/after context compression
     answer: str                      # Final generated response
+    deadline: Optional[float]        # time.monotonic() by which the answer is due (None = no budget)
+    degradations: Annotated[List[str], operator.add]  # Shortcuts taken to stay within the deadline
+    history: Optional[str]           # Compacted conversation so far (None outside a session)
+    follow_up_of: Optional[str]      # Previous question in the session
+    session_context: List[dict]      # Articles already retrieved in the session
+
+
+# =============================================================================
+# QUESTION NORMALIZATION
+# =============================================================================
+
+# Common question words that carry no search value
+STOP_WORDS = frozenset({
+    'what', 'how', 'does', 'help', 'with', 'the', 'for', 'and', 'are', 'is', 'can',
+    'should', 'would', 'could', 'about', 'your', 'have', 'been', 'this', 'that',
+    'from', 'they', 'will', 'good', 'best', 'much', 'many'
+})
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s-]")
+
+
+def simplify_question(question: str) -> str:
+    """
+    Extract simple keywords from a question for a fallback PubMed search:
+    drops stop-words and words of three letters or fewer.
+    """
+    return " ".join([
+        word for word in question.split()
+        if len(word) > 3 and word.lower() not in STOP_WORDS
+    ])
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question into a cache key so trivially different wordings match:
+    case-folded, punctuation stripped, whitespace collapsed, stop-words removed.
+    """
+    text = _PUNCTUATION_RE.sub(" ", question.casefold())
+    words = text.split()
+    keywords = [word for word in words if word not in STOP_WORDS]
+    return " ".join(keywords or words)
+
+
+# =============================================================================
+# RERANKING
+# =============================================================================
+
+# Articles passed on to generation
+RETRIEVE_TOP_K = env_int("RETRIEVE_TOP_K", 4)
+# Candidate pool fetched for local reranking (0 disables reranking)
+RERANK_CANDIDATES = env_int("RERANK_CANDIDATES", 0)
+# PMIDs requested from PubMed per search
+CANDIDATE_POOL = max(RERANK_CANDIDATES, RETRIEVE_TOP_K)
+
+
+def with_reranking(node):
+    """
+    Wrap a retrieval node so its context is reranked locally (BM25 over
+    title + abstract against the question) and cut to RETRIEVE_TOP_K.
+    """
+    async def reranked_node(state: AgentState) -> dict:
+        update = await node(state)
+        context = update.get("context") or []
+        if RERANK_CANDIDATES and context:
+            update["context"] = rerank_articles(
+                retrieval_question(state), context, RETRIEVE_TOP_K, stop_words=STOP_WORDS
+            )
+            logger.debug("Reranked %d candidates -> %d articles", len(context), len(update["context"]))
+        return update
+    
+    reranked_node.__name__ = node.__name__
+    return reranked_node
+
+
+# =============================================================================
+# MULTI-QUERY FAN-OUT
+# =============================================================================
+
+# Number of query variants enhance_query_node asks for (1 disables fan-out)
+QUERY_VARIANTS = env_int("QUERY_VARIANTS", 1)
+# Maximum concurrent esearch calls per question during fan-out
+FANOUT_CONCURRENCY = env_int("FANOUT_CONCURRENCY", 4)
+# PMIDs requested per variant before fusion
+FANOUT_RETMAX = env_int("FANOUT_RETMAX", 8)
+# Reciprocal-rank fusion damping constant
+RRF_K = 60
+
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s*")
+
+
+def parse_query_variants(text: str, limit: int) -> List[str]:
+    """Parse one-query-per-line LLM output, dropping list markers, quotes and duplicates."""
+    queries = []
+    for line in text.splitlines():
+        query = _LIST_MARKER_RE.sub("", line).strip().strip('"\'')
+        if query and query not in queries:
+            queries.append(query)
+    return queries[:limit]
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[str]], k: int = RRF_K) -> List[str]:
+    """
+    Merge ranked PMID lists with reciprocal-rank fusion: score(id) = sum(1 / (k + rank)).
+    Duplicates are merged; ties keep first-seen order.
+    """
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, pmid in enumerate(ranked, start=1):
+            scores[pmid] = scores.get(pmid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+async def search_query_variants(queries: List[str], max_results: int) -> List[str]:
+    """
+    Run esearch for every query variant concurrently (bounded by FANOUT_CONCURRENCY)
+    and return the top max_results PMIDs after reciprocal-rank fusion.
+    Variants that fail are ignored.
+    """
+    queries = [query for query in dict.fromkeys(queries) if query]
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+    
+    async def run(query: str) -> List[str]:
+        async with semaphore:
+            try:
+                return await search_pubmed(query, max_results=max(FANOUT_RETMAX, max_results))
+            except Exception as e:
+                logger.warning("Fan-out search failed for %r: %s", query, e)
+                return []
+    
+    ranked_lists = await asyncio.gather(*(run(query) for query in queries))
+    fused = reciprocal_rank_fusion(ranked_lists)[:max_results]
+    logger.debug("Fan-out over %d queries -> %d PMIDs", len(queries), len(fused))
+    return fused
+
+
+def chat_messages(system_prompt: str, user_content: str) -> list:
+    """System + user message pair for a chat model call."""
+    # Imported on first use so langchain_core stays off the startup path
+    from langchain_core.messages import HumanMessage, SystemMessage
+    
+    return [SystemMessage(content=system_prompt), HumanMessage(content=user_content)]
+
+
+# =============================================================================
+# DEADLINE BUDGET
+# =============================================================================
+
+# End-to-end latency budget per request in seconds (0 disables degradation)
+REQUEST_BUDGET_SECONDS = env_float("REQUEST_BUDGET_SECONDS", 15.0)
+# max_output_tokens for the shortened general answer used under deadline pressure
+SHORT_ANSWER_MAX_TOKENS = env_int("SHORT_ANSWER_MAX_TOKENS", 300)
+# Shortest time an answer-generating LLM call is given, even when the budget is spent
+LLM_MIN_TIMEOUT_SECONDS = env_float("LLM_MIN_TIMEOUT_SECONDS", 2.0)
+# Half-life of the pull of an old latency observation away from the node's default
+NODE_ESTIMATE_HALF_LIFE_SECONDS = env_float("NODE_ESTIMATE_HALF_LIFE_SECONDS", 300.0)
+
+GENERATION_TIMEOUT_ANSWER = (
+    "I'm sorry, it's taking me longer than expected to put an answer together. "
+    "Please try asking again in a moment."
+)
+
+
+class NodeLatencyEstimator:
+    """
+    Smoothed (EWMA) latency per graph node, seeded with conservative
+    defaults, used to predict whether the remaining stages fit the deadline.
+
+    Estimates only move when a node runs, and a high estimate can stop a node
+    from running (retrieval is skipped when generate_research looks too slow).
+    So an estimate decays back toward its default as its last observation
+    ages, with a half-life of half_life seconds, and never exceeds cap.
+    """
+
+    def __init__(
+        self,
+        defaults: Dict[str, float],
+        alpha: float = 0.2,
+        half_life: float = 300.0,
+        cap: Optional[float] = None
+    ):
+        self.defaults = dict(defaults)
+        self.alpha = alpha
+        self.half_life = half_life
+        self.cap = cap
+        self._estimates: Dict[str, Tuple[float, float]] = {}  # node -> (estimate, observed at)
+
+    def _current(self, node: str, now: float) -> Optional[float]:
+        default = self.defaults.get(node)
+        entry = self._estimates.get(node)
+        if entry is None:
+            return default
+        value, observed_at = entry
+        if default is not None and self.half_life > 0:
+            value = default + (value - default) * 0.5 ** ((now - observed_at) / self.half_life)
+        return min(value, self.cap) if self.cap else value
+
+    def observe(self, node: str, seconds: float) -> None:
+        now = time.monotonic()
+        previous = self._current(node, now)
+        value = seconds if previous is None else (1 - self.alpha) * previous + self.alpha * seconds
+        self._estimates[node] = (min(value, self.cap) if self.cap else value, now)
+
+    def estimate(self, *nodes: str) -> float:
+        """Predicted time for running the given nodes one after another."""
+        now = time.monotonic()
+        return sum(self._current(node, now) or 0.0 for node in nodes)
+
+
+node_latency = NodeLatencyEstimator(
+    {
+        "enhance_query": env_float("BUDGET_ENHANCE_SECONDS", 1.5),
+        "retrieve": env_float("BUDGET_RETRIEVE_SECONDS", 3.0),
+        "generate_research": env_float("BUDGET_GENERATE_RESEARCH_SECONDS", 8.0),
+        "generate_general": env_float("BUDGET_GENERATE_GENERAL_SECONDS", 5.0),
+    },
+    half_life=NODE_ESTIMATE_HALF_LIFE_SECONDS,
+    cap=REQUEST_BUDGET_SECONDS or None
+)
+
+
+def remaining_budget(state: AgentState) -> Optional[float]:
+    """Seconds left before the request deadline, or None without a budget."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def llm_timeout(state: AgentState) -> Optional[float]:
+    """Time limit for an answer-generating LLM call: what is left of the budget, at least LLM_MIN_TIMEOUT_SECONDS."""
+    remaining = remaining_budget(state)
+    return None if remaining is None else max(remaining, LLM_MIN_TIMEOUT_SECONDS)
+
+
+def fits_budget(state: AgentState, *nodes: str) -> bool:
+    """Whether the given stages are expected to finish before the deadline."""
+    remaining = remaining_budget(state)
+    return remaining is None or remaining >= node_latency.estimate(*nodes)
+
+
+def with_retrieval_deadline(node):
+    """
+    Wrap a retrieval node so it cannot eat the time reserved for answering:
+    retrieval is skipped when it would not leave time for a research answer,
+    and abandoned (empty context, general answer) if it overruns.
+    """
+    async def deadline_node(state: AgentState) -> dict:
+        remaining = remaining_budget(state)
+        if remaining is None:
+            return await node(state)
+        
+        if not fits_budget(state, "retrieve", "generate_research"):
+            logger.info("Deadline: skipping retrieval (%.1fs left)", remaining)
+            RETRIEVAL_FALLBACK_TOTAL.inc(kind="deadline")
+            return {"context": [], "degradations": ["skipped_retrieval"]}
+        
+        try:
+            return await asyncio.wait_for(node(state), remaining - node_latency.estimate("generate_general"))
+        except asyncio.TimeoutError:
+            logger.info("Deadline: retrieval overran, answering without research")
+            RETRIEVAL_FALLBACK_TOTAL.inc(kind="deadline")
+            return {"context": [], "degradations": ["retrieval_timeout"]}
+    
+    deadline_node.__name__ = node.__name__
+    return deadline_node
+
+
+# =============================================================================
+# SESSION CONTEXT
+# =============================================================================
+
+# Recent turns and retrieved articles per conversation (ChatRequest.session_id)
+sessions = build_session_store()
+
+# A follow-up is answered from the session's articles when at least this share
+# of its keywords already appear in the conversation or in those articles
+SESSION_REUSE_MIN_COVERAGE = env_float("SESSION_REUSE_MIN_COVERAGE", 0.6)
+# Follow-ups with this many keywords or fewer are searched together with the previous
+# question, as are follow-ups of any length that contain a back-reference
+FOLLOW_UP_MAX_KEYWORDS = 1
+
+# Pronouns that make a short question refer to the previous turn
+BACK_REFERENCES = frozenset({'it', 'its', 'this', 'that', 'these', 'those', 'they', 'them', 'and'})
+# Words that refer back to the conversation rather than name a topic
+FOLLOW_UP_WORDS = frozenset({
+    'its', 'this', 'these', 'those', 'them', 'there', 'then', 'also', 'more', 'else',
+    'other', 'any', 'some', 'take', 'need', 'get', 'which', 'when', 'why', 'who'
+})
+
+
+def _stem(token: str) -> str:
+    # Folds simple plurals so "doses" matches "dose"
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def question_keywords(question: str) -> set:
+    """Topic words of a question, without stop-words and back-references."""
+    return {_stem(token) for token in tokenize(question, STOP_WORDS | FOLLOW_UP_WORDS) if len(token) > 2}
+
+
+def is_short_follow_up(question: str) -> bool:
+    """A short question that points back at the conversation ("Is it safe?", "And for kids?")."""
+    keywords = question_keywords(question)
+    if len(keywords) > FOLLOW_UP_MAX_KEYWORDS:
+        return False
+    return not keywords or bool(BACK_REFERENCES & set(tokenize(question)))
+
+
+def context_coverage(question: str, history: str, articles: List[dict]) -> float:
+    """Share of the question's keywords found in the conversation or the articles."""
+    keywords = question_keywords(question)
+    if not keywords:
+        return 1.0
+    text = " ".join([history] + [f"{article.get('title', '')} {article.get('content', '')}" for article in articles])
+    vocabulary = {_stem(token) for token in tokenize(text)}
+    return len(keywords & vocabulary) / len(keywords)
+
+
+def retrieval_question(state: AgentState) -> str:
+    """
+    The text to search PubMed with: a follow-up that refers back ("Is it safe
+    for kids?") or is bare ("what dose?") carries the previous question along.
+    """
+    question = state["question"]
+    previous = state.get("follow_up_of")
+    if not previous:
+        return question
+    if BACK_REFERENCES & set(tokenize(question)) or len(question_keywords(question)) <= FOLLOW_UP_MAX_KEYWORDS:
+        return f"{previous} {question}"
+    return question
+
+
+def history_block(state: AgentState) -> str:
+    """Prompt section with the compacted conversation, or "" outside a session."""
+    history = state.get("history")
+    if not history:
+        return ""
+    return f"CONVERSATION SO FAR (use it to interpret the question):\n{history}\n\n"
 
 
 # =============================================================================
 # GRAPH NODES
 # =============================================================================
 
-def enhance_query_node(state: AgentState) -> dict:
+async def enhance_query_node(state: AgentState) -> dict:
     """
     Uses LLM to convert a natural language question into optimized PubMed search terms.
     This improves search results by using proper medical terminology and Boolean operators.
+    Results are memoized by normalized question, so repeat questions skip the LLM call.
     """
-    model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-    api_key = os.getenv("GOOGLE_API_KEY")
+    question = retrieval_question(state)
+    cache_key = normalize_question(question)
+    if QUERY_VARIANTS > 1:
+        cache_key = f"variants{QUERY_VARIANTS}:{cache_key}"
+    cached_query = await asyncio.to_thread(query_cache.get, cache_key)
+    if cached_query:
+        logger.debug("Enhanced search query (cached): %s", cached_query)
+        if isinstance(cached_query, list):
+            return {"search_query": cached_query[0], "search_queries": cached_query}
+        return {"search_query": cached_query}
     
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
+    if not fits_budget(state, "enhance_query", "retrieve", "generate_research"):
+        # Not enough time for the LLM round-trip: search with the question's keywords
+        logger.info("Deadline: skipping query enhancement")
+        return {
+            "search_query": simplify_question(question) or question,
+            "degradations": ["skipped_enhance_query"]
+        }
     
-    llm = ChatGoogleGenerativeAI(
-        model=model_name,
-        google_api_key=api_key,
-        transport="rest"  # Use REST API instead of gRPC to avoid auth scope issues
-    )
+    llm = get_llm()
     
     system_prompt = """You are a medical search query optimizer for PubMed. Convert natural language health questions into effective PubMed search queries.
 
@@ -214,26 +741,45 @@ BAD EXAMPLES (too specific, will return zero results):
 - "natural ways to reduce high blood pressure without medication"
 """
 
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Convert this to a PubMed search query: {state['question']}")
-    ]
+    if QUERY_VARIANTS > 1:
+        request = (
+            f"Convert this to {QUERY_VARIANTS} different PubMed search queries, one per line, "
+            f"from most specific to broadest: {question}"
+        )
+    else:
+        request = f"Convert this to a PubMed search query: {question}"
+    
+    messages = chat_messages(system_prompt, request)
     
+    search_queries = None
     try:
-        response = llm.invoke(messages)
-        search_query = response.content.strip()
+        response = await ainvoke_llm(llm, messages, "enhance_query", timeout=llm_timeout(state))
         
-        # Remove any quotes the LLM might have added around the query
-        search_query = search_query.strip('"\'')
+        if QUERY_VARIANTS > 1:
+            search_queries = parse_query_variants(response.content, QUERY_VARIANTS)
+            search_query = search_queries[0] if search_queries else ""
+            cache_value = search_queries
+        else:
+            search_query = response.content.strip()
+            
+            # Remove any quotes the LLM might have added around the query
+            search_query = search_query.strip('"\'')
+            cache_value = search_query
+        
+        if search_query:
+            await asyncio.to_thread(query_cache.set, cache_key, cache_value)
         
     except Exception as e:
         # Fallback: use the original question as a simple search
-        print(f"[DEBUG] LLM query enhancement failed: {e}")
-        search_query = state['question']
+        logger.warning("LLM query enhancement failed: %s", e)
+        search_query = question
     
-    print(f"[DEBUG] Original question: {state['question']}")
-    print(f"[DEBUG] Enhanced search query: {search_query}")
+    logger.debug("Original question: %s", question)
+    logger.debug("Enhanced search query: %s", search_query)
     
+    if search_queries and len(search_queries) > 1:
+        logger.debug("Query variants: %s", search_queries)
+        return {"search_query": search_query, "search_queries": search_queries}
     return {"search_query": search_query}
 
 
@@ -242,46 +788,173 @@ async def retrieve_node(state: AgentState) -> dict:
     Retrieves relevant articles from PubMed using the enhanced search query.
     Uses a simplified query as fallback if no results found.
     """
-    search_query = state.get("search_query") or state["question"]
-    original_question = state["question"]
+    original_question = retrieval_question(state)
+    search_query = state.get("search_query") or original_question
+    search_queries = state.get("search_queries") or []
     
     try:
+        if len(search_queries) > 1:
+            # Fan-out: all variants plus the simplified query, fused into one ranked list
+            pmids = await search_query_variants(
+                search_queries + [simplify_question(original_question)],
+                max_results=CANDIDATE_POOL
+            )
+            return {"context": await fetch_pubmed_articles(pmids) if pmids else []}
+        
         # First attempt: Use the enhanced search query
-        pmids = await search_pubmed(search_query, max_results=4)
+        pmids = await search_pubmed(search_query, max_results=CANDIDATE_POOL)
         
-        # Second attempt: If no results, try a simplified version (just key words from original question)
+        # Second attempt: If no results, try a simplified version (just key words from original question),
+        # unless the deadline cannot afford another PubMed round trip
+        degradations = []
         if not pmids:
-            print(f"[DEBUG] No results with enhanced query, trying simplified search...")
-            # Extract simple keywords - remove common words and use original question
-            simplified_query = " ".join([
-                word for word in original_question.split() 
-                if len(word) > 3 and word.lower() not in 
-                {'what', 'how', 'does', 'help', 'with', 'the', 'for', 'and', 'are', 'is', 'can', 'should', 'would', 'could', 'about', 'your', 'have', 'been', 'this', 'that', 'from', 'they', 'will', 'good', 'best', 'much', 'many'}
-            ])
-            if simplified_query:
-                print(f"[DEBUG] Simplified query: {simplified_query}")
-                pmids = await search_pubmed(simplified_query, max_results=4)
+            ZERO_RESULTS_TOTAL.inc(query="enhanced")
+            if not fits_budget(state, "retrieve", "generate_research"):
+                logger.info("Deadline: skipping simplified-query retry")
+                degradations.append("skipped_simplified_retry")
+            else:
+                logger.debug("No results with enhanced query, trying simplified search...")
+                RETRIEVAL_FALLBACK_TOTAL.inc(kind="simplified_query")
+                # Extract simple keywords - remove common words and use original question
+                simplified_query = simplify_question(original_question)
+                if simplified_query:
+                    logger.debug("Simplified query: %s", simplified_query)
+                    pmids = await search_pubmed(simplified_query, max_results=CANDIDATE_POOL)
+                    if not pmids:
+                        ZERO_RESULTS_TOTAL.inc(query="simplified")
         
         if not pmids:
-            print(f"[DEBUG] No PubMed results found")
-            return {"context": []}
+            logger.debug("No PubMed results found")
+            return {"context": [], "degradations": degradations}
         
         # Fetch full article details
         articles = await fetch_pubmed_articles(pmids)
         
         if not articles:
-            print(f"[DEBUG] Failed to fetch article details")
+            logger.warning("Failed to fetch article details")
             return {"context": []}
         
-        print(f"[DEBUG] Retrieved {len(articles)} articles from PubMed")
+        logger.debug("Retrieved %d articles from PubMed", len(articles))
         return {"context": articles}
         
     except Exception as e:
-        print(f"[DEBUG] PubMed API error: {e}")
+        logger.warning("PubMed API error: %s", e)
+        RETRIEVAL_FALLBACK_TOTAL.inc(kind="upstream_error")
         return {"context": []}
 
 
-def generate_research_node(state: AgentState) -> dict:
+# Retrieval strategy: "serial" (enhance_query -> retrieve) or "speculative"
+RETRIEVAL_MODE = env_str("RETRIEVAL_MODE", "serial")
+# Speculative policy: "prefer_enhanced" uses the simplified-keyword results only
+# when the enhanced query finds nothing; "first_usable" takes whichever is usable first
+SPECULATIVE_POLICY = env_str("SPECULATIVE_POLICY", "prefer_enhanced")
+# Also efetch the simplified-keyword results speculatively
+SPECULATIVE_PREFETCH = env_bool("SPECULATIVE_PREFETCH", False)
+
+
+async def _speculative_search(query: str) -> Tuple[List[str], Optional[List[dict]]]:
+    """
+    Run the simplified-keyword esearch (and optionally efetch) for speculative mode.
+    Returns (pmids, articles); articles is None when prefetch is disabled.
+    Errors are swallowed like in retrieve_node.
+    """
+    try:
+        pmids = await search_pubmed(query, max_results=CANDIDATE_POOL)
+        if SPECULATIVE_PREFETCH and pmids:
+            return pmids, await fetch_pubmed_articles(pmids)
+        return pmids, None
+    except Exception as e:
+        logger.warning("Speculative PubMed search failed: %s", e)
+        return [], None
+
+
+async def _articles_for(pmids: List[str], prefetched: Optional[List[dict]]) -> List[dict]:
+    """Return prefetched articles, or fetch them for the given PMIDs."""
+    if prefetched is not None:
+        return prefetched
+    try:
+        return await fetch_pubmed_articles(pmids)
+    except Exception as e:
+        logger.warning("PubMed API error: %s", e)
+        RETRIEVAL_FALLBACK_TOTAL.inc(kind="upstream_error")
+        return []
+
+
+async def speculative_retrieve_node(state: AgentState) -> dict:
+    """
+    Speculative replacement for enhance_query -> retrieve.
+    Starts the simplified-keyword search alongside LLM query enhancement so the
+    fallback search is already done (or in flight) when it is needed; the
+    losing branch is cancelled. See SPECULATIVE_POLICY for how the winner is chosen.
+    """
+    question = retrieval_question(state)
+    simplified_query = simplify_question(question)
+    
+    enhance_task = asyncio.ensure_future(enhance_query_node(state))
+    speculative_task = (
+        asyncio.ensure_future(_speculative_search(simplified_query)) if simplified_query else None
+    )
+    
+    try:
+        if SPECULATIVE_POLICY == "first_usable" and speculative_task is not None:
+            await asyncio.wait({enhance_task, speculative_task}, return_when=asyncio.FIRST_COMPLETED)
+            if speculative_task.done():
+                pmids, prefetched = speculative_task.result()
+                if pmids:
+                    logger.debug("Speculative search won: %s", simplified_query)
+                    enhance_task.cancel()
+                    articles = await _articles_for(pmids, prefetched)
+                    return {"search_query": simplified_query, "context": articles}
+        
+        enhanced = await enhance_task
+        search_query = enhanced["search_query"] or question
+        degradations = enhanced.get("degradations", [])
+        
+        try:
+            if len(enhanced.get("search_queries") or []) > 1:
+                pmids = await search_query_variants(enhanced["search_queries"], max_results=CANDIDATE_POOL)
+            else:
+                pmids = await search_pubmed(search_query, max_results=CANDIDATE_POOL)
+        except Exception as e:
+            logger.warning("PubMed API error: %s", e)
+            RETRIEVAL_FALLBACK_TOTAL.inc(kind="upstream_error")
+            pmids = []
+        
+        if pmids:
+            if speculative_task is not None:
+                speculative_task.cancel()
+            return {
+                "search_query": search_query,
+                "context": await _articles_for(pmids, None),
+                "degradations": degradations
+            }
+        
+        if speculative_task is not None:
+            logger.debug("No results with enhanced query, using speculative search: %s", simplified_query)
+            ZERO_RESULTS_TOTAL.inc(query="enhanced")
+            RETRIEVAL_FALLBACK_TOTAL.inc(kind="speculative")
+            pmids, prefetched = await speculative_task
+            if pmids:
+                return {
+                    "search_query": search_query,
+                    "context": await _articles_for(pmids, prefetched),
+                    "degradations": degradations
+                }
+        
+        logger.debug("No PubMed results found")
+        return {"search_query": search_query, "context": [], "degradations": degradations}
+    
+    finally:
+        for task in (enhance_task, speculative_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+# Token budget for the research context in the generation prompt (0 disables compression)
+CONTEXT_TOKEN_BUDGET = env_int("CONTEXT_TOKEN_BUDGET", 1500)
+
+
+async def generate_research_node(state: AgentState) -> dict:
     """
     Generates an answer using PubMed research articles.
     This node is called when we have retrieved articles from PubMed.
@@ -294,19 +967,9 @@ def generate_research_node(state: AgentState) -> dict:
     NOTE: The LLM often responds with Markdown formatting (e.g., **bold text**, *italics*).
     The frontend should parse and render this Markdown appropriately.
     """
-    print(f"[DEBUG] Using RESEARCH generation path")
+    logger.debug("Using RESEARCH generation path")
     
-    model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-    api_key = os.getenv("GOOGLE_API_KEY")
-    
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-    
-    llm = ChatGoogleGenerativeAI(
-        model=model_name,
-        google_api_key=api_key,
-        transport="rest"  # Use REST API instead of gRPC to avoid auth scope issues
-    )
+    llm = get_llm()
     
     system_prompt = """You are a friendly and knowledgeable wellness guide. Your role is to help users with health and wellness questions by combining your broad wellness knowledge with insights from research articles.
 
@@ -322,6 +985,7 @@ CITATION RULES (only for information from the provided articles):
 - CORRECT: "Studies show exercise improves sleep quality [Source: 22716179]."
 - WRONG: "[Source: 22716179, 36902073]" NEVER combine PMIDs!
 - Do NOT cite sources for general wellness knowledge that doesn't come from the articles.
+- Entries labeled "Total Life Daily article" are our own articles, not research: mention them by title (e.g. "see our article ...") and never cite them with [Source: ...].
 
 TONE AND STYLE:
 - Be warm and supportive.
@@ -332,30 +996,47 @@ TONE AND STYLE:
     context = state["context"]
     question = state["question"]
     
-    # Format articles for the LLM
-    context_text = "\n\n".join([
-        f"PMID: {article['id']}\nTitle: {article['title']}\nAuthors: {article.get('authors', 'Unknown')}\nJournal: {article.get('journal', 'Unknown')}\nYear: {article.get('year', 'Unknown')}\nAbstract: {article['content']}"
-        for article in context
-    ])
+    # Format articles for the LLM, compressed to the token budget
+    if CONTEXT_TOKEN_BUDGET > 0:
+        context_text, context_stats = build_context(
+            question, context, CONTEXT_TOKEN_BUDGET, stop_words=STOP_WORDS
+        )
+    else:
+        context_text = "\n\n".join(format_article(article) for article in context)
+        context_tokens = estimate_tokens(context_text)
+        context_stats = {"tokens_before": context_tokens, "tokens_after": context_tokens}
     
     user_message = f"""Please answer the user's wellness question comprehensively. Use your general knowledge as the foundation, and incorporate insights from the research articles below where they add value.
 
 RESEARCH ARTICLES (use to support your answer, but don't limit yourself to only these):
 {context_text}
 
-USER QUESTION: {question}"""
+{history_block(state)}USER QUESTION: {question}"""
 
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=user_message)
-    ]
+    overhead = estimate_tokens(system_prompt) + estimate_tokens(user_message) - context_stats["tokens_after"]
+    context_stats["prompt_tokens_before"] = overhead + context_stats["tokens_before"]
+    context_stats["prompt_tokens_after"] = overhead + context_stats["tokens_after"]
+    logger.info(
+        "Prompt size: ~%d -> ~%d tokens",
+        context_stats["prompt_tokens_before"],
+        context_stats["prompt_tokens_after"],
+        extra={"context_stats": context_stats}
+    )
+    PROMPT_CONTEXT_TOKENS.observe(context_stats["tokens_before"], stage="before")
+    PROMPT_CONTEXT_TOKENS.observe(context_stats["tokens_after"], stage="after")
+
+    messages = chat_messages(system_prompt, user_message)
     
-    response = llm.invoke(messages)
+    try:
+        response = await ainvoke_llm(llm, messages, "generate_research", timeout=llm_timeout(state))
+    except asyncio.TimeoutError:
+        logger.warning("Deadline: research answer generation timed out")
+        return {"answer": GENERATION_TIMEOUT_ANSWER, "context_stats": context_stats, "degradations": ["generation_timeout"]}
     
-    return {"answer": response.content}
+    return {"answer": response.content, "context_stats": context_stats}
 
 
-def generate_general_node(state: AgentState) -> dict:
+async def generate_general_node(state: AgentState) -> dict:
     """
     Generates a general wellness answer without research citations.
     This node is called when no PubMed articles were found.
@@ -368,19 +1049,16 @@ def generate_general_node(state: AgentState) -> dict:
     NOTE: The LLM often responds with Markdown formatting (e.g., **bold text**, *italics*).
     The frontend should parse and render this Markdown appropriately.
     """
-    print(f"[DEBUG] Using GENERAL generation path (no research articles found)")
-    
-    model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-    api_key = os.getenv("GOOGLE_API_KEY")
+    logger.debug("Using GENERAL generation path (no research articles found)")
     
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set")
-    
-    llm = ChatGoogleGenerativeAI(
-        model=model_name,
-        google_api_key=api_key,
-        transport="rest"  # Use REST API instead of gRPC to avoid auth scope issues
-    )
+    # Under deadline pressure, ask for a shorter answer
+    degradations = []
+    retrieval_cut = {"skipped_retrieval", "retrieval_timeout"} & set(state.get("degradations") or [])
+    if remaining_budget(state) is not None and (retrieval_cut or not fits_budget(state, "generate_general")):
+        degradations.append("short_answer")
+        llm = get_llm(max_output_tokens=SHORT_ANSWER_MAX_TOKENS)
+    else:
+        llm = get_llm()
     
     system_prompt = """You are a friendly and knowledgeable wellness guide. Your role is to help users with health and wellness questions using your general knowledge.
 
@@ -394,15 +1072,17 @@ IMPORTANT RULES:
 7. If the question is outside of health/wellness topics, politely redirect the conversation back to wellness."""
 
     question = state["question"]
+    history = history_block(state)
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=question)
-    ]
+    messages = chat_messages(system_prompt, f"{history}USER QUESTION: {question}" if history else question)
     
-    response = llm.invoke(messages)
+    try:
+        response = await ainvoke_llm(llm, messages, "generate_general", timeout=llm_timeout(state))
+    except asyncio.TimeoutError:
+        logger.warning("Deadline: general answer generation timed out")
+        return {"answer": GENERATION_TIMEOUT_ANSWER, "degradations": degradations + ["generation_timeout"]}
     
-    return {"answer": response.content}
+    return {"answer": response.content, "degradations": degradations}
 
 
 def route_by_context(state: AgentState) -> str:
@@ -416,40 +1096,142 @@ def route_by_context(state: AgentState) -> str:
     context = state.get("context", [])
     
     if context and len(context) > 0:
-        print(f"[DEBUG] Router: Found {len(context)} articles -> routing to RESEARCH path")
+        logger.debug("Router: Found %d articles -> routing to RESEARCH path", len(context))
+        ROUTE_TOTAL.inc(route="research")
         return "has_research"
     else:
-        print(f"[DEBUG] Router: No articles found -> routing to GENERAL path")
+        logger.debug("Router: No articles found -> routing to GENERAL path")
+        ROUTE_TOTAL.inc(route="general")
         return "no_research"
 
 
+def route_by_session(state: AgentState) -> str:
+    """
+    Router at the start of the graph: decides whether the articles already
+    retrieved in this session are enough to answer the question.
+    
+    Returns:
+        "reuse_context" - the session's articles cover the follow-up (no PubMed round trip)
+        "retrieve" - new question or topic; search PubMed
+    """
+    if not state.get("history"):
+        return "retrieve"
+    
+    articles = state.get("session_context") or []
+    coverage = context_coverage(state["question"], state["history"], articles) if articles else 0.0
+    if articles and (is_short_follow_up(state["question"]) or coverage >= SESSION_REUSE_MIN_COVERAGE):
+        logger.debug("Router: follow-up covered by session context (%.0f%%)", coverage * 100)
+        SESSION_CONTEXT_TOTAL.inc(decision="reused")
+        return "reuse_context"
+    logger.debug("Router: session context covers %.0f%% of the question -> retrieving", coverage * 100)
+    SESSION_CONTEXT_TOTAL.inc(decision="retrieved")
+    return "retrieve"
+
+
+async def reuse_context_node(state: AgentState) -> dict:
+    """
+    Answers a follow-up from the session: picks the previously retrieved
+    articles most relevant to it (and the question it follows) with BM25.
+    """
+    query = f"{state.get('follow_up_of') or ''} {state['question']}"
+    context = rerank_articles(query, state["session_context"], RETRIEVE_TOP_K, stop_words=STOP_WORDS)
+    logger.debug("Reusing %d session articles", len(context))
+    return {"context": context}
+
+
+# Add matching Total Life Daily articles to the research context (needs SITE_ARTICLES_SOURCE)
+SITE_ARTICLES_IN_CONTEXT = env_bool("SITE_ARTICLES_IN_CONTEXT", False) and site_source is not None
+# In-house articles added per question, and the share of its keywords one must contain
+SITE_CONTEXT_ARTICLES = env_int("SITE_CONTEXT_ARTICLES", 2)
+SITE_CONTEXT_MIN_COVERAGE = env_float("SITE_CONTEXT_MIN_COVERAGE", 0.5)
+
+
+async def site_articles_node(state: AgentState) -> dict:
+    """
+    Appends the in-house articles that best match the question to the
+    PubMed context (after it, so citation numbering is unchanged).
+    Searches the in-memory site index; no network round trip.
+    """
+    context = state.get("context") or []
+    keywords = [
+        token for token in tokenize(retrieval_question(state), STOP_WORDS | FOLLOW_UP_WORDS) if len(token) > 2
+    ]
+    matches = site_index.search(" ".join(keywords), limit=SITE_CONTEXT_ARTICLES, prefix=False) if keywords else []
+    found = [
+        site_index.context_article(match["slug"])
+        for match in matches if match["coverage"] >= SITE_CONTEXT_MIN_COVERAGE
+    ]
+    found = [article for article in found if article is not None]
+    logger.debug("Adding %d in-house articles to the context", len(found))
+    return {"context": context + found}
+
+
 # =============================================================================
 # BUILD THE LANGGRAPH
 # =============================================================================
 
+def timed_node(name: str, node):
+    """Wrap a graph node so its latency is recorded in the node latency histogram."""
+    async def timed(state: AgentState) -> dict:
+        start = time.perf_counter()
+        with NODE_SECONDS.time(node=name):
+            update = await node(state)
+        # Degraded runs are shortcuts and would skew the estimate down
+        if not update.get("degradations"):
+            node_latency.observe(name, time.perf_counter() - start)
+        return update
+    
+    timed.__name__ = node.__name__
+    return timed
+
+
 def build_graph():
     """Constructs and compiles the RAG workflow graph."""
+    from langgraph.graph import END, START, StateGraph
+    
     graph_builder = StateGraph(AgentState)
     
-    # Add nodes
-    graph_builder.add_node("enhance_query", enhance_query_node)
-    graph_builder.add_node("retrieve", retrieve_node)
-    graph_builder.add_node("generate_research", generate_research_node)
-    graph_builder.add_node("generate_general", generate_general_node)
+    def add_node(name: str, node) -> None:
+        graph_builder.add_node(name, timed_node(name, node))
     
-    # Define the flow: START -> enhance_query -> retrieve
-    graph_builder.add_edge(START, "enhance_query")
-    graph_builder.add_edge("enhance_query", "retrieve")
+    # Add nodes
+    if RETRIEVAL_MODE == "speculative":
+        # enhance_query and the fallback search run concurrently inside one node
+        add_node("retrieve", with_reranking(with_retrieval_deadline(speculative_retrieve_node)))
+    else:
+        add_node("enhance_query", enhance_query_node)
+        add_node("retrieve", with_reranking(with_retrieval_deadline(retrieve_node)))
+    add_node("reuse_context", reuse_context_node)
+    if SITE_ARTICLES_IN_CONTEXT:
+        add_node("site_articles", site_articles_node)
+    add_node("generate_research", generate_research_node)
+    add_node("generate_general", generate_general_node)
     
-    # Conditional routing after retrieve: choose generation path based on context
+    # Define the flow: START -> [reuse_context | enhance_query -> retrieve (-> site_articles)]
+    first_retrieval_node = "retrieve" if RETRIEVAL_MODE == "speculative" else "enhance_query"
     graph_builder.add_conditional_edges(
-        "retrieve",
-        route_by_context,
+        START,
+        route_by_session,
         {
-            "has_research": "generate_research",
-            "no_research": "generate_general"
+            "reuse_context": "reuse_context",
+            "retrieve": first_retrieval_node
         }
     )
+    if RETRIEVAL_MODE != "speculative":
+        graph_builder.add_edge("enhance_query", "retrieve")
+    if SITE_ARTICLES_IN_CONTEXT:
+        graph_builder.add_edge("retrieve", "site_articles")
+    
+    # Conditional routing after retrieval: choose generation path based on context
+    for node_name in CONTEXT_NODES:
+        graph_builder.add_conditional_edges(
+            node_name,
+            route_by_context,
+            {
+                "has_research": "generate_research",
+                "no_research": "generate_general"
+            }
+        )
     
     # Both generation paths lead to END
     graph_builder.add_edge("generate_research", END)
@@ -459,36 +1241,407 @@ def build_graph():
     return graph_builder.compile()
 
 
-# Create the compiled graph (singleton instance)
-wellness_graph = build_graph()
+# The compiled graph (singleton), built on first use or by warm_up() so that
+# importing this module does not pay for langgraph/langchain imports
+_wellness_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_wellness_graph():
+    """Return the compiled graph, compiling it on first call (thread-safe)."""
+    global _wellness_graph
+    if _wellness_graph is None:
+        with _graph_lock:
+            if _wellness_graph is None:
+                _wellness_graph = build_graph()
+    return _wellness_graph
+
+
+async def aget_wellness_graph():
+    """get_wellness_graph() for async callers: compiles off the event loop if needed."""
+    if _wellness_graph is not None:
+        return _wellness_graph
+    return await asyncio.to_thread(get_wellness_graph)
+
+
+def is_warm() -> bool:
+    """Whether the graph has been compiled (first requests no longer pay for it)."""
+    return _wellness_graph is not None
+
+
+def __getattr__(name: str):
+    # Keeps `search_agent.wellness_graph` working for existing callers
+    if name == "wellness_graph":
+        return get_wellness_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def warm_up() -> dict:
+    """
+    Do the expensive first-use work ahead of the first request: import the
+    LLM/graph libraries, compile the graph, construct the chat model client
+    and open the local PubMed index when it is the retrieval backend.
+    Returns per-step timings in seconds. Blocking; run it in a worker thread.
+    """
+    timings = {}
+    start = time.perf_counter()
+    get_wellness_graph()
+    timings["graph_seconds"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    chat_messages("", "")
+    try:
+        get_llm()
+    except ValueError as e:
+        # Missing API key: the pipeline can still serve cached answers
+        logger.warning("LLM client not initialized during warm-up: %s", e)
+    timings["llm_seconds"] = time.perf_counter() - start
+    
+    if RETRIEVAL_BACKEND == "local":
+        start = time.perf_counter()
+        local_index()
+        timings["local_index_seconds"] = time.perf_counter() - start
+    return timings
 
 
 # =============================================================================
 # PUBLIC API
 # =============================================================================
 
-async def process_wellness_query(question: str) -> dict:
+# Nodes whose LLM tokens are forwarded to streaming clients
+ANSWER_NODES = {"generate_research", "generate_general"}
+# Nodes that produce the research context (in-house articles are added after retrieval)
+CONTEXT_NODES = ("site_articles" if SITE_ARTICLES_IN_CONTEXT else "retrieve", "reuse_context")
+
+
+def _initial_state(
+    question: str,
+    budget_seconds: Optional[float] = None,
+    session: Optional[Session] = None
+) -> dict:
+    """
+    Build the starting graph state for a question.
+    budget_seconds defaults to REQUEST_BUDGET_SECONDS; 0 means no deadline.
+    A session with history adds the compacted conversation and its articles.
+    """
+    if budget_seconds is None:
+        budget_seconds = REQUEST_BUDGET_SECONDS
+    has_history = session is not None and session.has_history
+    return {
+        "question": question,
+        "search_query": None,
+        "search_queries": None,
+        "context": [],
+        "context_stats": None,
+        "answer": "",
+        "deadline": time.monotonic() + budget_seconds if budget_seconds > 0 else None,
+        "degradations": [],
+        "history": session.history_text() if has_history else None,
+        "follow_up_of": session.last_question if has_history else None,
+        "session_context": session.article_list() if has_history else []
+    }
+
+
+async def process_wellness_query(
+    question: str,
+    budget_seconds: Optional[float] = None,
+    session_id: Optional[str] = None
+) -> dict:
     """
     Process a wellness question through the RAG pipeline.
     
     Args:
         question: User's wellness or health-related question
+        budget_seconds: End-to-end latency budget (defaults to REQUEST_BUDGET_SECONDS;
+            0 disables deadline-driven degradation)
+        session_id: Conversation id; follow-ups in a session see the earlier
+            turns and may be answered from articles retrieved for them
         
     Returns:
         dict with keys:
             - answer: AI-generated response (str)
             - context: List of PubMed articles used (list of dicts)
+            - degradations: Shortcuts taken to meet the budget (list of str)
+    
+    Answers are cached by normalized question, and concurrent identical
+    questions are coalesced into a single graph execution (across worker
+    processes too, when they share a state file). Degraded answers are not cached.
+    Follow-ups depend on their conversation, so they bypass the answer cache.
     """
-    initial_state = {
-        "question": question,
-        "search_query": None,
-        "context": [],
-        "answer": ""
+    session = sessions.get_or_create(session_id) if session_id else None
+    if session is None:
+        return await _answer_question(question, budget_seconds)
+    
+    async with session.lock:
+        await asyncio.to_thread(sessions.refresh, session)
+        if session.has_history:
+            graph = await aget_wellness_graph()
+            result = await graph.ainvoke(_initial_state(question, budget_seconds, session))
+            output = {
+                "answer": result["answer"],
+                "context": result.get("context", []),
+                "degradations": result.get("degradations", [])
+            }
+        else:
+            output = await _answer_question(question, budget_seconds)
+        session.record(question, output["answer"], output["context"])
+        await asyncio.to_thread(sessions.save, session)
+    return output
+
+
+def _copy_answer(output: dict) -> dict:
+    """The caller's own copy of a cached or shared answer, so mutating it cannot corrupt the cache."""
+    return {
+        **output,
+        "context": [dict(article) for article in output.get("context", [])],
+        "degradations": list(output.get("degradations", []))
     }
+
+
+async def _answer_question(question: str, budget_seconds: Optional[float]) -> dict:
+    """Stand-alone question: answer cache, then coalesced graph execution."""
+    cache_key = normalize_question(question)
+    cached = await asyncio.to_thread(answer_cache.get, cache_key)
+    if cached is not None:
+        logger.debug("Answer cache hit: %s", cache_key)
+        return _copy_answer(cached)
     
-    result = await wellness_graph.ainvoke(initial_state)
+    async def run_pipeline() -> dict:
+        graph = await aget_wellness_graph()
+        result = await graph.ainvoke(_initial_state(question, budget_seconds))
+        output = {
+            "answer": result["answer"],
+            "context": result.get("context", []),
+            "degradations": result.get("degradations", [])
+        }
+        if not output["degradations"]:
+            await asyncio.to_thread(answer_cache.set, cache_key, output)
+        return output
     
-    return {
-        "answer": result["answer"],
-        "context": result.get("context", [])
+    async def run_leased() -> dict:
+        if answer_leases is None:
+            return await run_pipeline()
+        return await answer_leases.do(cache_key, run_pipeline, lambda: answer_cache.peek(cache_key))
+    
+    return _copy_answer(await answer_flights.do(cache_key, run_leased))
+
+
+# Default and maximum number of batch questions answered concurrently
+BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", 4)
+BATCH_MAX_CONCURRENCY = env_int("BATCH_MAX_CONCURRENCY", 16)
+
+
+async def process_wellness_batch(
+    questions: List[str],
+    concurrency: Optional[int] = None,
+    articles: Optional[ArticleMemo] = None,
+    admit: Optional[Callable[[], Awaitable[Any]]] = None
+) -> AsyncIterator[dict]:
+    """
+    Process many wellness questions through the RAG pipeline with bounded
+    concurrency, yielding each result as soon as it completes.
+    
+    Args:
+        questions: Questions to answer
+        concurrency: Questions in flight at once (defaults to BATCH_CONCURRENCY,
+            capped at BATCH_MAX_CONCURRENCY)
+        articles: Optional ArticleMemo to collect PMID dedup stats into
+        admit: Optional coroutine function returning an admission slot (an
+            async context manager) that each question holds while it runs
+        
+    Yields:
+        dicts in completion order, either
+            - {"index", "question", "answer", "context"} on success, or
+            - {"index", "question", "error"} if that question failed
+    
+    PMIDs shared across questions are fetched and parsed once for the whole
+    batch. Workers pause while the consumer falls behind, so completed answers
+    do not pile up in memory.
+    """
+    limit = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    memo = articles if articles is not None else ArticleMemo()
+    pending = iter(enumerate(questions))
+    results: asyncio.Queue = asyncio.Queue(maxsize=limit)
+    
+    async def worker() -> None:
+        # Set inside the task so graph tasks spawned from it inherit the memo
+        batch_articles.set(memo)
+        for index, question in pending:
+            try:
+                # Batch answers are pre-generated, so quality wins over latency
+                if admit is None:
+                    result = await process_wellness_query(question, budget_seconds=0)
+                else:
+                    async with await admit():
+                        result = await process_wellness_query(question, budget_seconds=0)
+                item = {
+                    "index": index,
+                    "question": question,
+                    "answer": result["answer"],
+                    "context": result.get("context", [])
+                }
+            except Exception as e:
+                logger.warning("Batch question %d failed: %s", index, e)
+                item = {"index": index, "question": question, "error": str(e)}
+            await results.put(item)
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(limit, len(questions)))]
+    try:
+        for _ in range(len(questions)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def stream_wellness_query(
+    question: str,
+    budget_seconds: Optional[float] = None,
+    session_id: Optional[str] = None
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Process a wellness question through the RAG pipeline, yielding progress
+    events as each stage completes.
+    
+    Args:
+        question: User's wellness or health-related question
+        budget_seconds: End-to-end latency budget, as in process_wellness_query
+        session_id: Conversation id, as in process_wellness_query
+        
+    Yields:
+        (event, data) tuples, in order:
+            - ("query", {"search_query": str}) once the enhanced query is ready
+            - ("context", {"context": list of dicts}) once articles are retrieved
+            - ("token", {"text": str}) for each answer chunk the LLM emits
+            - ("done", {"answer": str, "context": list of dicts, "degradations": list of str}) at the end
+    
+    A cached answer is replayed as a single token event.
+    """
+    session = sessions.get_or_create(session_id) if session_id else None
+    if session is None:
+        async for event, data in _stream_answer(question, budget_seconds, None):
+            yield event, data
+        return
+    
+    async with session.lock:
+        await asyncio.to_thread(sessions.refresh, session)
+        async for event, data in _stream_answer(question, budget_seconds, session):
+            if event == "done":
+                session.record(question, data["answer"], data["context"])
+                await asyncio.to_thread(sessions.save, session)
+            yield event, data
+
+
+async def _stream_answer(
+    question: str,
+    budget_seconds: Optional[float],
+    session: Optional[Session]
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Graph progress events for stream_wellness_query. Stand-alone questions go
+    through the answer cache and the same single-flight as _answer_question:
+    the stream that starts an execution relays its events live (the execution
+    finishes and is cached even if that client leaves), while streams joining
+    one already in flight get its answer replayed when it completes.
+    Follow-ups skip both.
+    """
+    if session is not None and session.has_history:
+        async for event, data in _graph_events(question, budget_seconds, session):
+            yield event, data
+        return
+    
+    cache_key = normalize_question(question)
+    cached = await asyncio.to_thread(answer_cache.get, cache_key)
+    if cached is not None:
+        for event, data in _replay_answer(cached):
+            yield event, data
+        return
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def run_pipeline() -> dict:
+        output = None
+        async for event, data in _graph_events(question, budget_seconds, session):
+            events.put_nowait((event, data))
+            if event == "done":
+                output = data
+        if not output["degradations"]:
+            await asyncio.to_thread(answer_cache.set, cache_key, output)
+        return output
+    
+    async def run_leased() -> dict:
+        try:
+            if answer_leases is None:
+                return await run_pipeline()
+            return await answer_leases.do(cache_key, run_pipeline, lambda: answer_cache.peek(cache_key))
+        finally:
+            events.put_nowait(None)
+    
+    task, started = answer_flights.start(cache_key, run_leased)
+    relayed = False
+    if started:
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            event, data = item
+            relayed = True
+            yield event, _copy_answer(data) if event == "done" else data
+    output = await asyncio.shield(task)
+    if not relayed:
+        # Joined another request's execution, or another worker held the lease
+        for event, data in _replay_answer(output):
+            yield event, data
+
+
+def _replay_answer(output: dict) -> List[Tuple[str, dict]]:
+    """Stream events for a finished answer: its context, the whole answer as one token, done."""
+    output = _copy_answer(output)
+    return [("context", {"context": output["context"]}), ("token", {"text": output["answer"]}), ("done", output)]
+
+
+async def _graph_events(
+    question: str,
+    budget_seconds: Optional[float],
+    session: Optional[Session]
+) -> AsyncIterator[Tuple[str, dict]]:
+    """Run the graph, yielding its progress events and a final "done" with the answer."""
+    context: List[dict] = []
+    answer_parts: List[str] = []
+    degradations: List[str] = []
+    final_answer = None
+    
+    graph = await aget_wellness_graph()
+    async for mode, payload in graph.astream(
+        _initial_state(question, budget_seconds, session),
+        stream_mode=["updates", "messages"]
+    ):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") not in ANSWER_NODES:
+                continue
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                answer_parts.append(text)
+                yield "token", {"text": text}
+            continue
+        
+        for node_name, update in payload.items():
+            if not update:
+                continue
+            degradations.extend(update.get("degradations") or [])
+            if "search_query" in update:
+                yield "query", {"search_query": update["search_query"]}
+            if node_name in CONTEXT_NODES:
+                context = update.get("context", [])
+                yield "context", {"context": context}
+            if node_name in ANSWER_NODES:
+                final_answer = update.get("answer")
+    
+    output = {
+        "answer": final_answer if final_answer is not None else "".join(answer_parts),
+        "context": context,
+        "degradations": degradations
     }
+    yield "done", output
@@ -0,0 +1,262 @@
+"""
+Conversation Sessions - Recent Turns, Retrieved Articles and History Summaries
+A bounded, TTL-evicted in-memory store that lets follow-up questions in the
+chat modal reuse the articles already retrieved for the conversation. Recent
+turns are kept verbatim; older ones are folded into a compact extractive
+summary, so the history added to prompts stays within a fixed token budget.
+With several workers, sessions are also written to the shared SQLite state
+file, so a conversation's next turn can be served by any worker.
+"""
+
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+from cache import LRUCache, SQLiteCache
+from config import env_bool, env_float, env_int, shared_state_path
+from context_builder import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+_CITATION_RE = re.compile(r"\s*\[(?:Source|PMID):[^\]]*\]")
+_MARKDOWN_RE = re.compile(r"[*_#>`]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens at a word boundary."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+def summarize_turn(question: str, answer: str, max_words: int = 30) -> str:
+    """
+    One-line gist of a turn: the question and the first sentence of the
+    answer, without citations or Markdown, capped at max_words.
+    """
+    plain = " ".join(_MARKDOWN_RE.sub("", _CITATION_RE.sub("", answer)).split())
+    gist = _SENTENCE_END_RE.split(plain, 1)[0]
+    words = gist.split()
+    if len(words) > max_words:
+        gist = " ".join(words[:max_words]) + " ..."
+    return f"- Q: {question.strip()} A: {gist}"
+
+
+class Session:
+    """
+    One conversation: its recent turns, a summary of older turns, and the
+    articles retrieved so far (most recent last, deduplicated by PMID).
+    The lock serializes turns, so a follow-up sees the previous answer.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        recent_turns: int,
+        max_articles: int,
+        summary_tokens: int,
+        turn_tokens: int
+    ):
+        self.id = session_id
+        self.recent_turns = recent_turns
+        self.max_articles = max_articles
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary: List[str] = []
+        self.articles: "OrderedDict[str, dict]" = OrderedDict()
+        self.lock = asyncio.Lock()
+        self.version = 0  # turns recorded, to tell whether a shared copy is newer
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.turns or self.summary)
+
+    @property
+    def last_question(self) -> Optional[str]:
+        return self.turns[-1][0] if self.turns else None
+
+    def article_list(self) -> List[dict]:
+        return list(self.articles.values())
+
+    def record(self, question: str, answer: str, context: List[dict]) -> None:
+        """Add a finished turn and the articles it used."""
+        self.turns.append((question, answer))
+        while len(self.turns) > self.recent_turns:
+            self.summary.append(summarize_turn(*self.turns.popleft()))
+        while self.summary and estimate_tokens("\n".join(self.summary)) > self.summary_tokens:
+            self.summary.pop(0)
+
+        for article in context:
+            pmid = article.get("id")
+            if not pmid:
+                continue
+            self.articles.pop(pmid, None)
+            self.articles[pmid] = article
+        while len(self.articles) > self.max_articles:
+            self.articles.popitem(last=False)
+        self.version += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "turns": [list(turn) for turn in self.turns],
+            "summary": self.summary,
+            "articles": list(self.articles.values()),
+        }
+
+    def load(self, data: dict) -> None:
+        """Replace this session's state with a stored copy (see to_dict)."""
+        self.version = data["version"]
+        self.turns = deque(tuple(turn) for turn in data["turns"])
+        self.summary = list(data["summary"])
+        self.articles = OrderedDict((article["id"], article) for article in data["articles"])
+
+    def history_text(self) -> str:
+        """The conversation so far, compacted for a prompt ("" for a new session)."""
+        lines = []
+        if self.summary:
+            lines.append("Earlier in this conversation:")
+            lines.extend(self.summary)
+        if self.turns:
+            lines.append("Most recent exchanges:")
+            for question, answer in self.turns:
+                lines.append(f"User: {question.strip()}")
+                lines.append(f"Assistant: {clip_text(' '.join(answer.split()), self.turn_tokens)}")
+        return "\n".join(lines)
+
+
+class SessionStore:
+    """
+    Sessions keyed by the client's session id, in an LRU with a sliding TTL:
+    every access renews the session, idle ones expire after ttl_seconds, and
+    the least recently used are evicted beyond max_sessions.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        ttl_seconds: float,
+        recent_turns: int,
+        max_articles: int,
+        summary_tokens: int,
+        turn_tokens: int,
+        shared: Optional[SQLiteCache] = None
+    ):
+        self._sessions = LRUCache(max_sessions, ttl_seconds)
+        self._shared = shared
+        self._lock = threading.Lock()
+        self.recent_turns = recent_turns
+        self.max_articles = max_articles
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.created = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._sessions.max_entries > 0
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return a live session (renewing its TTL), or None."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.set(session_id, session)
+            return session
+
+    def get_or_create(self, session_id: str) -> Optional[Session]:
+        """Return the session for session_id, starting a new one if needed (None when disabled)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(
+                    session_id, self.recent_turns, self.max_articles, self.summary_tokens, self.turn_tokens
+                )
+                self.created += 1
+            self._sessions.set(session_id, session)
+            return session
+
+    def refresh(self, session: Session) -> None:
+        """Bring a session up to date with the shared copy, if another worker recorded newer turns."""
+        if self._shared is None:
+            return
+        try:
+            data = self._shared.get_many([session.id]).get(session.id)
+        except sqlite3.Error as e:
+            logger.warning("Shared session store unavailable: %s", e)
+            return
+        if data is not None and data["version"] > session.version:
+            session.load(data)
+        elif data is None and session.version:
+            # Ended (DELETE /chat/sessions) or expired on another worker
+            session.load({"version": 0, "turns": [], "summary": [], "articles": []})
+
+    def save(self, session: Session) -> None:
+        """Write a session to the shared store after a turn (no-op with a single worker)."""
+        if self._shared is None:
+            return
+        try:
+            self._shared.set_many({session.id: session.to_dict()})
+        except sqlite3.Error as e:
+            logger.warning("Shared session store unavailable: %s", e)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.delete(session_id)
+        if self._shared is not None:
+            try:
+                self._shared.delete(session_id)
+            except sqlite3.Error as e:
+                logger.warning("Shared session store unavailable: %s", e)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sessions": len(self._sessions),
+            "max_sessions": self._sessions.max_entries,
+            "ttl_seconds": self._sessions.ttl_seconds,
+            "created": self.created,
+            "shared": self._shared is not None
+        }
+
+
+def build_session_store() -> SessionStore:
+    """
+    Build the conversation session store from the environment.
+
+    Environment variables:
+        SESSION_MAX_SESSIONS: Sessions kept in memory (0 disables sessions)
+        SESSION_TTL: Seconds of inactivity before a session expires
+        SESSION_RECENT_TURNS: Turns kept verbatim; older ones are summarized
+        SESSION_MAX_ARTICLES: Retrieved articles remembered per session
+        SESSION_SUMMARY_TOKENS: Token budget for the summary of older turns
+        SESSION_TURN_TOKENS: Tokens of each recent answer included in prompts
+        SESSION_SHARED: With several workers, keep sessions in the shared state
+            file (SHARED_STATE_PATH) so any worker can serve the next turn (default true)
+    """
+    max_sessions = env_int("SESSION_MAX_SESSIONS", 2000)
+    ttl_seconds = env_float("SESSION_TTL", 1800.0)
+    shared = None
+    path = shared_state_path()
+    if path and max_sessions > 0 and env_bool("SESSION_SHARED", True):
+        shared = SQLiteCache(path, "sessions", max_sessions, ttl_seconds)
+    return SessionStore(
+        max_sessions=max_sessions,
+        ttl_seconds=ttl_seconds,
+        recent_turns=env_int("SESSION_RECENT_TURNS", 3),
+        max_articles=env_int("SESSION_MAX_ARTICLES", 12),
+        summary_tokens=env_int("SESSION_SUMMARY_TOKENS", 250),
+        turn_tokens=env_int("SESSION_TURN_TOKENS", 150),
+        shared=shared
+    )
@@ -0,0 +1,601 @@
+"""
+Site Articles - In-memory Full-text Index over Total Life Daily Articles
+Loads the site's own articles (the Supabase `articles` table, or a SQL/JSON
+dump of it) into an inverted index over title, excerpt, category and content.
+The index serves /articles/search and, optionally, adds matching in-house
+articles to the chatbot's research context.
+
+The index is kept in sync incrementally: each refresh reads only rows whose
+updated_at is newer than the last one seen (or, for dumps, rows whose
+updated_at/content changed), re-indexes those and drops deleted articles.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from config import INDEX_STOP_WORDS, env_float, env_str
+from reranker import BM25_B, BM25_K1, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+# Field weights: a query word in the title counts three times one in the body
+FIELD_WEIGHTS = {"title": 3.0, "excerpt": 2.0, "category": 2.0, "content": 1.0}
+
+# Terms a trailing partial word may expand to (search-as-you-type)
+MAX_PREFIX_EXPANSIONS = 20
+
+_MD_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_MARKUP_RE = re.compile(r"[#*_>`|~]+")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def strip_markdown(text: str) -> str:
+    """Plain text of an article body: links keep their text, markup is dropped."""
+    text = _MD_LINK_RE.sub(r"\1", text or "")
+    return _MD_MARKUP_RE.sub(" ", text)
+
+
+def article_terms(row: dict, text: Optional[str] = None) -> Dict[str, float]:
+    """Field-weighted term frequencies of an article row (text: its plain-text body, if already stripped)."""
+    if text is None:
+        text = strip_markdown(row.get("content") or "")
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = text if field == "content" else row.get(field) or ""
+        for term in tokenize(value, INDEX_STOP_WORDS):
+            terms[term] = terms.get(term, 0.0) + weight
+    return terms
+
+
+def row_version(row: dict) -> str:
+    """Change marker for a row: updated_at when the source has it, else a content hash."""
+    if row.get("updated_at"):
+        return str(row["updated_at"])
+    payload = json.dumps([row.get(field) for field in ("title", "excerpt", "content", "category")])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+_INSERT_RE = re.compile(
+    r'INSERT\s+INTO\s+(?:"?public"?\.)?"?articles"?\s*\(([^)]*)\)\s*VALUES', re.IGNORECASE
+)
+_COPY_RE = re.compile(
+    r'^COPY\s+(?:"?public"?\.)?"?articles"?\s*\(([^)]*)\)\s+FROM\s+stdin;\s*$', re.IGNORECASE | re.MULTILINE
+)
+_COPY_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\", "b": "\b", "f": "\f", "v": "\v"}
+
+
+def _sql_literal(token: str):
+    """Interpret an unquoted SQL value (NULL, booleans, numbers; NOW() and others become None)."""
+    token = token.strip().split("::", 1)[0].strip()
+    lowered = token.lower()
+    if lowered in ("null", "default") or "(" in token:
+        return None
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def _sql_tuples(text: str, position: int) -> Iterator[list]:
+    """Yield the value tuples of one INSERT ... VALUES statement starting at position."""
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if char.isspace() or char == ",":
+            position += 1
+        elif text.startswith("--", position):
+            position = text.find("\n", position)
+            position = length if position < 0 else position
+        elif char == "(":
+            values, position = _sql_tuple(text, position + 1)
+            yield values
+        else:
+            # ";" or a trailing clause such as ON CONFLICT ends the statement
+            return
+
+
+def _sql_tuple(text: str, position: int) -> Tuple[list, int]:
+    """Parse "v1, v2, ...)" and return the values and the position after ")"."""
+    values = []
+    token = []
+    quoted = None
+    depth = 0
+    while position < len(text):
+        char = text[position]
+        if char == "'":
+            # Quoted string ('' is an escaped quote); E'' strings are read the same way
+            end = position + 1
+            parts = []
+            while True:
+                close = text.index("'", end)
+                parts.append(text[end:close])
+                if text.startswith("''", close):
+                    parts.append("'")
+                    end = close + 2
+                else:
+                    break
+            quoted = "".join(parts)
+            token = []
+            position = close + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")" and depth:
+            depth -= 1
+        elif char in ",)" and not depth:
+            raw = "".join(token).strip()
+            values.append(quoted if quoted is not None else _sql_literal(raw))
+            quoted = None
+            token = []
+            if char == ")":
+                return values, position + 1
+            position += 1
+            continue
+        token.append(char)
+        position += 1
+    raise ValueError("Unterminated VALUES tuple in SQL dump")
+
+
+def _copy_value(field: str):
+    if field == r"\N":
+        return None
+    return re.sub(r"\\(.)", lambda m: _COPY_ESCAPES.get(m.group(1), m.group(1)), field)
+
+
+def parse_sql_dump(text: str) -> List[dict]:
+    """
+    Article rows from a SQL dump: INSERT INTO articles (...) VALUES ... statements
+    (as in add-test-articles.sql) and/or a pg_dump COPY articles (...) FROM stdin block.
+    """
+    rows = []
+    for match in _INSERT_RE.finditer(text):
+        columns = [column.strip().strip('"') for column in match.group(1).split(",")]
+        for values in _sql_tuples(text, match.end()):
+            rows.append(dict(zip(columns, values)))
+
+    for match in _COPY_RE.finditer(text):
+        columns = [column.strip().strip('"') for column in match.group(1).split(",")]
+        for line in text[match.end():].lstrip("\n").split("\n"):
+            if line == "\\.":
+                break
+            values = [_copy_value(field) for field in line.split("\t")]
+            row = dict(zip(columns, values))
+            for flag in ("is_featured", "is_hero"):
+                if isinstance(row.get(flag), str):
+                    row[flag] = row[flag] == "t"
+            rows.append(row)
+    return rows
+
+
+class DumpSource:
+    """
+    A .sql or .json dump of the articles table. Every read is a full snapshot,
+    so articles missing from it are treated as deleted; the file is only
+    re-read when its modification time changes.
+    """
+
+    snapshot = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+
+    def changes(self, since: Optional[str]) -> Optional[List[dict]]:
+        """All rows, or None when the file has not changed since the last read."""
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            text = f.read()
+        if self.path.endswith(".json"):
+            data = json.loads(text)
+            rows = data if isinstance(data, list) else data.get("articles") or data.get("data") or []
+        else:
+            rows = parse_sql_dump(text)
+        self._mtime = mtime
+        return rows
+
+    def __repr__(self) -> str:
+        return f"DumpSource({self.path!r})"
+
+
+class SupabaseSource:
+    """
+    The live articles table through Supabase's REST API (PostgREST). Each
+    refresh asks only for rows with updated_at after the newest one seen.
+    Deletions leave no updated_at to filter on, so the source remembers every
+    slug it has returned and compares that with an exact row count; the full
+    slug list is only fetched when the table has fewer rows than that.
+    """
+
+    snapshot = False
+
+    def __init__(self, url: str, key: str, page_size: int = 1000, timeout: float = 10.0):
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/articles"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.page_size = page_size
+        self.timeout = timeout
+        # Slugs returned so far; while no row is deleted the table holds exactly these
+        self._seen: set = set()
+
+    def _pages(self, client: httpx.Client, params: dict) -> List[dict]:
+        rows = []
+        offset = 0
+        while True:
+            response = client.get(
+                self.endpoint, params={**params, "limit": self.page_size, "offset": offset}, headers=self.headers
+            )
+            response.raise_for_status()
+            page = response.json()
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            offset += len(page)
+
+    def changes(self, since: Optional[str]) -> List[dict]:
+        """Rows updated after since (all rows when since is None)."""
+        params = {"select": "*", "order": "updated_at.asc"}
+        if since:
+            params["updated_at"] = f"gt.{since}"
+        with httpx.Client(timeout=self.timeout) as client:
+            rows = self._pages(client, params)
+        self._seen.update(row.get("slug") for row in rows)
+        return rows
+
+    def _count(self, client: httpx.Client) -> int:
+        """Exact number of rows, from the Content-Range header ("0-0/123")."""
+        response = client.get(
+            self.endpoint, params={"select": "slug", "limit": 1}, headers={**self.headers, "Prefer": "count=exact"}
+        )
+        response.raise_for_status()
+        return int(response.headers["content-range"].rsplit("/", 1)[1])
+
+    def live_slugs(self) -> Optional[List[str]]:
+        """All slugs, or None when the row count shows that nothing was deleted."""
+        with httpx.Client(timeout=self.timeout) as client:
+            if self._count(client) >= len(self._seen):
+                return None
+            slugs = [row["slug"] for row in self._pages(client, {"select": "slug", "order": "slug.asc"})]
+        self._seen = set(slugs)
+        return slugs
+
+    def __repr__(self) -> str:
+        return f"SupabaseSource({self.endpoint!r})"
+
+
+# =============================================================================
+# INVERTED INDEX
+# =============================================================================
+
+class SiteArticleIndex:
+    """
+    Incremental BM25 index keyed by article slug. Postings map each term to
+    {document id: field-weighted term frequency}; re-indexing an article
+    removes its old postings first, so updates never need a rebuild.
+    Searches score with NumPy over array copies of the postings and document
+    lengths, rebuilt lazily for the terms an update touched.
+    Thread-safe: refreshes run in a worker thread while searches are served.
+    """
+
+    def __init__(self, base_url: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self._lock = threading.RLock()
+        self._docs: Dict[int, dict] = {}
+        self._slugs: Dict[str, int] = {}
+        self._versions: Dict[str, str] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocab: Optional[List[str]] = None
+        # Array views for scoring: (doc ids, tfs) per term, and lengths indexed by doc id
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: Optional[np.ndarray] = None
+        self._total_len = 0.0
+        self._next_id = 0
+        self.watermark: Optional[str] = None
+        self.refreshes = 0
+        self.updated = 0
+        self.deleted = 0
+        self.last_refresh: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def upsert(self, row: dict) -> bool:
+        """Index or re-index one article row; returns False if it was unchanged."""
+        slug = row.get("slug")
+        if not slug or not row.get("title"):
+            return False
+        version = row_version(row)
+        with self._lock:
+            if self._versions.get(slug) == version:
+                return False
+            self._remove(slug)
+
+            text = strip_markdown(row.get("content") or "")
+            terms = article_terms(row, text)
+
+            doc_id = self._next_id
+            self._next_id += 1
+            self._docs[doc_id] = {**row, "text": " ".join(text.split())}
+            self._slugs[slug] = doc_id
+            self._versions[slug] = version
+            self._doc_terms[doc_id] = terms
+            self._doc_len[doc_id] = sum(terms.values())
+            self._total_len += self._doc_len[doc_id]
+            self._lengths = None
+            for term, tf in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._vocab = None
+                postings[doc_id] = tf
+                self._arrays.pop(term, None)
+            return True
+
+    def delete(self, slug: str) -> bool:
+        with self._lock:
+            return self._remove(slug)
+
+    def _remove(self, slug: str) -> bool:
+        doc_id = self._slugs.pop(slug, None)
+        if doc_id is None:
+            return False
+        self._versions.pop(slug, None)
+        del self._docs[doc_id]
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._lengths = None
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                self._vocab = None
+        return True
+
+    def get(self, slug: str) -> Optional[dict]:
+        """The stored row for an article (plus its plain-text body as "text"), or None."""
+        with self._lock:
+            doc_id = self._slugs.get(slug)
+            return self._docs[doc_id] if doc_id is not None else None
+
+    def rows(self) -> List[dict]:
+        with self._lock:
+            return list(self._docs.values())
+
+    def refresh(self, source) -> dict:
+        """
+        Apply the source's changes since the last refresh. Returns counts plus
+        the slugs that were (re-)indexed ("changed") and dropped ("removed").
+        """
+        rows = source.changes(self.watermark)
+        changed: List[str] = []
+        removed: List[str] = []
+        if rows is not None:
+            for row in rows:
+                if self.upsert(row):
+                    changed.append(row["slug"])
+                stamp = row.get("updated_at")
+                if stamp and (self.watermark is None or str(stamp) > self.watermark):
+                    self.watermark = str(stamp)
+            live = {row.get("slug") for row in rows} if source.snapshot else None
+        else:
+            live = None
+        if not source.snapshot:
+            slugs = source.live_slugs()
+            live = set(slugs) if slugs is not None else None
+        if live is not None:
+            for slug in [slug for slug in self._slugs if slug not in live]:
+                if self.delete(slug):
+                    removed.append(slug)
+
+        self.refreshes += 1
+        self.updated += len(changed)
+        self.deleted += len(removed)
+        self.last_refresh = time.time()
+        if changed or removed:
+            logger.info("Site article index: %d updated, %d deleted, %d articles", len(changed), len(removed), len(self))
+        return {
+            "updated": len(changed),
+            "deleted": len(removed),
+            "articles": len(self),
+            "changed": changed,
+            "removed": removed
+        }
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """A term's postings as (doc ids, field-weighted tfs) arrays."""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term) or {}
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            )
+        return arrays
+
+    def _doc_lengths(self) -> np.ndarray:
+        """Document lengths indexed by doc id (0 for ids of removed articles)."""
+        if self._lengths is None:
+            lengths = np.zeros(self._next_id, dtype=np.float64)
+            lengths[np.fromiter(self._doc_len.keys(), dtype=np.int64, count=len(self._doc_len))] = list(
+                self._doc_len.values()
+            )
+            self._lengths = lengths
+        return self._lengths
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        start = bisect_left(self._vocab, prefix)
+        terms = []
+        for term in self._vocab[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        category: Optional[str] = None,
+        prefix: bool = True
+    ) -> List[dict]:
+        """
+        Articles matching query, best first, with a snippet and "coverage":
+        the share of the query's words the article contains. With prefix,
+        a trailing partial word also matches words it starts (search-as-you-type).
+        """
+        words = list(dict.fromkeys(tokenize(query, INDEX_STOP_WORDS)))
+        if not words:
+            return []
+        with self._lock:
+            # Each query word is a group of index terms (one, or a prefix's expansions)
+            groups = [[word] for word in words]
+            if prefix and query[-1:].isalnum():
+                groups[-1] = list(dict.fromkeys([words[-1]] + self._expand_prefix(words[-1])))
+
+            documents = len(self._docs) or 1
+            avg_len = self._total_len / documents or 1.0
+            doc_len = self._doc_lengths()
+            scores = np.zeros(len(doc_len), dtype=np.float64)
+            matched = np.zeros(len(doc_len), dtype=np.int32)
+            for group in groups:
+                hits = np.zeros(len(doc_len), dtype=bool)
+                for term in group:
+                    docs, tfs = self._term_arrays(term)
+                    if not len(docs):
+                        continue
+                    idf = math.log(1 + (documents - len(docs) + 0.5) / (len(docs) + 0.5))
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[docs] / avg_len)
+                    # A term lists each document once, so the fancy-indexed add is safe
+                    scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+                    hits[docs] = True
+                matched += hits
+
+            candidates = np.nonzero(matched)[0]
+            if category is not None:
+                candidates = np.array(
+                    [doc_id for doc_id in candidates.tolist() if self._docs[doc_id].get("category") == category],
+                    dtype=np.int64
+                )
+            if 0 < limit < len(candidates):
+                # Keep everything scoring at least the limit-th best, so ties are broken below
+                cutoff = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+                candidates = candidates[scores[candidates] >= cutoff]
+            # Best score first; newest first among equal scores
+            candidates = sorted(
+                candidates.tolist(), key=lambda doc_id: str(self._docs[doc_id].get("published_at") or ""), reverse=True
+            )
+            ranked = sorted(candidates, key=lambda doc_id: -scores[doc_id])[:limit]
+            return [
+                self._result(self._docs[doc_id], float(scores[doc_id]), int(matched[doc_id]) / len(groups), groups)
+                for doc_id in ranked
+            ]
+
+    def _result(self, doc: dict, score: float, coverage: float, groups: List[List[str]]) -> dict:
+        return {
+            "id": doc.get("id"),
+            "slug": doc["slug"],
+            "title": doc["title"],
+            "excerpt": doc.get("excerpt"),
+            "category": doc.get("category"),
+            "published_at": doc.get("published_at"),
+            "url": self.article_url(doc["slug"]),
+            "score": round(score, 4),
+            "coverage": round(coverage, 3),
+            "snippet": self._snippet(doc["text"], {term for group in groups for term in group}),
+        }
+
+    @staticmethod
+    def _snippet(text: str, terms: set, max_chars: int = 200) -> str:
+        """The first sentence of the body that contains a query term."""
+        sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+        best = next((s for s in sentences if terms & set(tokenize(s))), sentences[0] if sentences else "")
+        return best if len(best) <= max_chars else best[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+    def article_url(self, slug: str) -> str:
+        return f"{self.base_url}/blog/{slug}"
+
+    def context_article(self, slug: str, max_chars: int = 1500) -> Optional[dict]:
+        """An article in the shape of a PubMed context article, for the RAG prompt."""
+        with self._lock:
+            doc_id = self._slugs.get(slug)
+            if doc_id is None:
+                return None
+            doc = self._docs[doc_id]
+        text = doc["text"]
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+        return {
+            "id": f"tld-{slug}",
+            "title": doc["title"],
+            "content": text,
+            "authors": "Total Life Daily",
+            "journal": "Total Life Daily",
+            "year": str(doc.get("published_at") or "Unknown")[:4],
+            "url": self.article_url(slug),
+            "source": "site"
+        }
+
+    def stats(self) -> dict:
+        return {
+            "articles": len(self._docs),
+            "terms": len(self._postings),
+            "watermark": self.watermark,
+            "refreshes": self.refreshes,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "last_refresh": self.last_refresh
+        }
+
+
+def build_site_source():
+    """
+    The configured article source, or None when in-house search is disabled.
+
+    Environment variables:
+        SITE_ARTICLES_SOURCE: Path to a .sql/.json dump of the articles table,
+            or "supabase" to read it live via SUPABASE_URL and SUPABASE_KEY
+    """
+    source = env_str("SITE_ARTICLES_SOURCE", "")
+    if not source:
+        return None
+    if source.lower() == "supabase":
+        url, key = env_str("SUPABASE_URL", ""), env_str("SUPABASE_KEY", "")
+        if not url or not key:
+            logger.warning("SITE_ARTICLES_SOURCE=supabase needs SUPABASE_URL and SUPABASE_KEY; disabled")
+            return None
+        return SupabaseSource(url, key)
+    return DumpSource(source)
+
+
+# Index and source (singletons); refreshed by main's background task
+site_index = SiteArticleIndex(env_str("SITE_BASE_URL", ""))
+site_source = build_site_source()
+# Seconds between incremental refreshes from site_source
+SITE_ARTICLES_REFRESH_SECONDS = env_float("SITE_ARTICLES_REFRESH_SECONDS", 300.0)
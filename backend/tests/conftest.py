@@ -0,0 +1,13 @@
+"""
+Test configuration: puts the backend modules on the import path and keeps
+imports from touching shared state (no SQLite cache tier, quiet logging).
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("CACHE_DB_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,155 @@
+"""Tests for chat admission control: slot limit, fair ordering and rejections."""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def controller(max_concurrent=1, max_queue=10, max_queue_per_user=4, queue_timeout=5.0) -> AdmissionController:
+    return AdmissionController(max_concurrent, max_queue, max_queue_per_user, queue_timeout)
+
+
+async def admitted_order(admission: AdmissionController, requests: list) -> list:
+    """Hold the only slot, queue requests as (user, label), then release and record the admission order."""
+    holder = await admission.acquire("holder")
+    order = []
+
+    async def request(user: str, label: str) -> None:
+        async with await admission.acquire(user):
+            order.append(label)
+            await asyncio.sleep(0)
+
+    tasks = []
+    for user, label in requests:
+        tasks.append(asyncio.create_task(request(user, label)))
+        await asyncio.sleep(0)  # queue in submission order
+    holder.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_waiters_are_served_round_robin_across_users():
+    requests = [("alice", "a1"), ("alice", "a2"), ("alice", "a3"), ("bob", "b1"), ("carol", "c1"), ("bob", "b2")]
+    order = asyncio.run(admitted_order(controller(max_queue_per_user=3), requests))
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_single_user_is_served_in_order():
+    requests = [("alice", f"a{i}") for i in range(4)]
+    assert asyncio.run(admitted_order(controller(), requests)) == ["a0", "a1", "a2", "a3"]
+
+
+def test_requests_under_the_limit_do_not_queue():
+    async def run():
+        admission = controller(max_concurrent=2)
+        first = await admission.acquire("alice")
+        second = await admission.acquire("alice")
+        assert admission.stats()["in_flight"] == 2
+        first.release()
+        first.release()  # idempotent
+        second.release()
+        return admission.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_full_queues_are_rejected():
+    async def run():
+        admission = controller(max_queue=2, max_queue_per_user=1)
+        await admission.acquire("holder")
+        waiting = [asyncio.create_task(admission.acquire("alice"))]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as user_full:
+            await admission.acquire("alice")
+        waiting.append(asyncio.create_task(admission.acquire("bob")))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await admission.acquire("carol")
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return user_full.value, queue_full.value, admission.stats()
+
+    user_full, queue_full, stats = asyncio.run(run())
+    assert (user_full.status_code, user_full.reason) == (429, "user_queue_full")
+    assert (queue_full.status_code, queue_full.reason) == (503, "queue_full")
+    assert user_full.retry_after >= 1
+    assert stats["queued"] == 0
+
+
+def test_waiter_times_out_and_leaves_the_queue():
+    async def run():
+        admission = controller(queue_timeout=0.01)
+        holder = await admission.acquire("holder")
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await admission.acquire("alice")
+        holder.release()
+        return timed_out.value, admission.stats()
+
+    timed_out, stats = asyncio.run(run())
+    assert (timed_out.status_code, timed_out.reason) == (503, "timeout")
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def run():
+        admission = controller()
+        holder = await admission.acquire("holder")
+        cancelled = asyncio.create_task(admission.acquire("alice"))
+        waiting = asyncio.create_task(admission.acquire("bob"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        holder.release()
+        slot = await waiting
+        stats = admission.stats()
+        slot.release()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 1
+    assert stats["queued"] == 0
+
+
+def test_disabled_controller_admits_everything():
+    async def run():
+        admission = controller(max_concurrent=0)
+        slots = [await admission.acquire("alice") for _ in range(20)]
+        for slot in slots:
+            slot.release()
+        return admission
+
+    admission = asyncio.run(run())
+    assert not admission.stats()["enabled"]
+    assert admission.stats()["admitted"] == 0
+    assert admission.in_flight == 0
+    assert admission._service_seconds == 5.0
+
+
+def test_batch_questions_hold_admission_slots(monkeypatch):
+    import search_agent
+
+    admission = controller(max_concurrent=2)
+    running = []
+
+    async def answer(question, budget_seconds=None):
+        running.append(admission.in_flight)
+        await asyncio.sleep(0.01)
+        return {"answer": question.upper(), "context": []}
+
+    monkeypatch.setattr(search_agent, "process_wellness_query", answer)
+
+    async def run():
+        admit = lambda: admission.acquire("batch")
+        return [item async for item in search_agent.process_wellness_batch([f"q{i}" for i in range(6)], 4, admit=admit)]
+
+    items = asyncio.run(run())
+    assert sorted(item["answer"] for item in items) == [f"Q{i}" for i in range(6)]
+    assert max(running) == 2
+    assert admission.stats()["admitted"] == 6
+    assert admission.in_flight == 0
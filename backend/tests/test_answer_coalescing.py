@@ -0,0 +1,157 @@
+"""Tests for single-flight answer coalescing and the answer cache in the pipeline entry points."""
+
+import asyncio
+
+import pytest
+
+import search_agent
+from cache import SingleFlight
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flights = SingleFlight()
+    runs = []
+
+    async def work(key):
+        runs.append(key)
+        await asyncio.sleep(0.01)
+        return f"result:{key}"
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("a", lambda: work("a")),
+            flights.do("a", lambda: work("a")),
+            flights.do("b", lambda: work("b")),
+            flights.do("a", lambda: work("a")),
+        )
+
+    assert asyncio.run(run()) == ["result:a", "result:a", "result:b", "result:a"]
+    assert sorted(runs) == ["a", "b"]
+    assert flights.stats() == {"executions": 2, "coalesced": 2, "in_flight": 0}
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flights.do("a", work))
+        second = asyncio.create_task(flights.do("a", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == ("done", True)
+
+
+def test_single_flight_shares_errors_and_then_retries():
+    flights = SingleFlight()
+    attempts = []
+
+    async def fail():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        results = await asyncio.gather(flights.do("a", fail), flights.do("a", fail), return_exceptions=True)
+        again = await asyncio.gather(flights.do("a", fail), return_exceptions=True)
+        return results + again
+
+    assert [str(result) for result in asyncio.run(run())] == ["upstream down"] * 3
+    assert len(attempts) == 2
+
+
+class FakeGraph:
+    """Stands in for the compiled LangGraph graph: one context update and a streamed answer."""
+
+    def __init__(self):
+        self.runs = 0
+
+    def _output(self, state):
+        return {"answer": f"Answer to {state['question']}", "context": [{"id": "1", "title": "Sleep"}]}
+
+    async def ainvoke(self, state):
+        self.runs += 1
+        await asyncio.sleep(0.02)
+        return {**self._output(state), "degradations": []}
+
+    async def astream(self, state, stream_mode):
+        self.runs += 1
+        output = self._output(state)
+        yield "updates", {"retrieve": {"context": output["context"]}}
+        for word in output["answer"].split(" "):
+            await asyncio.sleep(0.005)
+            yield "messages", (type("Chunk", (), {"content": word + " "})(), {"langgraph_node": "generate_research"})
+        yield "updates", {"generate_research": {"answer": output["answer"]}}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = FakeGraph()
+
+    async def aget_wellness_graph():
+        return graph
+
+    monkeypatch.setattr(search_agent, "aget_wellness_graph", aget_wellness_graph)
+    monkeypatch.setattr(search_agent, "answer_flights", SingleFlight())
+    monkeypatch.setattr(search_agent, "answer_leases", None)
+    return graph
+
+
+def streamed(question):
+    async def collect():
+        return [item async for item in search_agent._stream_answer(question, 0, None)]
+
+    return collect()
+
+
+def test_answers_are_copies_of_the_cached_entry(graph):
+    async def run():
+        first = await search_agent._answer_question("Does magnesium help sleep?", 0)
+        first["answer"] = "mutated"
+        first["context"].append({"id": "2"})
+        first["context"][0]["title"] = "mutated"
+        return await search_agent._answer_question("does magnesium help sleep", 0)
+
+    second = asyncio.run(run())
+    assert second == {"answer": "Answer to Does magnesium help sleep?", "context": [{"id": "1", "title": "Sleep"}], "degradations": []}
+    assert graph.runs == 1
+
+
+def test_concurrent_streams_and_chat_share_one_execution(graph):
+    async def run():
+        leader = asyncio.create_task(streamed("Is melatonin safe for kids?"))
+        await asyncio.sleep(0)
+        return await asyncio.gather(
+            leader,
+            streamed("is melatonin safe for kids"),
+            search_agent._answer_question("Is melatonin safe for kids", 0),
+        )
+
+    leader, follower, answer = asyncio.run(run())
+    assert graph.runs == 1
+    # The stream that started the execution relays tokens live; the joiner gets a replay
+    assert [event for event, _ in leader].count("token") > 1
+    assert [event for event, _ in follower] == ["context", "token", "done"]
+    assert leader[-1][1] == follower[-1][1] == answer
+    assert search_agent.answer_cache.get(search_agent.normalize_question("Is melatonin safe for kids?")) == answer
+
+    # Later streams are served from the answer cache
+    assert [event for event, _ in asyncio.run(streamed("Is melatonin safe for kids?"))] == ["context", "token", "done"]
+    assert graph.runs == 1
+
+
+def test_stream_execution_finishes_when_its_client_leaves(graph):
+    async def run():
+        stream = search_agent._stream_answer("Can yoga lower blood pressure?", 0, None)
+        assert (await stream.__anext__())[0] == "context"
+        await stream.aclose()
+        await asyncio.sleep(0.2)
+        return await search_agent._answer_question("Can yoga lower blood pressure?", 0)
+
+    assert asyncio.run(run())["answer"] == "Answer to Can yoga lower blood pressure?"
+    assert graph.runs == 1
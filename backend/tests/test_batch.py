@@ -0,0 +1,73 @@
+"""Tests for the batch endpoint's PMID deduplication across questions."""
+
+import asyncio
+import json
+
+import pytest
+
+import main
+import search_agent
+
+# PMIDs each question retrieves; several are shared between questions
+QUESTION_PMIDS = {
+    "sleep": ["1", "2", "3"],
+    "insomnia": ["2", "3", "4"],
+    "melatonin": ["1", "4", "5"],
+    "naps": ["6"],
+    "rest": ["1", "6"],
+}
+
+
+class NoCache:
+    def get_many(self, keys):
+        return {}
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    downloaded = []
+
+    async def download_articles(pmids, client=None):
+        downloaded.extend(pmids)
+        await asyncio.sleep(0.01)
+        return {pmid: {"id": pmid, "title": f"Article {pmid}", "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}"} for pmid in pmids}
+
+    async def answer(question, budget_seconds=None):
+        if question == "broken":
+            raise RuntimeError("pipeline failed")
+        context = await search_agent.fetch_pubmed_articles(QUESTION_PMIDS[question])
+        return {"answer": f"About {question}", "context": context}
+
+    monkeypatch.setattr(search_agent, "article_cache", NoCache())
+    monkeypatch.setattr(search_agent, "local_index", lambda: None)
+    monkeypatch.setattr(search_agent, "_download_articles", download_articles)
+    monkeypatch.setattr(search_agent, "process_wellness_query", answer)
+    return downloaded
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 16])
+def test_shared_pmids_are_fetched_once_per_batch(downloads, concurrency):
+    memo = search_agent.ArticleMemo()
+
+    async def run():
+        return [item async for item in search_agent.process_wellness_batch(list(QUESTION_PMIDS), concurrency, memo)]
+
+    items = asyncio.run(run())
+    assert sorted(downloads) == ["1", "2", "3", "4", "5", "6"]
+    assert memo.stats() == {"pmids_requested": 12, "unique_pmids": 6, "pmids_fetched": 6}
+    by_question = {item["question"]: [article["id"] for article in item["context"]] for item in items}
+    assert by_question == QUESTION_PMIDS
+
+
+def test_ndjson_lines_report_failures_and_dedup_summary(downloads):
+    async def run():
+        return [json.loads(line) async for line in main.ndjson_batch_lines(["sleep", "broken", "insomnia"], 2)]
+
+    lines = asyncio.run(run())
+    answered = {line["index"]: line for line in lines[:-1] if "answer" in line}
+    assert sorted(answered) == [0, 2]
+    assert [source["id"] for source in answered[2]["sources"]] == ["2", "3", "4"]
+    assert [line for line in lines[:-1] if "error" in line] == [{"index": 1, "question": "broken", "error": "pipeline failed"}]
+    summary = lines[-1]["summary"]
+    assert (summary["questions"], summary["succeeded"], summary["failed"]) == (3, 2, 1)
+    assert (summary["pmids_requested"], summary["unique_pmids"], summary["pmids_fetched"]) == (6, 4, 4)
@@ -0,0 +1,31 @@
+"""Tests for the cache tiers and the shared SQLite stores."""
+
+import os
+
+import config
+from cache import SharedFlight, SQLiteCache, build_tiered_cache
+
+
+def test_sqlite_cache_creates_its_file_on_first_use(tmp_path):
+    path = str(tmp_path / "state" / "cache.sqlite3")
+    cache = SQLiteCache(path, "answers", max_entries=10, ttl_seconds=60)
+    SharedFlight(path, "answers")
+    assert not os.path.exists(path)
+
+    cache.set_many({"a": {"answer": 1}})
+    assert os.path.exists(path)
+    assert cache.get_many(["a", "b"]) == {"a": {"answer": 1}}
+
+
+def test_relative_cache_path_resolves_against_backend_dir(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_CACHE_PATH", "data/test.sqlite3")
+    cache = build_tiered_cache("test", "TEST_CACHE", 10, 10, 60)
+    assert cache.disk.path == os.path.join(config.BACKEND_DIR, "data", "test.sqlite3")
+    assert not os.path.exists(cache.disk.path)
+    assert not os.path.exists(tmp_path / "data")
+
+
+def test_empty_cache_path_disables_disk_tier(monkeypatch):
+    monkeypatch.setenv("TEST_CACHE_PATH", "")
+    assert build_tiered_cache("test", "TEST_CACHE", 10, 10, 60).disk is None
@@ -0,0 +1,67 @@
+"""Tests for the token-budgeted research context."""
+
+from context_builder import build_context, estimate_tokens, format_article, split_sections
+
+FILLER = " ".join(
+    f"Participants in cohort {i} reported their usual diet, exercise and screen time in a questionnaire."
+    for i in range(12)
+)
+
+
+def article(pmid: str, content: str, title: str = "A study") -> dict:
+    return {"id": pmid, "title": title, "content": content, "authors": "Smith J", "journal": "J", "year": "2022"}
+
+
+def test_split_sections_inherits_labels():
+    units = split_sections("BACKGROUND: Sleep matters. It is common. RESULTS: Melatonin helped. 2 of 10 withdrew.")
+    assert units == [
+        ("BACKGROUND", "Sleep matters."),
+        ("BACKGROUND", "It is common."),
+        ("RESULTS", "Melatonin helped."),
+        ("RESULTS", "2 of 10 withdrew."),
+    ]
+    assert split_sections("No labels here. Second sentence.") == [("", "No labels here."), ("", "Second sentence.")]
+
+
+def test_context_within_budget_is_unchanged():
+    articles = [article("1", "Melatonin improved sleep onset."), article("2", "Magnesium had no effect on anxiety.")]
+    text, stats = build_context("melatonin sleep", articles, token_budget=10_000)
+    assert text == "\n\n".join(format_article(a) for a in articles)
+    assert stats["tokens_before"] == stats["tokens_after"] == estimate_tokens(text)
+    assert stats["sentences_before"] == stats["sentences_after"] == 2
+    assert stats["duplicates_dropped"] == 0
+
+
+def test_over_budget_keeps_relevant_sentences_and_every_article():
+    articles = [
+        article("1", f"BACKGROUND: {FILLER} RESULTS: Melatonin shortened sleep onset latency by 7 minutes."),
+        article("2", f"{FILLER} Magnesium supplementation did not change anxiety scores."),
+    ]
+    budget = 150
+    text, stats = build_context("does melatonin shorten sleep onset", articles, token_budget=budget)
+    assert stats["tokens_before"] > budget
+    assert stats["tokens_after"] == estimate_tokens(text) <= budget
+    assert stats["sentences_after"] < stats["sentences_before"]
+    # The best sentence keeps its section label, and each article stays citable
+    assert "RESULTS: Melatonin shortened sleep onset latency by 7 minutes." in text
+    assert "PMID: 1" in text and "PMID: 2" in text
+
+
+def test_near_duplicate_sentences_are_dropped_once():
+    shared = "Vitamin D supplementation improved sleep quality scores in adults with deficiency."
+    articles = [
+        article("1", f"{shared} The trial lasted eight weeks."),
+        article("2", f"{shared} Side effects were rare."),
+    ]
+    text, stats = build_context("vitamin D sleep quality", articles, token_budget=10_000)
+    assert stats["duplicates_dropped"] == 1
+    assert text.count(shared) == 1
+    # Ties go to the earlier article, which keeps the sentence
+    assert text.index(shared) < text.index("PMID: 2")
+    assert "The trial lasted eight weeks." in text and "Side effects were rare." in text
+
+
+def test_empty_articles():
+    text, stats = build_context("sleep", [], token_budget=100)
+    assert text == ""
+    assert stats["articles"] == 0
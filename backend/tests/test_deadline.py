@@ -0,0 +1,48 @@
+"""Tests for the per-request latency budget (node estimates and LLM timeouts)."""
+
+import asyncio
+import time
+
+import pytest
+
+import llm_clients
+from search_agent import NodeLatencyEstimator
+
+
+def test_estimate_starts_at_default():
+    estimator = NodeLatencyEstimator({"generate_research": 8.0})
+    assert estimator.estimate("generate_research") == 8.0
+    assert estimator.estimate("unknown") == 0.0
+
+
+def test_observations_move_estimate():
+    estimator = NodeLatencyEstimator({"retrieve": 3.0}, alpha=0.5)
+    estimator.observe("retrieve", 5.0)
+    assert estimator.estimate("retrieve") == pytest.approx(4.0)
+
+
+def test_estimate_capped_at_budget():
+    estimator = NodeLatencyEstimator({"generate_research": 8.0}, cap=15.0)
+    for _ in range(50):
+        estimator.observe("generate_research", 60.0)
+    assert estimator.estimate("generate_research") <= 15.0
+
+
+def test_stale_estimate_decays_to_default():
+    estimator = NodeLatencyEstimator({"generate_research": 8.0}, half_life=10.0)
+    estimator._estimates["generate_research"] = (20.0, time.monotonic() - 10.0)
+    assert estimator.estimate("generate_research") == pytest.approx(14.0, abs=0.01)
+    estimator._estimates["generate_research"] = (20.0, time.monotonic() - 1000.0)
+    assert estimator.estimate("generate_research") == pytest.approx(8.0, abs=0.01)
+
+
+class SlowModel:
+    async def ainvoke(self, messages):
+        await asyncio.sleep(5)
+
+
+def test_llm_call_times_out():
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm_clients.ainvoke_llm(SlowModel(), [], "test", timeout=0.05))
+    assert time.perf_counter() - start < 1.0
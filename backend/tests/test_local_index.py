@@ -0,0 +1,152 @@
+"""Tests for the local PubMed index: Boolean query parsing, writer and reader."""
+
+import random
+
+import numpy as np
+import pytest
+
+from local_index import IndexWriter, LocalPubMedIndex, parse_query
+
+
+def article(pmid: int, title: str, content: str = "") -> dict:
+    return {"id": str(pmid), "title": title, "content": content, "authors": "A", "journal": "J", "year": "2020"}
+
+
+A, B, C = ("terms", ["a"]), ("terms", ["b"]), ("terms", ["c"])
+
+
+@pytest.mark.parametrize("query, tree", [
+    ("", None),
+    ("   ", None),
+    ("[tiab]", None),
+    ("vitamin D", ("terms", ["vitamin", "D"])),
+    # Left to right without precedence, as PubMed evaluates
+    ("a OR b AND c", ("AND", ("OR", A, B), C)),
+    ("a AND b OR c", ("OR", ("AND", A, B), C)),
+    ("a NOT (b OR c)", ("NOT", A, ("OR", B, C))),
+    # Implicit AND around groups
+    ("(a OR b) c", ("AND", ("OR", A, B), C)),
+    ("a (b OR c)", ("AND", A, ("OR", B, C))),
+    # Quoted phrases stay one operand; field tags are dropped
+    ('"vitamin D"[tiab] AND sleep[mh]', ("AND", ("terms", ["vitamin D"]), ("terms", ["sleep"]))),
+    # A leading NOT excludes from every document
+    ("NOT a", ("NOT", ("terms", []), A)),
+])
+def test_parse_query(query, tree):
+    assert parse_query(query) == tree
+
+
+@pytest.mark.parametrize("query, tree", [
+    ("a AND", A),
+    ("AND a", A),
+    ("(a OR b", ("OR", A, B)),
+    ("a) b", ("AND", A, B)),
+    ("((a))", A),
+])
+def test_parse_query_tolerates_malformed_input(query, tree):
+    assert parse_query(query) == tree
+
+
+def build(tmp_path, operations, segment_docs=2) -> LocalPubMedIndex:
+    writer = IndexWriter(str(tmp_path / "index"), segment_docs=segment_docs)
+    for operation in operations:
+        if isinstance(operation, dict):
+            writer.add(operation)
+        else:
+            writer.delete(operation)
+    writer.close()
+    return LocalPubMedIndex(str(tmp_path / "index"))
+
+
+def test_revisions_and_deletions_across_segments(tmp_path):
+    index = build(tmp_path, [
+        article(30, "melatonin sleep"),
+        article(10, "vitamin sleep"),
+        article(20, "magnesium anxiety"),
+        article(10, "vitamin revised"),      # supersedes the first PMID 10
+        20,                                  # deletes PMID 20
+        article(40, "curcumin inflammation"),
+        40,
+        article(40, "curcumin restored"),    # added again after its deletion
+        99,                                  # unknown PMID: ignored
+    ])
+    assert index.meta["documents"] == 6
+    assert index.meta["articles"] == 3
+    assert index.meta["deleted"] == 3
+    assert list(index._pmids) == [10, 30, 40]
+
+    found = index.get_articles(["10", "20", "30", "40", "99"])
+    assert sorted(found) == ["10", "30", "40"]
+    assert found["10"]["title"] == "vitamin revised"
+    assert found["40"]["title"] == "curcumin restored"
+
+    assert index.search("sleep") == ["30"]
+    assert index.search("vitamin") == ["10"]
+    assert index.search("magnesium OR curcumin") == ["40"]
+    index.close()
+
+
+def test_segment_size_does_not_change_the_index(tmp_path):
+    rng = random.Random(7)
+    words = ["sleep", "vitamin", "anxiety", "curcumin", "melatonin", "zinc", "omega", "iron"]
+    operations = []
+    for _ in range(300):
+        pmid = rng.randrange(60)
+        if rng.random() < 0.2:
+            operations.append(pmid)
+        else:
+            operations.append(article(pmid, " ".join(rng.sample(words, 3))))
+
+    # Reference: the latest version of each PMID unless deleted afterwards
+    live = {}
+    for operation in operations:
+        if isinstance(operation, dict):
+            live[operation["id"]] = operation["title"]
+        else:
+            live.pop(str(operation), None)
+
+    for segment_docs in (1, 7, 1000):
+        index = build(tmp_path / str(segment_docs), operations, segment_docs)
+        assert index.meta["articles"] == len(live)
+        found = index.get_articles(str(pmid) for pmid in range(60))
+        assert {pmid: record["title"] for pmid, record in found.items()} == live
+        assert int(np.count_nonzero(index._deleted == 0)) == len(live)
+        for word in words:
+            expected = {pmid for pmid, title in live.items() if word in title.split()}
+            assert set(index.search(word, max_results=100)) == expected
+        index.close()
+
+
+def test_vocabulary_lookup(tmp_path):
+    index = build(tmp_path, [article(1, "zinc alpha", "alpha beta"), article(2, "beta gamma")])
+    terms = [index._terms[i] for i in range(len(index._terms))]
+    assert terms == sorted(terms)
+    for position, term in enumerate(terms):
+        assert index._terms.get(term) == position
+    assert index._terms.get("aaa") is None
+    assert index._terms.get("zzz") is None
+    assert index.postings("beta")[0].tolist() == [0, 1]
+    index.close()
+
+
+@pytest.mark.parametrize("operations", [[], [5], [article(1, "zinc"), 1]])
+def test_index_without_live_articles(tmp_path, operations):
+    index = build(tmp_path, operations)
+    assert index.meta["articles"] == 0
+    assert index.search("zinc") == []
+    assert index.get_articles(["1", "5"]) == {}
+    index.close()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sleep OR the", ["1", "2"]),
+    ("the OR sleep", ["1", "2"]),
+    ("sleep AND the", ["1", "2"]),
+    ("sleep NOT the", ["1", "2"]),
+    ("the NOT zinc", ["2", "3"]),
+    ("the OR of", []),
+])
+def test_stop_word_operands_drop_out(tmp_path, query, expected):
+    index = build(tmp_path, [article(1, "zinc sleep"), article(2, "melatonin sleep"), article(3, "magnesium anxiety")])
+    assert sorted(index.search(query, max_results=10)) == expected
+    index.close()
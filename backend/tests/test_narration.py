@@ -0,0 +1,110 @@
+"""Tests for article narration: segment planning and the per-segment cache."""
+
+import asyncio
+import threading
+
+import pytest
+
+import narration
+from narration import NarrationCache, NarrationPipeline, StubTTSEngine, TTSEngine, split_paragraphs
+
+PARAGRAPHS = [
+    "Vitamin D is made in the skin when it is exposed to sunlight, and it is also found in oily fish and eggs.",
+    "Several trials have looked at whether vitamin D supplements improve sleep quality in adults with low levels.",
+    "The results are mixed: some studies report shorter time to fall asleep, while others find no clear effect.",
+    "Talk to your doctor before taking high doses, since too much vitamin D can raise calcium levels in the blood.",
+]
+
+ARTICLE = {"title": "Vitamin D and Sleep", "excerpt": "What the research says.", "content": "\n\n".join(PARAGRAPHS)}
+
+
+def make_pipeline(tmp_path, script_mode: str = "text") -> NarrationPipeline:
+    return NarrationPipeline(
+        StubTTSEngine(), NarrationCache(str(tmp_path), 0), voice="en-US-Studio-O", voices=["en-US-Studio-O"],
+        script_mode=script_mode
+    )
+
+
+def narrate(pipeline: NarrationPipeline, article: dict) -> bytes:
+    async def collect() -> bytes:
+        return b"".join([chunk async for chunk in pipeline.stream(pipeline.plan(article), pipeline.voice)])
+
+    return asyncio.run(collect())
+
+
+def test_split_paragraphs_keeps_each_paragraph():
+    assert split_paragraphs(ARTICLE["content"]) == PARAGRAPHS
+
+
+def test_editing_one_paragraph_synthesizes_one_segment(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    segments = len(pipeline.plan(ARTICLE))
+    assert segments == len(PARAGRAPHS) + 2
+
+    first = narrate(pipeline, ARTICLE)
+    assert pipeline.engine.calls == segments
+    assert narrate(pipeline, ARTICLE) == first
+    assert pipeline.engine.calls == segments
+
+    edited = list(PARAGRAPHS)
+    edited[2] = edited[2] + " A 2024 review reached the same conclusion."
+    narrate(pipeline, {**ARTICLE, "content": "\n\n".join(edited)})
+    assert pipeline.engine.calls == segments + 1
+
+
+def test_fallback_script_audio_is_not_cached(tmp_path):
+    pipeline = make_pipeline(tmp_path, script_mode="llm")
+    attempts = []
+
+    async def failing_rewrite(segment):
+        attempts.append(segment["index"])
+        raise RuntimeError("LLM unavailable")
+
+    pipeline._write_script = failing_rewrite
+    segments = pipeline.plan(ARTICLE)
+    narrate(pipeline, ARTICLE)
+    assert pipeline.engine.calls == len(segments)
+    manifest = asyncio.run(pipeline.manifest(segments, pipeline.voice))
+    assert not any(entry["script_cached"] or entry["audio_cached"] for entry in manifest)
+
+    # The rewrite is retried on the next request and its audio is then cached
+    async def rewrite(segment):
+        return f"Rewritten: {segment['text']}"
+
+    pipeline._write_script = rewrite
+    narrate(pipeline, ARTICLE)
+    narrate(pipeline, ARTICLE)
+    assert pipeline.engine.calls == 2 * len(segments)
+    manifest = asyncio.run(pipeline.manifest(segments, pipeline.voice))
+    assert all(entry["script_cached"] and entry["audio_cached"] for entry in manifest)
+
+
+def test_engines_must_implement_synthesize():
+    class Silent(TTSEngine):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+def test_pipeline_is_built_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("NARRATION_TTS_ENGINE", "stub")
+    monkeypatch.setenv("NARRATION_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(narration, "_pipeline", None)
+    monkeypatch.setattr(narration, "_pipeline_error", None)
+    scanned_on = []
+    scan = NarrationCache._scan_bytes
+
+    def recording_scan(self):
+        scanned_on.append(threading.current_thread())
+        return scan(self)
+
+    monkeypatch.setattr(NarrationCache, "_scan_bytes", recording_scan)
+
+    async def open_twice():
+        return await narration.open_narration_pipeline(), await narration.open_narration_pipeline()
+
+    first, second = asyncio.run(open_twice())
+    assert first is second is not None
+    assert len(scanned_on) == 1
+    assert scanned_on[0] is not threading.main_thread()
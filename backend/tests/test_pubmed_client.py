@@ -0,0 +1,114 @@
+"""Tests for the NCBI token bucket, E-utilities retries and efetch micro-batching."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import pubmed_client
+from pubmed_client import MicroBatcher, TokenBucket, eutils_get
+
+
+def test_token_bucket_spaces_requests_at_the_rate():
+    async def run(bucket: TokenBucket) -> float:
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Default burst of 1: the first token is free, the next four wait 1/rate each
+    assert 0.035 <= asyncio.run(run(TokenBucket(100.0))) < 0.5
+    # A burst of 5 lets all five through at once
+    assert asyncio.run(run(TokenBucket(100.0, burst=5.0))) < 0.02
+
+
+def test_eutils_get_with_negative_retries_makes_one_attempt(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(429)
+
+    monkeypatch.setenv("EUTILS_MAX_RETRIES", "-1")
+    monkeypatch.setattr(pubmed_client, "get_rate_limiter", lambda: TokenBucket(1000.0))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://eutils") as client:
+            await eutils_get(client, "/esearch.fcgi", {}, timeout=1.0)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert calls == ["/esearch.fcgi"]
+
+
+def recording_batcher(window_seconds=0.01, max_batch_size=100):
+    calls = []
+
+    async def fetch(pmids):
+        calls.append(list(pmids))
+        await asyncio.sleep(0)
+        # Unknown PMIDs are missing from the response, like efetch
+        return [{"id": pmid} for pmid in pmids if pmid != "404"]
+
+    return MicroBatcher(fetch, window_seconds, max_batch_size), calls
+
+
+def test_concurrent_callers_share_one_fetch_and_get_their_own_articles():
+    batcher, calls = recording_batcher()
+
+    async def run():
+        return await asyncio.gather(
+            batcher.fetch(["1", "2"]),
+            batcher.fetch(["2", "3", "404"]),
+            batcher.fetch(["3"]),
+        )
+
+    results = asyncio.run(run())
+    assert calls == [["1", "2", "3", "404"]]
+    assert [[article["id"] for article in result] for result in results] == [["1", "2"], ["2", "3"], ["3"]]
+    assert batcher.stats() == {"requests": 3, "batches": 1}
+
+
+def test_full_batch_flushes_without_waiting_for_the_window():
+    batcher, calls = recording_batcher(window_seconds=60, max_batch_size=3)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(batcher.fetch(["1", "2"]), batcher.fetch(["3"])), 1.0)
+
+    asyncio.run(run())
+    assert calls == [["1", "2", "3"]]
+
+
+def test_fetch_errors_reach_every_caller():
+    async def fail(pmids):
+        raise RuntimeError("efetch down")
+
+    batcher = MicroBatcher(fail, 0.01, 100)
+
+    async def run():
+        return await asyncio.gather(batcher.fetch(["1"]), batcher.fetch(["2"]), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["efetch down", "efetch down"]
+
+
+def test_cancelled_batch_does_not_leave_callers_waiting():
+    async def hang(pmids):
+        await asyncio.sleep(60)
+
+    batcher = MicroBatcher(hang, 0, 100)
+
+    async def run():
+        callers = [asyncio.create_task(batcher.fetch([str(i)])) for i in range(2)]
+        await asyncio.sleep(0.01)
+        assert len(batcher._tasks) == 1
+        for task in list(batcher._tasks):
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1.0)
+        await asyncio.sleep(0)
+        return results, batcher._tasks
+
+    results, tasks = asyncio.run(run())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert not tasks
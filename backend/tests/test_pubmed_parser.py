@@ -0,0 +1,178 @@
+"""Tests that the streaming PubMed parser matches the reference DOM parser."""
+
+import asyncio
+import io
+import os
+import xml.etree.ElementTree as ET
+
+import httpx
+import pytest
+
+from pubmed_parser import (
+    PubMedFeedParser, iter_pubmed_articles, iter_pubmed_records, parse_pubmed_xml, parse_pubmed_xml_tree
+)
+
+SAMPLE_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "efetch_sample.xml")
+
+HEAD = '<?xml version="1.0" ?>\n<PubmedArticleSet>\n'
+TAIL = "</PubmedArticleSet>\n"
+
+# Records with missing or unusual parts, one per case
+PARTIAL_RECORDS = {
+    "complete": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">101</PMID><Article>
+          <Journal><JournalIssue><PubDate><Year>2021</Year></PubDate></JournalIssue><Title>Sleep</Title></Journal>
+          <ArticleTitle>Melatonin and sleep.</ArticleTitle>
+          <Abstract><AbstractText Label="BACKGROUND">Why.</AbstractText><AbstractText Label="RESULTS">What.</AbstractText></Abstract>
+          <AuthorList><Author><LastName>Smith</LastName><Initials>J</Initials></Author><Author><CollectiveName>Group</CollectiveName></Author></AuthorList>
+        </Article></MedlineCitation></PubmedArticle>""",
+    "no_abstract_or_authors": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">102</PMID><Article>
+          <Journal><Title>Nutrients</Title></Journal><ArticleTitle>Untitled work.</ArticleTitle>
+        </Article></MedlineCitation></PubmedArticle>""",
+    "medline_date_and_other_abstract": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">103</PMID><Article>
+          <Journal><JournalIssue><PubDate><MedlineDate>1998 Jan-Feb</MedlineDate></PubDate></JournalIssue></Journal>
+          <ArticleTitle>Old study.</ArticleTitle><Abstract><AbstractText/></Abstract>
+          <AuthorList><Author><LastName>A</LastName></Author><Author><LastName>B</LastName></Author>
+            <Author><LastName>C</LastName></Author><Author><LastName>D</LastName></Author></AuthorList>
+        </Article><OtherAbstract><AbstractText>Resumen.</AbstractText></OtherAbstract></MedlineCitation></PubmedArticle>""",
+    "empty_year": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">104</PMID><Article>
+          <Journal><JournalIssue><PubDate><Year/></PubDate></JournalIssue></Journal>
+        </Article></MedlineCitation></PubmedArticle>""",
+    "no_article": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">105</PMID></MedlineCitation></PubmedArticle>""",
+    "no_citation": """
+        <PubmedArticle><PubmedData><PublicationStatus>ppublish</PublicationStatus></PubmedData></PubmedArticle>""",
+    # Raises while building the author string, so both parsers skip the record
+    "unparseable_author": """
+        <PubmedArticle><MedlineCitation><PMID Version="1">106</PMID><Article>
+          <AuthorList><Author><LastName/><Initials>K</Initials></Author></AuthorList>
+        </Article></MedlineCitation></PubmedArticle>""",
+}
+
+
+def document(*records: str) -> str:
+    return HEAD + "".join(records) + TAIL
+
+
+def streamed(xml: str) -> list:
+    return list(iter_pubmed_articles(io.BytesIO(xml.encode("utf-8"))))
+
+
+def test_sample_fixture_matches_reference_parser():
+    with open(SAMPLE_FIXTURE, "rb") as f:
+        payload = f.read()
+    expected = parse_pubmed_xml_tree(payload.decode("utf-8"))
+    assert expected
+    assert parse_pubmed_xml(payload) == expected
+    assert parse_pubmed_xml(payload.decode("utf-8")) == expected
+
+
+@pytest.mark.parametrize("name", sorted(PARTIAL_RECORDS))
+def test_partial_record_matches_reference_parser(name):
+    xml = document(PARTIAL_RECORDS[name])
+    assert streamed(xml) == parse_pubmed_xml_tree(xml)
+
+
+def test_mixed_records_match_reference_parser_in_order():
+    xml = document(*PARTIAL_RECORDS.values())
+    expected = parse_pubmed_xml_tree(xml)
+    assert [article["id"] for article in expected] == ["101", "102", "103", "104", "105", "Unknown"]
+    assert streamed(xml) == expected
+
+
+def test_partial_record_defaults():
+    articles = {article["id"]: article for article in streamed(document(*PARTIAL_RECORDS.values()))}
+    assert articles["101"]["content"] == "BACKGROUND: Why. RESULTS: What."
+    assert articles["101"]["authors"] == "Smith J"
+    assert articles["102"]["content"] == "No abstract available."
+    assert articles["102"]["authors"] == "Unknown authors"
+    assert articles["103"]["year"] == "1998"
+    assert articles["103"]["content"] == " Resumen."
+    assert articles["103"]["authors"] == "A, B, C, et al."
+    assert articles["104"]["year"] == "Unknown"
+    assert articles["105"]["title"] == "No title available"
+    assert articles["105"]["journal"] == "Unknown journal"
+
+
+@pytest.mark.parametrize("xml", [
+    document(PARTIAL_RECORDS["complete"])[:-30],
+    document(PARTIAL_RECORDS["complete"]).replace("</ArticleTitle>", ""),
+    "",
+    "not xml",
+])
+def test_malformed_document_yields_nothing(xml):
+    assert parse_pubmed_xml_tree(xml) == []
+    assert parse_pubmed_xml(xml) == []
+    assert parse_pubmed_xml(xml.encode("utf-8")) == []
+
+
+def test_records_include_deletions_in_document_order():
+    xml = document(
+        PARTIAL_RECORDS["complete"],
+        "<DeleteCitation><PMID Version=\"1\">900</PMID><PMID Version=\"1\"> 901 </PMID></DeleteCitation>",
+        PARTIAL_RECORDS["no_abstract_or_authors"],
+    )
+    records = list(iter_pubmed_records(io.BytesIO(xml.encode("utf-8"))))
+    assert [(kind, record if kind == "delete" else record["id"]) for kind, record in records] == [
+        ("article", "101"), ("delete", "900"), ("delete", "901"), ("article", "102")
+    ]
+
+
+def fed(payload: bytes, chunk_size: int) -> list:
+    parser = PubMedFeedParser()
+    articles = []
+    for start in range(0, len(payload), chunk_size):
+        articles.extend(parser.feed(payload[start:start + chunk_size]))
+    return articles + parser.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 30])
+def test_feed_parser_matches_reference_parser_for_any_chunking(chunk_size):
+    with open(SAMPLE_FIXTURE, "rb") as f:
+        payload = f.read()
+    assert fed(payload, chunk_size) == parse_pubmed_xml_tree(payload.decode("utf-8"))
+    xml = document(*PARTIAL_RECORDS.values()).encode("utf-8")
+    assert fed(xml, chunk_size) == parse_pubmed_xml_tree(xml.decode("utf-8"))
+
+
+def test_feed_parser_returns_articles_as_they_complete():
+    parser = PubMedFeedParser()
+    assert parser.feed((HEAD + PARTIAL_RECORDS["complete"]).encode("utf-8")) == []
+    # An article is emitted once the next element ends
+    assert [a["id"] for a in parser.feed(PARTIAL_RECORDS["no_abstract_or_authors"].encode("utf-8"))] == ["101"]
+    assert [a["id"] for a in parser.feed(TAIL.encode("utf-8"))] == ["102"]
+    assert parser.close() == []
+
+
+def test_feed_parser_rejects_truncated_document():
+    parser = PubMedFeedParser()
+    parser.feed(document(PARTIAL_RECORDS["complete"])[:-30].encode("utf-8"))
+    with pytest.raises(ET.ParseError):
+        parser.close()
+
+
+def test_efetch_streams_the_response_into_the_parser():
+    import search_agent
+
+    with open(SAMPLE_FIXTURE, "rb") as f:
+        payload = f.read()
+    chunks_sent = []
+
+    async def body():
+        for start in range(0, len(payload), 1000):
+            chunks_sent.append(start)
+            yield payload[start:start + 1000]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    async def run(handler):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://eutils") as client:
+            return await search_agent._efetch_articles(["1", "2"], client)
+
+    assert asyncio.run(run(handler)) == parse_pubmed_xml_tree(payload.decode("utf-8"))
+    assert len(chunks_sent) == -(-len(payload) // 1000)
+    assert asyncio.run(run(lambda request: httpx.Response(200, content=b"<PubmedArticleSet><Pub"))) == []
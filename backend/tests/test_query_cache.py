@@ -0,0 +1,90 @@
+"""Tests for the query-enhancement memo: cache keys and entry lifetimes."""
+
+import asyncio
+
+import pytest
+
+import cache
+import search_agent
+from cache import LRUCache, build_tiered_cache
+from search_agent import normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What helps with sleep?", "what helps with SLEEP"),
+    ("Is turmeric good for inflammation?", "turmeric   inflammation"),
+    ("How much vitamin D do I need?", "how much VITAMIN D do i need!"),
+])
+def test_trivially_different_wordings_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Is coffee bad for your heart?", "Is coffee good for your heart?"),
+    ("vitamin D dosage", "vitamin C dosage"),
+])
+def test_different_questions_get_different_keys(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+def test_stop_word_only_question_keeps_its_words():
+    assert normalize_question("What is the best?") == "what is the best"
+
+
+def test_enhanced_query_is_memoized_by_normalized_question(monkeypatch):
+    calls = []
+
+    async def ainvoke_llm(llm, messages, node, timeout=None):
+        calls.append(messages[-1])
+        return type("Response", (), {"content": '"melatonin AND sleep"'})()
+
+    monkeypatch.setattr(search_agent, "get_llm", lambda: None)
+    monkeypatch.setattr(search_agent, "ainvoke_llm", ainvoke_llm)
+    monkeypatch.setenv("TEST_QUERY_CACHE_PATH", "")
+    monkeypatch.setattr(search_agent, "query_cache", build_tiered_cache("test_queries", "TEST_QUERY_CACHE", 10, 10, 60))
+
+    async def enhance(question):
+        return await search_agent.enhance_query_node(search_agent._initial_state(question, 0))
+
+    first = asyncio.run(enhance("Does melatonin help sleep?"))
+    second = asyncio.run(enhance("does melatonin help sleep"))
+    assert first["search_query"] == second["search_query"] == "melatonin AND sleep"
+    assert len(calls) == 1
+
+
+def test_memory_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    memory = LRUCache(max_entries=10, ttl_seconds=60)
+    memory.set("sleep", "sleep quality OR insomnia")
+    memory.set("short", "x", ttl_seconds=5)
+
+    clock.now += 59
+    assert memory.get("sleep") == "sleep quality OR insomnia"
+    assert memory.get("short") is None
+    clock.now += 2
+    assert memory.get("sleep") is None
+    assert len(memory) == 0  # expired entries are dropped on read
+
+
+def test_disk_entries_expire_after_ttl(monkeypatch, tmp_path):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    monkeypatch.setenv("TEST_QUERY_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    tiered = build_tiered_cache("test_queries", "TEST_QUERY_CACHE", 10, 10, 60)
+    tiered.set("sleep", "sleep quality OR insomnia")
+    tiered.memory.clear()
+
+    clock.now += 59
+    assert tiered.get("sleep") == "sleep quality OR insomnia"  # served from disk
+    tiered.memory.clear()
+    clock.now += 2
+    assert tiered.get("sleep") is None
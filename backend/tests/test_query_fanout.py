@@ -0,0 +1,58 @@
+"""Tests for multi-query fan-out: variant parsing and reciprocal-rank fusion."""
+
+import asyncio
+
+import pytest
+
+import search_agent
+from search_agent import parse_query_variants, reciprocal_rank_fusion
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("melatonin AND sleep\ninsomnia treatment\nsleep", ["melatonin AND sleep", "insomnia treatment", "sleep"]),
+    ("1. melatonin AND sleep\n2) insomnia\n- sleep\n* rest\n• naps", ["melatonin AND sleep", "insomnia", "sleep", "rest", "naps"]),
+    ('"curcumin AND inflammation"\n\'turmeric\'', ["curcumin AND inflammation", "turmeric"]),
+    ("sleep\n\n  \nsleep\n1. sleep", ["sleep"]),
+    ("", []),
+])
+def test_parse_query_variants(text, expected):
+    assert parse_query_variants(text, 5) == expected
+
+
+def test_parse_query_variants_keeps_the_first_ones():
+    assert parse_query_variants("a\nb\nc\nd", 2) == ["a", "b"]
+
+
+def test_fusion_rewards_agreement_between_lists():
+    fused = reciprocal_rank_fusion([["1", "2", "3"], ["3", "4", "1"], ["5", "3"]])
+    # 3 appears in every list, 1 in two lists at good ranks
+    assert fused[:2] == ["3", "1"]
+    assert sorted(fused) == ["1", "2", "3", "4", "5"]
+
+
+def test_fusion_scores_match_the_formula():
+    lists = [["a", "b"], ["b", "c"]]
+    k = 60
+    expected = {"a": 1 / (k + 1), "b": 1 / (k + 2) + 1 / (k + 1), "c": 1 / (k + 2)}
+    assert reciprocal_rank_fusion(lists, k) == sorted(expected, key=expected.get, reverse=True)
+
+
+def test_fusion_ties_keep_first_seen_order():
+    assert reciprocal_rank_fusion([["a", "b"], ["c", "d"]]) == ["a", "c", "b", "d"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_fan_out_deduplicates_queries_and_ignores_failures(monkeypatch):
+    searched = []
+    results = {"sleep": ["1", "2", "3"], "insomnia": ["2", "4"]}
+
+    async def search_pubmed(query, max_results=5):
+        searched.append(query)
+        if query == "broken":
+            raise RuntimeError("esearch failed")
+        return results[query]
+
+    monkeypatch.setattr(search_agent, "search_pubmed", search_pubmed)
+    fused = asyncio.run(search_agent.search_query_variants(["sleep", "insomnia", "sleep", "", "broken"], 3))
+    assert sorted(searched) == ["broken", "insomnia", "sleep"]
+    assert fused == ["2", "1", "4"]
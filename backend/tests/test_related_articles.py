@@ -0,0 +1,123 @@
+"""Tests for the precomputed related-articles table."""
+
+import copy
+import random
+
+import numpy as np
+import pytest
+
+import related_articles
+from related_articles import RelatedArticles
+
+WORDS = [
+    "sleep", "melatonin", "insomnia", "vitamin", "magnesium", "anxiety", "stress", "diet", "protein", "fiber",
+    "exercise", "running", "yoga", "strength", "heart", "blood", "pressure", "sugar", "omega", "gut",
+]
+
+
+def make_article(rng: random.Random, slug: str) -> dict:
+    title = " ".join(rng.sample(WORDS, 2))
+    content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+    return {"slug": slug, "title": title, "excerpt": "", "content": content, "category": rng.choice(["sleep", "food"])}
+
+
+def full_recompute(table: RelatedArticles) -> RelatedArticles:
+    """A copy of the table with every neighbour list recomputed from scratch (same vectors and IDF)."""
+    reference = copy.deepcopy(table)
+    reference._recompute(row for row, slug in enumerate(reference.slugs) if slug is not None)
+    reference._publish()
+    return reference
+
+
+def assert_same_neighbors(table: RelatedArticles, reference: RelatedArticles) -> None:
+    for slug in reference.rows:
+        expected, actual = reference.related(slug), table.related(slug)
+        assert [score for _, score in actual] == [score for _, score in expected], slug
+        # Neighbours tied with the last kept score may differ
+        cutoff = expected[-1][1] if expected else 0.0
+        assert {item for item in actual if item[1] > cutoff} == {item for item in expected if item[1] > cutoff}, slug
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_update_matches_full_recompute(seed):
+    rng = random.Random(seed)
+    articles = [make_article(rng, f"article-{i}") for i in range(60)]
+    table = RelatedArticles(top_n=5)
+    table.build(articles)
+
+    for step in range(5):
+        live = list(table.rows)
+        edited = [make_article(rng, slug) for slug in rng.sample(live, 3)]
+        added = [make_article(rng, f"new-{step}-{i}") for i in range(2)]
+        removed = rng.sample([slug for slug in live if slug not in {a["slug"] for a in edited}], 2)
+        result = table.update(edited + added, removed)
+        assert result["changed"] == 5
+        assert result["recomputed"] < len(table)
+        assert_same_neighbors(table, full_recompute(table))
+        for slug in removed:
+            assert table.related(slug) is None
+            assert all(slug not in {s for s, _ in table.related(other)} for other in table.rows)
+
+
+def test_freed_rows_are_reused():
+    rng = random.Random(4)
+    table = RelatedArticles(top_n=3)
+    table.build([make_article(rng, f"article-{i}") for i in range(10)])
+    row = table.rows["article-3"]
+    table.update([], ["article-3"])
+    table.update([make_article(rng, "replacement")])
+    assert table.rows["replacement"] == row
+    assert len(table.slugs) == 10
+
+
+def test_sparse_and_dense_similarities_agree(monkeypatch):
+    rng = random.Random(5)
+    table = RelatedArticles(top_n=4)
+    table.build([make_article(rng, f"article-{i}") for i in range(40)])
+    table.update([], ["article-7"])
+    rows = list(range(0, len(table.slugs), 3))
+    dense = table.similarities(rows)
+    monkeypatch.setattr(related_articles, "DENSE_MAX_CELLS", 0)
+    table._columns = None
+    sparse = table.similarities(rows)
+    np.testing.assert_allclose(sparse, dense, atol=1e-5)
+
+
+def test_sync_updates_only_changed_articles():
+    rng = random.Random(6)
+    articles = [make_article(rng, f"article-{i}") for i in range(30)]
+    table = RelatedArticles(top_n=4)
+    assert table.sync(articles)["rebuilt"]
+
+    assert table.sync(articles) == {"rebuilt": False, "changed": 0, "recomputed": 0, "merged": 0}
+    articles[5] = make_article(rng, "article-5")
+    result = table.sync(articles[:-1])
+    assert not result["rebuilt"]
+    assert result["changed"] == 1
+    assert table.related(articles[-1]["slug"]) is None
+
+
+def test_lookups_see_the_old_table_until_an_update_finishes(monkeypatch):
+    rng = random.Random(7)
+    articles = [make_article(rng, f"article-{i}") for i in range(30)]
+    table = RelatedArticles(top_n=4)
+    table.build(articles)
+    before = {slug: table.related(slug) for slug in table.rows}
+    seen_during = []
+    recompute = table._recompute
+
+    def recompute_and_look(rows):
+        recompute(rows)
+        # The table is fully changed here but not yet published
+        seen_during.append({slug: table.related(slug) for slug in before})
+
+    monkeypatch.setattr(table, "_recompute", recompute_and_look)
+    table.update([make_article(rng, "article-1"), make_article(rng, "added")], ["article-2"])
+    assert seen_during == [before]
+    assert table.related("article-2") is None
+    assert table.related("added") is not None
+
+    updated = {slug: table.related(slug) for slug in before}
+    table.build(articles[:10])
+    assert seen_during[-1] == updated
+    assert set(table._lookup[0]) == {f"article-{i}" for i in range(10)}
@@ -0,0 +1,66 @@
+"""Tests for the BM25 reranker."""
+
+import math
+
+import pytest
+
+from reranker import BM25_B, BM25_K1, bm25_scores, rerank_articles, tokenize
+
+
+def article(pmid: str, title: str, content: str = "") -> dict:
+    return {"id": pmid, "title": title, "content": content}
+
+
+def reference_bm25(query: str, documents: list) -> list:
+    """Textbook BM25, one document and term at a time."""
+    docs = [tokenize(document) for document in documents]
+    avg_length = sum(len(tokens) for tokens in docs) / len(docs) or 1.0
+    scores = []
+    for tokens in docs:
+        score = 0.0
+        for term in tokenize(query):
+            df = sum(1 for other in docs if term in other)
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = tokens.count(term)
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / avg_length))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_scores_match_reference():
+    documents = [
+        "Melatonin and sleep onset in older adults",
+        "Sleep sleep sleep: a review of sleep hygiene",
+        "Magnesium for anxiety",
+        "",
+        "Melatonin melatonin dosing",
+    ]
+    query = "melatonin sleep sleep"
+    assert bm25_scores(query, documents) == pytest.approx(reference_bm25(query, documents))
+
+
+def test_rerank_orders_by_relevance_and_truncates():
+    articles = [
+        article("1", "Magnesium and anxiety"),
+        article("2", "Melatonin for sleep", "Melatonin improved sleep onset in adults."),
+        article("3", "Exercise and mood"),
+        article("4", "Sleep hygiene", "Screens before bed delay sleep."),
+    ]
+    ranked = rerank_articles("melatonin sleep", articles, top_k=2)
+    assert [a["id"] for a in ranked] == ["2", "4"]
+
+
+def test_ties_keep_original_order():
+    articles = [article(str(i), "Unrelated title") for i in range(5)]
+    assert rerank_articles("melatonin", articles, top_k=3) == articles[:3]
+
+
+def test_stop_words_do_not_score():
+    articles = [article("1", "The effects of the diet"), article("2", "Diet")]
+    ranked = rerank_articles("the the the diet", articles, top_k=2, stop_words={"the", "of"})
+    assert [a["id"] for a in ranked] == ["2", "1"]
+
+
+@pytest.mark.parametrize("articles", [[], [article("1", "Only one")]])
+def test_small_inputs_are_returned_as_is(articles):
+    assert rerank_articles("anything", articles, top_k=5) == articles
@@ -0,0 +1,125 @@
+"""Tests for conversation sessions and follow-up handling."""
+
+import cache
+from cache import SQLiteCache
+from search_agent import retrieval_question
+from sessions import SessionStore
+
+
+def make_store(shared=None, max_sessions=10, ttl_seconds=60.0):
+    return SessionStore(
+        max_sessions=max_sessions,
+        ttl_seconds=ttl_seconds,
+        recent_turns=2,
+        max_articles=4,
+        summary_tokens=100,
+        turn_tokens=50,
+        shared=shared
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_idle_session_expires_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    store = make_store(ttl_seconds=60.0)
+    session = store.get_or_create("abc")
+    session.record("Question?", "Answer.", [])
+
+    clock.now += 59
+    assert store.get("abc") is session
+    clock.now += 61
+    assert store.get("abc") is None
+    fresh = store.get_or_create("abc")
+    assert fresh is not session and not fresh.has_history
+    assert store.created == 2
+
+
+def test_access_renews_the_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    store = make_store(ttl_seconds=60.0)
+    session = store.get_or_create("abc")
+    for _ in range(5):
+        clock.now += 45
+        assert store.get("abc") is session
+    assert store.get_or_create("abc") is session
+    assert store.created == 1
+
+
+def test_least_recently_used_session_is_evicted():
+    store = make_store(max_sessions=2)
+    first = store.get_or_create("first")
+    store.get_or_create("second")
+    assert store.get("first") is first  # now most recently used
+    store.get_or_create("third")
+    assert store.get("second") is None
+    assert store.get("first") is first
+    assert store.stats()["sessions"] == 2
+
+
+def test_disabled_store_keeps_no_sessions():
+    store = make_store(max_sessions=0)
+    assert not store.enabled
+    assert store.get_or_create("abc") is None
+
+
+def test_back_reference_follow_up_carries_previous_question():
+    state = {"question": "Is it safe for kids?", "follow_up_of": "Does vitamin D help sleep?"}
+    assert retrieval_question(state) == "Does vitamin D help sleep? Is it safe for kids?"
+
+
+def test_bare_follow_up_carries_previous_question():
+    state = {"question": "What dose?", "follow_up_of": "Does vitamin D help sleep?"}
+    assert retrieval_question(state).startswith("Does vitamin D help sleep?")
+
+
+def test_new_topic_is_searched_alone():
+    state = {"question": "Does magnesium reduce anxiety symptoms?", "follow_up_of": "Does vitamin D help sleep?"}
+    assert retrieval_question(state) == "Does magnesium reduce anxiety symptoms?"
+
+
+def test_question_outside_session_is_unchanged():
+    assert retrieval_question({"question": "Is it safe?"}) == "Is it safe?"
+
+
+def test_shared_store_hands_session_to_another_worker(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    worker_a = make_store(SQLiteCache(path, "sessions", 10, 60.0))
+    worker_b = make_store(SQLiteCache(path, "sessions", 10, 60.0))
+
+    session = worker_a.get_or_create("abc")
+    worker_a.refresh(session)
+    session.record("Does vitamin D help sleep?", "Some trials suggest it does.", [{"id": "1", "title": "Vitamin D"}])
+    worker_a.save(session)
+
+    other = worker_b.get_or_create("abc")
+    worker_b.refresh(other)
+    assert other.last_question == "Does vitamin D help sleep?"
+    assert [article["id"] for article in other.article_list()] == ["1"]
+
+    other.record("Is it safe for kids?", "Ask a pediatrician.", [])
+    worker_b.save(other)
+    worker_a.refresh(session)
+    assert session.last_question == "Is it safe for kids?"
+
+
+def test_delete_removes_shared_copy(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    worker_a = make_store(SQLiteCache(path, "sessions", 10, 60.0))
+    worker_b = make_store(SQLiteCache(path, "sessions", 10, 60.0))
+    session = worker_a.get_or_create("abc")
+    session.record("Question?", "Answer.", [])
+    worker_a.save(session)
+
+    worker_b.delete("abc")
+    local = worker_a.get_or_create("abc")
+    worker_a.refresh(local)
+    assert not local.has_history
@@ -0,0 +1,120 @@
+"""Tests for state shared by worker processes: NCBI budget, answer leases and metrics."""
+
+import asyncio
+
+import metrics
+import pubmed_client
+from cache import SharedFlight
+from metrics import SharedMetricsStore
+from pubmed_client import SharedTokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_workers_draw_from_one_token_bucket(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.sqlite3")
+    workers = [SharedTokenBucket(path, "ncbi", rate=10.0, workers=2) for _ in range(2)]
+    clock = FakeClock()
+    monkeypatch.setattr(pubmed_client, "time", clock)
+
+    # Six requests at the same instant, alternating workers: one every 0.1s host-wide
+    waits = [workers[i % 2]._reserve() for i in range(6)]
+    assert [round(wait, 3) for wait in waits] == [0.0, 0.1, 0.2, 0.3, 0.4, 0.5]
+
+    # After an idle spell the balance refills to the burst (1 token), not beyond
+    clock.now += 60
+    assert [round(workers[i % 2]._reserve(), 3) for i in range(3)] == [0.0, 0.1, 0.2]
+
+
+def test_unusable_shared_bucket_falls_back_to_this_workers_share(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / "state.sqlite3"), "ncbi", rate=10.0, workers=4)
+    assert bucket._fallback.rate == 2.5
+    (tmp_path / "state.sqlite3").write_bytes(b"not a database" * 100)
+    asyncio.run(asyncio.wait_for(bucket.acquire(), 1.0))
+
+
+def leases(path):
+    flights = [SharedFlight(path, "answers", lease_seconds=5, poll_seconds=0.01) for _ in range(2)]
+    flights[0].owner, flights[1].owner = "worker-1", "worker-2"
+    return flights
+
+
+def test_second_worker_waits_for_the_lease_holders_result(tmp_path):
+    first, second = leases(str(tmp_path / "state.sqlite3"))
+    results = {}
+    runs = []
+
+    async def work(worker):
+        runs.append(worker)
+        await asyncio.sleep(0.05)
+        results["q"] = f"answer from {worker}"
+        return results["q"]
+
+    async def run():
+        leader = asyncio.create_task(first.do("q", lambda: work("worker-1"), lambda: results.get("q")))
+        await asyncio.sleep(0.01)
+        follower = await second.do("q", lambda: work("worker-2"), lambda: results.get("q"))
+        return await leader, follower
+
+    assert asyncio.run(run()) == ("answer from worker-1", "answer from worker-1")
+    assert runs == ["worker-1"]
+    assert (first.stats(), second.stats()) == ({"executions": 1, "joined": 0}, {"executions": 0, "joined": 1})
+
+
+def test_lease_released_without_a_result_is_taken_over(tmp_path):
+    first, second = leases(str(tmp_path / "state.sqlite3"))
+
+    async def fail():
+        await asyncio.sleep(0.03)
+        raise RuntimeError("LLM unavailable")
+
+    async def work():
+        return "answer from worker-2"
+
+    async def run():
+        leader = asyncio.create_task(first.do("q", fail, lambda: None))
+        await asyncio.sleep(0.01)
+        follower = await second.do("q", work, lambda: None)
+        return await asyncio.gather(leader, return_exceptions=True), follower
+
+    (leader,), follower = asyncio.run(run())
+    assert str(leader) == "LLM unavailable"
+    assert follower == "answer from worker-2"
+    assert second.stats()["executions"] == 1
+
+
+def snapshot(requests: float, in_flight: float) -> list:
+    return [
+        ("wellness_requests", "counter", "Requests", [("wellness_requests_total", {"endpoint": "/chat"}, requests)]),
+        ("wellness_in_flight", "gauge", "In flight", [("wellness_in_flight", {}, in_flight)]),
+    ]
+
+
+def test_metrics_merge_sums_counters_and_labels_gauges_per_worker(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(metrics, "time", clock)
+    path = str(tmp_path / "state.sqlite3")
+    stores = [SharedMetricsStore(path, stale_seconds=30) for _ in range(2)]
+    stores[0].worker, stores[1].worker = "101", "102"
+    stores[0].publish(snapshot(3, 1))
+    stores[1].publish(snapshot(4, 2))
+
+    merged = {family: samples for family, _, _, samples in stores[0].merged()}
+    assert merged["wellness_requests"] == [("wellness_requests_total", {"endpoint": "/chat"}, 7.0)]
+    assert sorted(merged["wellness_in_flight"], key=lambda s: s[1]["worker"]) == [
+        ("wellness_in_flight", {"worker": "101"}, 1.0), ("wellness_in_flight", {"worker": "102"}, 2.0)
+    ]
+
+    # Worker 102 stops publishing: its counts still add up, its gauges drop out
+    clock.now += 31
+    stores[0].publish(snapshot(5, 0))
+    merged = {family: samples for family, _, _, samples in stores[1].merged()}
+    assert merged["wellness_requests"] == [("wellness_requests_total", {"endpoint": "/chat"}, 9.0)]
+    assert merged["wellness_in_flight"] == [("wellness_in_flight", {"worker": "101"}, 0.0)]
+    assert metrics.render_families(stores[0].merged()).count("wellness_in_flight{") == 1
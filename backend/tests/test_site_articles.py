@@ -0,0 +1,197 @@
+"""Tests for the site-article index: BM25 search, incremental refresh and sources."""
+
+import json
+import math
+import random
+
+import httpx
+
+import site_articles
+from config import INDEX_STOP_WORDS
+from reranker import BM25_B, BM25_K1, tokenize
+from site_articles import DumpSource, SiteArticleIndex, SupabaseSource, article_terms, parse_sql_dump
+
+WORDS = ["sleep", "vitamin", "anxiety", "curcumin", "melatonin", "zinc", "omega", "iron", "stress", "gut"]
+
+
+def row(slug: str, title: str, content: str = "", **fields) -> dict:
+    return {"slug": slug, "title": title, "excerpt": "", "category": "wellness", "content": content, **fields}
+
+
+def reference_ranking(rows: list, query: str, limit: int, category=None) -> list:
+    """Scores every row in plain Python, as the index did before it used arrays."""
+    terms = {r["slug"]: article_terms(r) for r in rows}
+    lengths = {slug: sum(t.values()) for slug, t in terms.items()}
+    avg_len = sum(lengths.values()) / len(rows)
+    scores = {}
+    for word in dict.fromkeys(tokenize(query, INDEX_STOP_WORDS)):
+        having = [slug for slug in terms if word in terms[slug]]
+        idf = math.log(1 + (len(rows) - len(having) + 0.5) / (len(having) + 0.5))
+        for slug in having:
+            tf = terms[slug][word]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[slug] / avg_len)
+            scores[slug] = scores.get(slug, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    published = {r["slug"]: r.get("published_at") or "" for r in rows}
+    categories = {r["slug"]: r.get("category") for r in rows}
+    candidates = [slug for slug in scores if category is None or categories[slug] == category]
+    candidates.sort(key=lambda slug: published[slug], reverse=True)
+    return sorted(candidates, key=lambda slug: -scores[slug])[:limit]
+
+
+def test_ranking_matches_plain_bm25():
+    rng = random.Random(3)
+    rows = [
+        row(
+            f"a{i}", " ".join(rng.sample(WORDS, 2)), " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 30))),
+            category=rng.choice(["sleep", "diet"]), published_at=f"2024-01-{rng.randrange(1, 29):02d}"
+        )
+        for i in range(80)
+    ]
+    index = SiteArticleIndex()
+    for r in rows:
+        assert index.upsert(r)
+    for query in ["sleep", "vitamin zinc", "the iron and stress", "gut omega melatonin anxiety"]:
+        for limit in (1, 5, 200):
+            for category in (None, "diet"):
+                found = index.search(query, limit=limit, category=category, prefix=False)
+                assert [hit["slug"] for hit in found] == reference_ranking(rows, query, limit, category)
+
+
+def test_ties_prefer_the_newest_article():
+    index = SiteArticleIndex()
+    for slug, published in [("old", "2023-05-01"), ("new", "2024-05-01"), ("mid", "2023-12-01")]:
+        index.upsert(row(slug, "Zinc basics", published_at=published))
+    assert [hit["slug"] for hit in index.search("zinc", limit=2)] == ["new", "mid"]
+
+
+def test_prefix_search_and_coverage():
+    index = SiteArticleIndex("https://example.com/")
+    index.upsert(row("mel", "Melatonin and sleep", "Melatonin helps some people fall asleep."))
+    index.upsert(row("mag", "Magnesium and sleep", "Magnesium is found in nuts."))
+    assert [hit["slug"] for hit in index.search("sleep mela")] == ["mel", "mag"]
+    assert index.search("sleep mela", prefix=False)[0]["coverage"] == 0.5
+    hit = index.search("melatonin")[0]
+    assert hit["url"] == "https://example.com/blog/mel"
+    assert hit["coverage"] == 1.0
+    assert hit["snippet"] == "Melatonin helps some people fall asleep."
+    assert index.search("the and") == []
+
+
+def test_updates_and_deletes_are_searchable_at_once():
+    index = SiteArticleIndex()
+    index.upsert(row("a", "Zinc and immunity", updated_at="1"))
+    index.upsert(row("b", "Iron and energy", updated_at="1"))
+    assert [hit["slug"] for hit in index.search("zinc")] == ["a"]
+
+    assert not index.upsert(row("a", "Zinc and immunity", updated_at="1"))
+    assert index.upsert(row("a", "Curcumin and joints", updated_at="2"))
+    assert index.search("zinc") == []
+    assert [hit["slug"] for hit in index.search("curcumin")] == ["a"]
+
+    assert index.delete("b")
+    assert not index.delete("b")
+    assert index.search("iron") == []
+    assert index.upsert(row("c", "Iron for runners"))
+    assert [hit["slug"] for hit in index.search("iron")] == ["c"]
+    assert len(index) == 2
+
+
+SQL_DUMP = """
+INSERT INTO public.articles (slug, title, content, category, is_featured, published_at) VALUES
+  ('zinc', 'Zinc and colds', 'It''s mixed; see (2021).', 'Immunity', true, NOW()),
+  ('iron', 'Iron', NULL, 'Energy', false, '2024-02-01'::timestamptz)
+ON CONFLICT (slug) DO NOTHING;
+
+COPY public.articles (slug, title, content, is_hero) FROM stdin;
+gut\tGut health\tLine one\\nLine\\ttwo\tt
+empty\tEmpty\t\\N\tf
+\\.
+"""
+
+
+def test_parse_sql_dump_reads_inserts_and_copy_blocks():
+    rows = {r["slug"]: r for r in parse_sql_dump(SQL_DUMP)}
+    assert sorted(rows) == ["empty", "gut", "iron", "zinc"]
+    assert rows["zinc"]["content"] == "It's mixed; see (2021)."
+    assert rows["zinc"]["is_featured"] is True
+    assert rows["zinc"]["published_at"] is None
+    assert rows["iron"]["content"] is None
+    assert rows["iron"]["published_at"] == "2024-02-01"
+    assert rows["gut"]["content"] == "Line one\nLine\ttwo"
+    assert rows["gut"]["is_hero"] is True
+    assert rows["empty"]["content"] is None
+    assert rows["empty"]["is_hero"] is False
+
+
+def test_refresh_from_a_dump_applies_edits_and_deletions(tmp_path):
+    path = tmp_path / "articles.json"
+    path.write_text(json.dumps([row("a", "Zinc", updated_at="1"), row("b", "Iron", updated_at="1")]))
+    source = DumpSource(str(path))
+    index = SiteArticleIndex()
+    assert index.refresh(source)["changed"] == ["a", "b"]
+    assert index.refresh(source)["updated"] == 0
+
+    path.write_text(json.dumps({"articles": [row("a", "Zinc", updated_at="2"), row("c", "Gut", updated_at="1")]}))
+    source._mtime = None
+    changes = index.refresh(source)
+    assert changes["changed"] == ["a", "c"]
+    assert changes["removed"] == ["b"]
+    assert sorted(r["slug"] for r in index.rows()) == ["a", "c"]
+
+
+class FakeSupabase:
+    """The articles table behind a PostgREST-like mock transport, recording what is asked."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        self.requests.append("count" if request.headers.get("prefer") == "count=exact" else params["select"])
+        rows = sorted(self.rows, key=lambda r: r["updated_at"])
+        if "updated_at" in params:
+            rows = [r for r in rows if r["updated_at"] > params["updated_at"][3:]]
+        offset, limit = int(params.get("offset", 0)), int(params["limit"])
+        page = rows[offset:offset + limit]
+        if params["select"] == "slug":
+            page = [{"slug": r["slug"]} for r in page]
+        return httpx.Response(200, json=page, headers={"content-range": f"0-{len(page) - 1}/{len(self.rows)}"})
+
+
+def test_supabase_source_lists_slugs_only_after_a_deletion(monkeypatch):
+    table = FakeSupabase([row(f"a{i}", f"Article {i}", updated_at=f"2024-01-0{i}") for i in range(1, 6)])
+    client = httpx.Client
+
+    def mock_client(**kwargs):
+        return client(transport=httpx.MockTransport(table.handler), **kwargs)
+
+    monkeypatch.setattr(site_articles.httpx, "Client", mock_client)
+    source = SupabaseSource("https://db.example.com", "key", page_size=2)
+    index = SiteArticleIndex()
+
+    assert index.refresh(source)["updated"] == 5
+    assert table.requests == ["*", "*", "*", "count"]
+
+    table.requests.clear()
+    table.rows.append(row("a6", "Article 6", updated_at="2024-01-06"))
+    assert index.refresh(source)["changed"] == ["a6"]
+    assert table.requests == ["*", "count"]
+
+    table.requests.clear()
+    table.rows = [r for r in table.rows if r["slug"] != "a2"]
+    changes = index.refresh(source)
+    assert changes["removed"] == ["a2"]
+    assert table.requests == ["*", "count", "slug", "slug", "slug"]
+    assert len(index) == 5
+
+    table.requests.clear()
+    assert index.refresh(source)["deleted"] == 0
+    assert table.requests == ["*", "count"]
+
+
+def test_zero_limit_returns_nothing():
+    index = SiteArticleIndex()
+    index.upsert(row("a", "Zinc"))
+    index.upsert(row("b", "Zinc again"))
+    assert index.search("zinc", limit=0) == []
@@ -0,0 +1,38 @@
+"""Tests for the application lifespan: background startup tasks and shutdown order."""
+
+import asyncio
+
+import main
+
+
+def test_shutdown_waits_for_background_tasks_before_closing_clients(monkeypatch):
+    events = []
+
+    async def warm_up_pipeline():
+        events.append("warming")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)  # e.g. a worker thread finishing its step
+            events.append("warm-up stopped")
+            raise
+
+    async def close_narration_pipeline():
+        events.append("narration closed")
+
+    async def close_eutils_client():
+        events.append("eutils closed")
+
+    monkeypatch.setattr(main, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(main, "shared_metrics", None)
+    monkeypatch.setattr(main, "site_source", None)
+    monkeypatch.setattr(main, "warm_up_pipeline", warm_up_pipeline)
+    monkeypatch.setattr(main, "close_narration_pipeline", close_narration_pipeline)
+    monkeypatch.setattr(main, "close_eutils_client", close_eutils_client)
+
+    async def run():
+        async with main.lifespan(main.app):
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert events == ["warming", "warm-up stopped", "narration closed", "eutils closed"]
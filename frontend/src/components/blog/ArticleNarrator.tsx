@@ -3,353 +3,76 @@ import { motion, AnimatePresence } from "framer-motion";
 import { Volume2, VolumeX, Pause, Play, Loader2, RotateCcw } from "lucide-react";
 
 interface ArticleNarratorProps {
-  title: string;
-  content: string;
+  slug: string;
 }
 
-export function ArticleNarrator({ title, content }: ArticleNarratorProps) {
+const API_BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
+
+export function ArticleNarrator({ slug }: ArticleNarratorProps) {
   const [isPlaying, setIsPlaying] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
   const [hasError, setHasError] = useState(false);
   const [isMuted, setIsMuted] = useState(false);
-  const [currentChunk, setCurrentChunk] = useState(0);
-  const [totalChunks, setTotalChunks] = useState(0);
-  const [isEnhancing, setIsEnhancing] = useState(false);
   const audioRef = useRef<HTMLAudioElement | null>(null);
-  const audioUrlRef = useRef<string | null>(null);
-  const audioQueueRef = useRef<string[]>([]);
-  const isGeneratingRef = useRef(false);
-  const enhancedContentRef = useRef<string | null>(null);
-
-  // Get API key from environment
-  const apiKey = import.meta.env.VITE_GOOGLE_API_KEY;
-
-  // Enhance article content with AI narration
-  const enhanceContentWithAI = async (title: string, content: string): Promise<string> => {
-    try {
-      const cleanedContent = cleanMarkdown(content);
-
-      const prompt = `You are a calm, soothing wellness narrator with a warm feminine voice. Transform this article into a natural, engaging audio narration.
-
-Article Title: ${title}
-
-Article Content:
-${cleanedContent}
 
-Please create a natural audio narration that:
-1. Starts with a warm, welcoming introduction that mentions the topic naturally (e.g., "Hello, I'm here to share some insights about [topic]" or "Welcome, today we're exploring [topic]")
-2. Do NOT repeat the exact title word-for-word at the start - weave it naturally into your greeting
-3. Summarizes key points naturally and conversationally
-4. Adds smooth transitions between sections (e.g., "Now let's explore...", "Another important aspect is...")
-5. Makes the content feel personal and approachable
-6. Ends with a gentle, encouraging conclusion
-7. Keep it concise but meaningful - aim for a pleasant listening experience
-
-Write only the narration script - no stage directions, no [brackets], just natural speech. Use a calm, nurturing tone throughout.`;
-
-      const response = await fetch(
-        `https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=${apiKey}`,
-        {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            contents: [{
-              parts: [{
-                text: prompt
-              }]
-            }],
-            generationConfig: {
-              temperature: 0.7,
-              maxOutputTokens: 2000,
-            }
-          })
-        }
-      );
-
-      if (!response.ok) {
-        console.error('ArticleNarrator: AI enhancement failed, using original content');
-        return `${title}. ${cleanedContent}`;
-      }
-
-      const data = await response.json();
-      const enhancedText = data.candidates?.[0]?.content?.parts?.[0]?.text;
-
-      if (enhancedText) {
-        return enhancedText;
-      }
+  // The backend writes the narration script, synthesizes it paragraph by
+  // paragraph and caches every chunk, so the audio streams from one URL and
+  // playback starts as soon as the first paragraph is ready.
+  const narrationUrl = `${API_BASE_URL}/articles/${encodeURIComponent(slug)}/narration`;
 
-      return `${title}. ${cleanedContent}`;
-    } catch (error) {
-      console.error('ArticleNarrator: AI enhancement error:', error);
-      return `${title}. ${cleanMarkdown(content)}`;
-    }
-  };
+  // Create the audio element and start streaming the narration
+  const startNarration = async () => {
+    setIsLoading(true);
+    setHasError(false);
 
-  // Clean markdown to plain text for narration
-  const cleanMarkdown = (text: string): string => {
-    return text
-      // Remove markdown headers
-      .replace(/#{1,6}\s+/g, '')
-      // Remove bold/italic (Studio voices have natural emphasis in prosody)
-      .replace(/(\*\*|__)(.*?)\1/g, '$2')
-      .replace(/(\*|_)(.*?)\1/g, '$2')
-      // Remove links but keep text
-      .replace(/\[([^\]]+)\]\([^)]+\)/g, '$1')
-      // Remove images
-      .replace(/!\[([^\]]*)\]\([^)]+\)/g, '')
-      // Remove code blocks
-      .replace(/```[\s\S]*?```/g, '')
-      .replace(/`([^`]+)`/g, '$1')
-      // Remove horizontal rules
-      .replace(/---+/g, '')
-      // Remove bullet points
-      .replace(/^\s*[-*+]\s+/gm, '')
-      // Remove numbered lists
-      .replace(/^\s*\d+\.\s+/gm, '')
-      // Clean up extra whitespace
-      .replace(/\n\n+/g, '\n\n')
-      .trim();
-  };
+    const audio = new Audio(narrationUrl);
+    audio.preload = "auto";
+    audio.volume = isMuted ? 0 : 1;
 
-  // Convert text to SSML for natural pauses
-  // Note: Studio voices only support <speak>, <break>, and <prosody rate>
-  // They have built-in natural emphasis and pitch variations
-  const enhanceWithSSML = (text: string): string => {
-    // Escape XML special characters to prevent SSML parsing errors
-    const escapeXML = (str: string) => {
-      return str
-        .replace(/&/g, '&amp;')
-        .replace(/</g, '&lt;')
-        .replace(/>/g, '&gt;');
+    audio.onplaying = () => {
+      setIsPlaying(true);
+      setIsLoading(false);
     };
 
-    const escapedText = escapeXML(text);
-
-    return `<speak>
-      <prosody rate="medium">
-        ${escapedText
-          // Paragraph breaks (700ms pause) - process first to avoid conflicts
-          .replace(/\n\n/g, '<break time="700ms"/>')
-          // Sentence-ending punctuation followed by space (natural sentence breaks)
-          .replace(/\.\s+/g, '. <break time="400ms"/>')
-          .replace(/\?\s+/g, '? <break time="400ms"/>')
-          .replace(/!\s+/g, '! <break time="400ms"/>')
-          // Comma pauses (short breath)
-          .replace(/,\s+/g, ', <break time="200ms"/>')
-          // Colon/semicolon pauses (medium pause)
-          .replace(/:\s+/g, ': <break time="300ms"/>')
-          .replace(/;\s+/g, '; <break time="300ms"/>')
-        }
-      </prosody>
-    </speak>`;
-  };
-
-  // Stop and reset audio
-  const stopAudio = () => {
-    if (audioRef.current) {
-      audioRef.current.pause();
-      audioRef.current.currentTime = 0;
-    }
-
-    // Clean up chunk queue
-    audioQueueRef.current.forEach(url => URL.revokeObjectURL(url));
-    audioQueueRef.current = [];
-
-    setIsPlaying(false);
-    setCurrentChunk(0);
-    setTotalChunks(0);
-    setIsEnhancing(false);
-    isGeneratingRef.current = false;
-    // Keep enhanced content cached for faster replay
-  };
-
-  // Split text into optimal chunks (500-800 chars per chunk for faster streaming)
-  const splitIntoChunks = (text: string, chunkSize: number = 800): string[] => {
-    const chunks: string[] = [];
-    // Split by paragraphs first (semantic boundaries)
-    const paragraphs = text.split(/\n\n+/);
-
-    let currentChunk = '';
-
-    for (const paragraph of paragraphs) {
-      // If adding this paragraph exceeds chunk size and we have content, push current chunk
-      if ((currentChunk + paragraph).length > chunkSize && currentChunk.length > 0) {
-        chunks.push(currentChunk.trim());
-        currentChunk = paragraph;
-      } else {
-        currentChunk += (currentChunk ? '\n\n' : '') + paragraph;
-      }
-    }
-
-    if (currentChunk.trim()) {
-      chunks.push(currentChunk.trim());
-    }
-
-    return chunks.length > 0 ? chunks : [text];
-  };
-
-  // Generate audio for a single chunk with SSML support
-  const generateChunkAudio = async (text: string): Promise<string> => {
-    // Convert text to SSML for natural speech
-    const ssmlText = enhanceWithSSML(text);
-
-    const response = await fetch(
-      `https://texttospeech.googleapis.com/v1/text:synthesize?key=${apiKey}`,
-      {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          input: { ssml: ssmlText }, // Use SSML instead of plain text
-          voice: {
-            languageCode: 'en-US',
-            name: 'en-US-Studio-O' // Studio-O: Natural, warm voice
-            // Note: Don't specify ssmlGender for Studio voices - use the voice's natural gender
-          },
-          audioConfig: {
-            audioEncoding: 'MP3',
-            speakingRate: 0.92, // Slightly slower for calm, soothing delivery
-            volumeGainDb: 2.0, // Slightly louder for clarity
-            effectsProfileId: ['large-home-entertainment-class-device'] // Richer audio
-          }
-        })
-      }
-    );
-
-    if (!response.ok) {
-      const errorData = await response.json();
-      console.error('ArticleNarrator: TTS API error:', errorData);
-      throw new Error(errorData.error?.message || 'Failed to generate speech');
-    }
-
-    const data = await response.json();
-
-    // Convert base64 audio to blob URL
-    const audioData = atob(data.audioContent);
-    const audioArray = new Uint8Array(audioData.length);
-    for (let i = 0; i < audioData.length; i++) {
-      audioArray[i] = audioData.charCodeAt(i);
-    }
-    const audioBlob = new Blob([audioArray], { type: 'audio/mp3' });
-    return URL.createObjectURL(audioBlob);
-  };
-
-  // Play next chunk in queue
-  const playNextChunk = async () => {
-    if (audioQueueRef.current.length === 0) {
-      setIsPlaying(false);
-      setCurrentChunk(0);
-      return;
-    }
-
-    const audioUrl = audioQueueRef.current.shift()!;
-    
-    // Clean up old audio URL
-    if (audioUrlRef.current) {
-      URL.revokeObjectURL(audioUrlRef.current);
-    }
-    audioUrlRef.current = audioUrl;
+    audio.onwaiting = () => {
+      setIsLoading(true);
+    };
 
-    // Create and configure audio element
-    const audio = new Audio(audioUrl);
-    audio.volume = isMuted ? 0 : 1;
-    
     audio.onended = () => {
-      setCurrentChunk(prev => prev + 1);
-      playNextChunk();
+      setIsPlaying(false);
+      setIsLoading(false);
     };
 
     audio.onerror = (e) => {
       console.error("ArticleNarrator: Audio playback error:", e);
       setHasError(true);
+      setIsLoading(false);
       setIsPlaying(false);
     };
 
     audioRef.current = audio;
-    
+
     try {
       await audio.play();
-      setIsPlaying(true);
-      setIsLoading(false);
     } catch (err) {
-      console.error('ArticleNarrator: Playback error:', err);
+      console.error("ArticleNarrator: Playback error:", err);
       setHasError(true);
       setIsLoading(false);
     }
   };
 
-  // Generate speech with streaming approach and AI enhancement
-  const generateSpeech = async () => {
-    if (!apiKey) {
-      console.error("ArticleNarrator: Google API key not configured");
-      setHasError(true);
-      return;
-    }
-
-    if (isGeneratingRef.current) {
-      return;
-    }
-
-    isGeneratingRef.current = true;
-    setIsLoading(true);
-    setIsEnhancing(true);
-    setHasError(false);
-    setCurrentChunk(0);
-
-    try {
-      // Check if we already have enhanced content cached
-      let fullText = enhancedContentRef.current;
-
-      if (!fullText) {
-        // Enhance content with AI for natural narration
-        fullText = await enhanceContentWithAI(title, content);
-        enhancedContentRef.current = fullText;
-      }
-
-      setIsEnhancing(false);
-
-      const chunks = splitIntoChunks(fullText);
-
-      setTotalChunks(chunks.length);
-      audioQueueRef.current = [];
-
-      // Stream generation: generate and queue chunks progressively
-      const generateAndQueue = async () => {
-        for (let i = 0; i < chunks.length; i++) {
-          try {
-            const chunkUrl = await generateChunkAudio(chunks[i]);
-            audioQueueRef.current.push(chunkUrl);
-
-            // Start playing as soon as first chunk is ready
-            if (i === 0) {
-              playNextChunk();
-            }
-          } catch (err) {
-            console.error(`ArticleNarrator: Error generating chunk ${i}:`, err);
-            // Continue with remaining chunks even if one fails
-          }
-        }
-        isGeneratingRef.current = false;
-      };
-
-      // Start streaming generation (non-blocking)
-      generateAndQueue();
-
-    } catch (err) {
-      console.error('ArticleNarrator: Failed to generate speech:', err);
-      setHasError(true);
-      setIsLoading(false);
-      setIsEnhancing(false);
-      setIsPlaying(false);
-      isGeneratingRef.current = false;
+  // Stop and release the current stream
+  const stopAudio = () => {
+    if (audioRef.current) {
+      audioRef.current.pause();
+      audioRef.current.removeAttribute("src");
+      audioRef.current.load();
+      audioRef.current = null;
     }
+    setIsPlaying(false);
+    setIsLoading(false);
   };
 
-
-
   // Handle play/pause/restart
   const togglePlayback = async () => {
     try {
@@ -362,11 +85,11 @@ Write only the narration script - no stage directions, no [brackets], just natur
         await audioRef.current.play();
         setIsPlaying(true);
       } else {
-        // Generate new audio (first time or after audio ended)
-        await generateSpeech();
+        // Start the stream (first time or after audio ended)
+        await startNarration();
       }
     } catch (error) {
-      console.error('ArticleNarrator: Playback error:', error);
+      console.error("ArticleNarrator: Playback error:", error);
       setHasError(true);
       setIsPlaying(false);
     }
@@ -374,8 +97,12 @@ Write only the narration script - no stage directions, no [brackets], just natur
 
   // Handle restart
   const handleRestart = async () => {
-    stopAudio();
-    await generateSpeech();
+    if (audioRef.current) {
+      audioRef.current.currentTime = 0;
+      await audioRef.current.play();
+      return;
+    }
+    await startNarration();
   };
 
   // Handle mute/unmute
@@ -386,28 +113,16 @@ Write only the narration script - no stage directions, no [brackets], just natur
     setIsMuted(!isMuted);
   };
 
-  // Cleanup on unmount and clear cache when content/title changes
+  // Stop streaming on unmount or when the article changes
   useEffect(() => {
-    // Clear cached enhanced content when article changes
-    enhancedContentRef.current = null;
-
     return () => {
-      if (audioRef.current) {
-        audioRef.current.pause();
-        audioRef.current = null;
-      }
-      if (audioUrlRef.current) {
-        URL.revokeObjectURL(audioUrlRef.current);
-        audioUrlRef.current = null;
-      }
-      // Clean up chunk queue
-      audioQueueRef.current.forEach(url => URL.revokeObjectURL(url));
-      audioQueueRef.current = [];
+      stopAudio();
     };
-  }, [title, content]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [slug]);
 
-  // Don't show if no API key or if there's an error
-  if (!apiKey || hasError) {
+  // Don't show if the backend cannot narrate this article
+  if (hasError) {
     return null;
   }
 
@@ -457,13 +172,7 @@ Write only the narration script - no stage directions, no [brackets], just natur
                 Article Narrator
               </div>
               <div className="text-xs text-gray-500">
-                {isEnhancing
-                  ? "Enhancing with AI..."
-                  : isPlaying && totalChunks > 1
-                  ? `Part ${currentChunk + 1} of ${totalChunks}`
-                  : isPlaying
-                  ? "Playing..."
-                  : "Generating..."}
+                {isPlaying ? "Playing..." : "Generating..."}
               </div>
             </div>
           </div>
@@ -1,6 +1,7 @@
 import { JSX, useCallback, useEffect, useRef, useState } from "react";
 import { AnimatePresence, motion } from "framer-motion";
 import { BookOpen, ExternalLink, Send, Square, User, X } from "lucide-react";
+import { useAnonymousUser } from "@/lib/hooks/useAnonymousUser";
 
 interface Source {
     id: string;
@@ -369,6 +370,7 @@ function LoadingDots() {
 }
 
 export function AISearchModal({ isOpen, onClose }: AISearchModalProps): JSX.Element {
+    const { user } = useAnonymousUser();
     const [messages, setMessages] = useState<Message[]>([]);
     const [inputValue, setInputValue] = useState("");
     const [isLoading, setIsLoading] = useState(false);
@@ -379,6 +381,8 @@ export function AISearchModal({ isOpen, onClose }: AISearchModalProps): JSX.Elem
     const abortControllerRef = useRef<AbortController | null>(null);
     const streamingTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
     const currentStreamingIdRef = useRef<string | null>(null);
+    // One backend session per conversation, so follow-up questions reuse its context
+    const sessionIdRef = useRef<string>(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
 
     // Handle citation click - scroll to and highlight source
     const handleCitationClick = useCallback((messageId: string, sourceIndex: number) => {
@@ -491,7 +495,13 @@ export function AISearchModal({ isOpen, onClose }: AISearchModalProps): JSX.Elem
             const res = await fetch(`${API_URL}/chat`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: userMessage.content }),
+                // user_id lets the backend queue requests fairly per visitor;
+                // session_id lets it answer follow-ups from this conversation's articles
+                body: JSON.stringify({
+                    message: userMessage.content,
+                    user_id: user?.id,
+                    session_id: sessionIdRef.current,
+                }),
                 signal: abortControllerRef.current.signal,
             });
 
@@ -14,6 +14,8 @@ import {
 import type { Article } from "@/lib/supabase";
 import type { ArticleCategory } from "@/types/article";
 
+const API_BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
+
 // =============================================================================
 // Types matching Supabase schemas
 // =============================================================================
@@ -162,6 +164,26 @@ export async function getArticles(options?: {
     return articles.map(transformToPreview);
 }
 
+/**
+ * Fetch the articles most similar to the given one (precomputed by the backend).
+ * Returns null when the backend has no related-articles table for this article.
+ */
+export async function getRelatedArticles(slug: string, limit: number = 3): Promise<ArticlePreview[] | null> {
+    const response = await fetch(
+        `${API_BASE_URL}/articles/${encodeURIComponent(slug)}/related?limit=${limit}`
+    );
+
+    if (response.status === 404 || response.status === 503) {
+        return null;
+    }
+    if (!response.ok) {
+        throw new Error(`Failed to fetch related articles: ${response.statusText}`);
+    }
+
+    const data: { related: ArticlePreview[] } = await response.json();
+    return data.related;
+}
+
 /**
  * Fetch a single article by slug
  */
@@ -1,7 +1,7 @@
 import { useParams, Link } from "react-router-dom";
 import { useQuery } from "@tanstack/react-query";
 import { Helmet } from "react-helmet-async";
-import { getArticleBySlug, getArticles, type ArticlePreview } from "@/lib/api/articles";
+import { getArticleBySlug, getArticles, getRelatedArticles, type ArticlePreview } from "@/lib/api/articles";
 import {
   ArticleHero,
   ArticleContent,
@@ -29,6 +29,11 @@ export default function BlogPostPage() {
   const { data: relatedArticles = [], isLoading: isLoadingRelated } = useQuery({
     queryKey: ["relatedArticles", article?.category, article?.slug],
     queryFn: async () => {
+      // Content-based neighbours from the backend; same-category articles if unavailable
+      const related = await getRelatedArticles(article!.slug, 3).catch(() => null);
+      if (related && related.length > 0) {
+        return related;
+      }
       const articles = await getArticles({
         category: article?.category as ArticleCategory,
         limit: 4,
@@ -90,10 +95,7 @@ export default function BlogPostPage() {
         <ArticleHero article={article} />
         
         {/* Article Narrator - Sticky at top while reading */}
-        <ArticleNarrator
-          title={article.title}
-          content={article.content}
-        />
+        <ArticleNarrator slug={article.slug} />
         
         <ArticleContent 
           content={article.content}